@@ -1,6 +1,8 @@
 import numpy as np
 import scipy.stats as stats
-from math import comb
+
+from bondad_ajuste import chi2_bondad_discreta
+
 
 def chi2_binomial_test(observed_counts, n=None, p=None, alpha=0.05):
     """
@@ -12,54 +14,22 @@ def chi2_binomial_test(observed_counts, n=None, p=None, alpha=0.05):
     - p: probabilidad de éxito (si no se da, se estima)
     - alpha: nivel de significancia
     """
-    k_values = np.arange(len(observed_counts))
-    total = np.sum(observed_counts)
-
     if n is None:
         n = len(observed_counts) - 1
 
-    # Estimar p si no se da
-    if p is None:
-        mean = np.sum(k_values * observed_counts) / total
-        p = mean / n
-
-    # Calcular frecuencias esperadas con la fórmula binomial
-    expected_freqs = [comb(n, k) * (p**k) * ((1-p)**(n-k)) * total for k in k_values]
-
-    # Agrupar clases con esperadas < 5
-    obs_comb, exp_comb = [], []
-    temp_obs, temp_exp = 0, 0
-
-    for obs, exp in zip(observed_counts, expected_freqs):
-        if exp < 5:
-            temp_obs += obs
-            temp_exp += exp
-        else:
-            if temp_exp > 0:
-                obs_comb.append(temp_obs)
-                exp_comb.append(temp_exp)
-                temp_obs, temp_exp = 0, 0
-            obs_comb.append(obs)
-            exp_comb.append(exp)
-
-    if temp_exp > 0:
-        obs_comb.append(temp_obs)
-        exp_comb.append(temp_exp)
-
-    # Verificación de clases
-    if len(obs_comb) < 2:
+    # p se estima por máxima verosimilitud si no se da (resta 1 grado de libertad)
+    fijos = {"n": n} if p is None else {"n": n, "p": p}
+    resultado = chi2_bondad_discreta(observed_counts, stats.binom, fijos, alpha=alpha)
+
+    chi2_stat = resultado["Estadístico Chi²"][0]
+    if np.isnan(chi2_stat):
         print("No hay suficientes clases agrupadas con frecuencia esperada ≥ 5.")
         return
 
-    # Estadístico y grados de libertad
-    chi2_stat = np.sum((np.array(obs_comb) - np.array(exp_comb))**2 / np.array(exp_comb))
-    df = len(obs_comb) - 1
-    if p is None:
-        df -= 1  # Si estimamos p, restamos 1
-
-    # Valor crítico y p-valor
-    chi2_crit = stats.chi2.ppf(1 - alpha, df)
-    p_value = 1 - stats.chi2.cdf(chi2_stat, df)
+    p = resultado["Parámetros"]["p"][0]
+    df = resultado["Grados de libertad"][0]
+    chi2_crit = resultado["Valor crítico"][0]
+    p_value = resultado["Valor p"][0]
 
     # Resultados
     print("--- Prueba Chi² de bondad de ajuste a distribución Binomial ---")
@@ -75,8 +45,60 @@ def chi2_binomial_test(observed_counts, n=None, p=None, alpha=0.05):
         print("→ No se rechaza H₀: los datos podrían seguir una distribución binomial.")
 
 
+def chi2_binomial_test_lote(observed_counts, n=None, p=None, alpha=0.05):
+    """
+    Prueba Chi² de bondad de ajuste binomial para un lote de histogramas que
+    comparten el número de ensayos n.
+
+    Parámetros:
+    - observed_counts: array (lote, K) con frecuencias observadas para k = 0..K-1
+    - n: número de ensayos (si no se da, se asume K-1)
+    - p: probabilidad de éxito común o una por fila (si no se da, se estima por fila)
+    - alpha: nivel de significancia
+
+    Retorna:
+    - diccionario con arrays por fila (p, estadístico, gl, valor crítico, valor p,
+      clases agrupadas). Las filas con menos de 2 clases agrupadas tienen NaN.
+    """
+    if n is None:
+        n = np.shape(observed_counts)[-1] - 1
+
+    fijos = {"n": n} if p is None else {"n": n, "p": p}
+    resultado = chi2_bondad_discreta(observed_counts, stats.binom, fijos, alpha=alpha)
+    resultado["p"] = resultado.pop("Parámetros")["p"]
+    return resultado
+
+
+def verificar_binomial_lote(semilla=0, tolerancia=1e-10):
+    """
+    Compara chi2_binomial_test_lote con stats.chisquare fila por fila en
+    histogramas sin clases agrupadas, con p estimado (ddof=1) y con p fijo.
+    Lanza AssertionError si el estadístico, los grados de libertad o el
+    valor p no coinciden.
+    """
+    rng = np.random.default_rng(semilla)
+    n = 5
+    observadas = np.array([np.bincount(rng.binomial(n, p, 2000), minlength=n + 1)
+                           for p in np.linspace(0.35, 0.5, 8)])
+    k = np.arange(n + 1)
+    for p_fijo in (None, 0.4):
+        resultado = chi2_binomial_test_lote(observadas, n=n, p=p_fijo)
+        ddof = 1 if p_fijo is None else 0
+        for i, fila in enumerate(observadas):
+            p = fila @ k / (n * fila.sum()) if p_fijo is None else p_fijo
+            referencia = stats.chisquare(fila, fila.sum() * stats.binom.pmf(k, n, p), ddof=ddof)
+            assert resultado["Grados de libertad"][i] == n - ddof, "Los grados de libertad no coinciden."
+            assert np.isclose(resultado["Estadístico Chi²"][i], referencia.statistic, rtol=tolerancia, atol=0), (
+                "El estadístico no coincide con scipy.")
+            assert np.isclose(resultado["Valor p"][i], referencia.pvalue, rtol=tolerancia, atol=0), (
+                "El valor p no coincide con scipy.")
+
+
 # === Ejemplo de uso ===
-# Frecuencias observadas para k = 0 a 5
-observadas = [12, 30, 40, 15, 2, 1]  # Total = 100
-# Se puede pasar n=5 si se sabe, si no, se asume len(observadas) - 1
-chi2_binomial_test(observadas)
+if __name__ == "__main__":
+    # Frecuencias observadas para k = 0 a 5
+    observadas = [12, 30, 40, 15, 2, 1]  # Total = 100
+    # Se puede pasar n=5 si se sabe, si no, se asume len(observadas) - 1
+    chi2_binomial_test(observadas)
+
+    verificar_binomial_lote()
@@ -0,0 +1,220 @@
+import os
+import sys
+
+import numpy as np
+import scipy.stats as stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from valores_criticos import valor_critico, valor_p
+
+
+# Estimadores de máxima verosimilitud vectorizados por fila. Reciben la media
+# muestral de cada fila (ya descontado loc) y los parámetros fijos, y devuelven
+# los parámetros estimados como arrays.
+_ESTIMADORES_MV = {
+    "poisson": lambda media, fijos: {"mu": media},
+    "bernoulli": lambda media, fijos: {"p": media},
+    "binom": lambda media, fijos: {"p": media / fijos["n"]},
+    "geom": lambda media, fijos: {"p": 1 / media},
+    "nbinom": lambda media, fijos: {"p": fijos["n"] / (fijos["n"] + media)},
+}
+
+# Parámetros que deben fijarse para poder usar el estimador anterior
+_PARAMETROS_REQUERIDOS = {"binom": ("n",), "nbinom": ("n",)}
+
+
+def _estimar_parametros(distribucion, media, fijos, estimador):
+    """
+    Completa los parámetros de forma que no vienen fijados. Devuelve el
+    diccionario de parámetros y cuántos se estimaron.
+    """
+    nombres = [s.strip() for s in (distribucion.shapes or "").split(",") if s.strip()]
+    libres = [nombre for nombre in nombres if nombre not in fijos]
+    if not libres:
+        return dict(fijos), 0
+
+    if estimador is None:
+        estimador = _ESTIMADORES_MV.get(distribucion.name)
+        faltan = [p for p in _PARAMETROS_REQUERIDOS.get(distribucion.name, ()) if p not in fijos]
+        if estimador is None or faltan:
+            raise ValueError(
+                f"No hay estimador vectorizado para '{distribucion.name}' con los parámetros "
+                f"{libres} libres; fije los parámetros o pase un estimador."
+            )
+
+    estimados = estimador(media - fijos.get("loc", 0), fijos)
+    parametros = dict(fijos)
+    parametros.update({nombre: estimados[nombre] for nombre in libres})
+    return parametros, len(libres)
+
+
+def _probabilidades_clases(distribucion, k_values, parametros):
+    """
+    Probabilidad de cada clase k, con la primera clase como cola inferior
+    P(X <= k_0) y la última como cola superior P(X >= k_ultimo), de modo que
+    las esperadas suman el total aunque el histograma esté truncado.
+    """
+    probabilidades = np.exp(distribucion.logpmf(k_values, **parametros))
+    probabilidades[:, -1] = np.exp(distribucion.logsf(k_values[-1] - 1, **parametros))[:, 0]
+    if len(k_values) > 1:
+        probabilidades[:, 0] = distribucion.cdf(k_values[0], **parametros)[:, 0]
+    return probabilidades
+
+
+def _agrupar_clases(esperadas, minimo=5):
+    """
+    Asigna a cada columna de esperadas (lote, K) una clase agrupada para que
+    toda clase tenga frecuencia esperada >= minimo.
+
+    - Cola izquierda: de la columna 0 a la primera donde la suma acumulada
+      alcanza el mínimo (argmax sobre la suma acumulada).
+    - Cola derecha: desde la última columna donde la suma acumulada por la
+      derecha alcanza el mínimo hasta el final.
+    - Centro: cada columna con esperada >= minimo queda sola y cada tramo de
+      columnas pequeñas forma una clase; si ese tramo no llega al mínimo se
+      une a la clase siguiente.
+
+    Retorna:
+    - (clase por columna, número de clases por fila)
+    """
+    lote, k = esperadas.shape
+    columnas = np.arange(k)
+    filas = np.arange(lote)[:, None]
+
+    acumulada = np.cumsum(esperadas, axis=1)
+    acumulada_derecha = np.cumsum(esperadas[:, ::-1], axis=1)[:, ::-1]
+    fin_izquierda = np.argmax(acumulada >= minimo, axis=1)[:, None]
+    inicio_derecha = (np.count_nonzero(acumulada_derecha >= minimo, axis=1) - 1)[:, None]
+
+    grande = esperadas >= minimo
+    nueva = grande.copy()
+    nueva[:, 1:] |= grande[:, :-1]
+    nueva &= (columnas > fin_izquierda) & (columnas < inicio_derecha)
+    nueva |= (columnas == fin_izquierda + 1) & (fin_izquierda + 1 <= inicio_derecha)
+    nueva |= (columnas == inicio_derecha) & (inicio_derecha > fin_izquierda)
+    nueva[:, 0] = True
+
+    # Los tramos centrales que no llegan al mínimo se unen a la clase siguiente
+    clase = np.cumsum(nueva, axis=1) - 1
+    indice = (filas * k + clase).ravel()
+    sumas = np.bincount(indice, weights=esperadas.ravel(), minlength=lote * k).reshape(lote, k)
+    nueva[:, 1:] &= sumas[filas, clase[:, :-1]] >= minimo
+
+    clase = np.cumsum(nueva, axis=1) - 1
+    return clase, clase[:, -1] + 1
+
+
+def chi2_bondad_discreta(observed_counts, distribucion, parametros=None, alpha=0.05,
+                         inicio=0, minimo_esperado=5, estimador=None):
+    """
+    Prueba Chi² de bondad de ajuste a una distribución discreta de scipy.stats
+    para uno o varios histogramas a la vez.
+
+    Parámetros:
+    - observed_counts: frecuencias observadas para k = inicio, inicio+1, ...
+      (lista 1-D o array (lote, K) con un histograma por fila)
+    - distribucion: distribución discreta de scipy.stats (o su nombre), p. ej.
+      stats.poisson, stats.binom, stats.geom
+    - parametros: diccionario de parámetros fijos (escalares o uno por fila).
+      Los que falten se estiman por máxima verosimilitud por fila y cada uno
+      resta un grado de libertad.
+    - alpha: nivel de significancia
+    - inicio: valor de k de la primera columna
+    - minimo_esperado: frecuencia esperada mínima por clase agrupada
+    - estimador: función (media, fijos) -> dict para distribuciones sin
+      estimador incorporado (ver _ESTIMADORES_MV)
+
+    La primera y la última clase representan las colas P(X <= k_0) y
+    P(X >= k_ultimo), y las clases se agrupan con _agrupar_clases.
+
+    Retorna:
+    - diccionario con parámetros, estadístico, gl, valor crítico, valor p y
+      número de clases agrupadas, como arrays por fila. Las filas con menos de
+      2 clases o sin grados de libertad tienen NaN.
+    """
+    if isinstance(distribucion, str):
+        distribucion = getattr(stats, distribucion)
+
+    observadas = np.atleast_2d(np.asarray(observed_counts, dtype=float))
+    lote, k = observadas.shape
+    k_values = inicio + np.arange(k)
+    total = observadas.sum(axis=1)
+    media = (observadas @ k_values) / total
+
+    parametros, estimados = _estimar_parametros(distribucion, media, dict(parametros or {}), estimador)
+    parametros = {nombre: np.broadcast_to(np.asarray(valor, dtype=float), (lote,))
+                  for nombre, valor in parametros.items()}
+    por_fila = {nombre: valor[:, None] for nombre, valor in parametros.items()}
+
+    esperadas = total[:, None] * _probabilidades_clases(distribucion, k_values, por_fila)
+    clase, clases = _agrupar_clases(esperadas, minimo_esperado)
+
+    indice = (np.arange(lote)[:, None] * k + clase).ravel()
+    obs_comb = np.bincount(indice, weights=observadas.ravel(), minlength=lote * k).reshape(lote, k)
+    exp_comb = np.bincount(indice, weights=esperadas.ravel(), minlength=lote * k).reshape(lote, k)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminos = np.where(exp_comb > 0, (obs_comb - exp_comb) ** 2 / exp_comb, 0)
+    chi2_stat = terminos.sum(axis=1)
+    df = clases - 1 - estimados
+
+    validas = (clases >= 2) & (df > 0)
+    chi2_stat = np.where(validas, chi2_stat, np.nan)
+    df_validos = np.where(validas, df, 1)
+    chi2_crit = np.where(validas, valor_critico('chi2', alpha, df_validos, 'greater'), np.nan)
+    p_value = np.where(validas, valor_p('chi2', chi2_stat, df_validos), np.nan)
+
+    return {
+        "Parámetros": parametros,
+        "Estadístico Chi²": chi2_stat,
+        "Grados de libertad": df,
+        "Valor crítico": chi2_crit,
+        "Valor p": p_value,
+        "Clases agrupadas": clases,
+        "Rechaza H₀": chi2_stat > chi2_crit
+    }
+
+
+def verificar_bondad_discreta(tolerancia=1e-10):
+    """
+    Compara chi2_bondad_discreta con stats.chisquare sobre clases agrupadas a
+    mano (colas con esperada < 5 unidas a su vecina) para Poisson y
+    geométrica con el parámetro estimado, y comprueba que el lote da lo mismo
+    que cada fila por separado. Lanza AssertionError si algo no coincide.
+    """
+    casos = [
+        (stats.poisson, 0, [50, 80, 70, 40, 20, 5, 2]),
+        (stats.geom, 1, [120, 70, 45, 28, 17, 10, 6, 3, 1]),
+    ]
+    for distribucion, inicio, observadas in casos:
+        observadas = np.asarray(observadas, dtype=float)
+        k_values = inicio + np.arange(len(observadas))
+        media = observadas @ k_values / observadas.sum()
+        parametro = {"poisson": {"mu": media}, "geom": {"p": 1 / media}}[distribucion.name]
+        probabilidades = distribucion.pmf(k_values, **parametro)
+        probabilidades[0] = distribucion.cdf(k_values[0], **parametro)
+        probabilidades[-1] = distribucion.sf(k_values[-1] - 1, **parametro)
+
+        obs, esp = list(observadas), list(observadas.sum() * probabilidades)
+        while len(esp) > 1 and esp[-1] < 5:
+            obs[-2:], esp[-2:] = [obs[-2] + obs[-1]], [esp[-2] + esp[-1]]
+        while len(esp) > 1 and esp[0] < 5:
+            obs[:2], esp[:2] = [obs[0] + obs[1]], [esp[0] + esp[1]]
+        assert min(esp) >= 5, "El caso de prueba necesita agrupar clases centrales."
+        referencia = stats.chisquare(obs, esp, ddof=1)
+
+        resultado = chi2_bondad_discreta(observadas, distribucion, inicio=inicio)
+        assert resultado["Grados de libertad"][0] == len(obs) - 2, "Los grados de libertad no coinciden."
+        assert np.isclose(resultado["Estadístico Chi²"][0], referencia.statistic, rtol=tolerancia, atol=0), (
+            "El estadístico no coincide con scipy.")
+        assert np.isclose(resultado["Valor p"][0], referencia.pvalue, rtol=tolerancia, atol=0), (
+            "El valor p no coincide con scipy.")
+
+        lote = chi2_bondad_discreta(np.stack([observadas, observadas[::-1]]), distribucion, inicio=inicio)
+        fila = chi2_bondad_discreta(observadas[::-1], distribucion, inicio=inicio)
+        assert np.allclose(lote["Estadístico Chi²"], [resultado["Estadístico Chi²"][0], fila["Estadístico Chi²"][0]],
+                           rtol=tolerancia, atol=0, equal_nan=True), "El lote no coincide con cada fila."
+
+
+if __name__ == "__main__":
+    verificar_bondad_discreta()
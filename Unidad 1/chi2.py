@@ -1,6 +1,13 @@
+import os
+import sys
+
 import numpy as np
+import scipy.sparse as sparse
 import scipy.stats as stats
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from valores_criticos import valor_critico, valor_p
+
 def chi2_test(observed, expected=None, alpha=0.05):
     """
     Realiza una prueba Chi-cuadrado (bondad de ajuste o independencia).
@@ -25,7 +32,7 @@ def chi2_test(observed, expected=None, alpha=0.05):
         test_type = "Independencia"
 
     # Valor crítico
-    chi2_crit = stats.chi2.ppf(1 - alpha, df)
+    chi2_crit = valor_critico('chi2', alpha, df, 'greater')
 
     # Mostrar resultados
     print(f"--- Prueba Chi-cuadrado: {test_type} ---")
@@ -40,16 +47,202 @@ def chi2_test(observed, expected=None, alpha=0.05):
         print("→ No se rechaza la H₀ (no hay diferencias significativas).")
 
 
+def chi2_independencia_lote(tablas, alpha=0.05, correccion=True):
+    """
+    Prueba Chi-cuadrado de independencia para una pila de tablas de contingencia.
+
+    Parámetros:
+    - tablas: array de forma (lote, R, C) con frecuencias observadas (una tabla 2-D
+      se trata como lote de tamaño 1)
+    - alpha: nivel de significancia (por defecto 0.05)
+    - correccion: aplicar la corrección de Yates cuando gl = 1, igual que
+      stats.chi2_contingency (por defecto True)
+
+    Retorna:
+    - diccionario con arrays por tabla. Las tablas con alguna frecuencia esperada
+      igual a 0 (fila o columna vacía) tienen estadístico y valor p NaN.
+    """
+    tablas = np.asarray(tablas, dtype=float)
+    if tablas.ndim == 2:
+        tablas = tablas[None]
+    if tablas.ndim != 3:
+        raise ValueError("Las tablas deben tener forma (lote, R, C).")
+
+    _, r, c = tablas.shape
+    df = (r - 1) * (c - 1)
+
+    # Frecuencias esperadas a partir de los marginales (broadcasting)
+    filas = tablas.sum(axis=2, keepdims=True)
+    columnas = tablas.sum(axis=1, keepdims=True)
+    total = filas.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        esperadas = filas * columnas / total
+
+        diferencia = tablas - esperadas
+        if correccion and df == 1:
+            diferencia = np.sign(diferencia) * np.maximum(np.abs(diferencia) - 0.5, 0)
+        chi2_stat = np.sum(diferencia ** 2 / esperadas, axis=(1, 2))
+
+    if df == 0:
+        chi2_stat = np.zeros(len(tablas))
+    chi2_stat[np.any(esperadas == 0, axis=(1, 2))] = np.nan
+
+    chi2_crit = valor_critico('chi2', alpha, df, 'greater')
+    p_value = valor_p('chi2', chi2_stat, df) if df > 0 else np.where(np.isnan(chi2_stat), np.nan, 1.0)
+
+    return {
+        "Estadístico Chi²": chi2_stat,
+        "Grados de libertad": df,
+        "Valor crítico": chi2_crit,
+        "Valor p": p_value,
+        "Frecuencias esperadas": esperadas,
+        "Rechaza H₀": chi2_stat > chi2_crit
+    }
+
+
+def _codificar_categorias(columna):
+    """
+    Convierte una columna categórica en códigos 0..k-1 y devuelve también las
+    categorías. Los enteros con rango acotado se codifican con bincount en
+    O(n + rango); el resto (texto, rangos enormes) con np.unique.
+    """
+    columna = np.asarray(columna).ravel()
+    if columna.dtype.kind in "iub" and columna.size:
+        minimo, maximo = int(columna.min()), int(columna.max())
+        if maximo - minimo <= 2 * columna.size:
+            codigos = (columna - minimo).astype(np.intp)
+            presentes = np.bincount(codigos) > 0
+            categorias = np.flatnonzero(presentes) + minimo
+            if presentes.all():
+                return codigos, categorias
+            # Compactar los valores que no aparecen para no dejar filas vacías
+            return (np.cumsum(presentes) - 1)[codigos], categorias
+
+    categorias, codigos = np.unique(columna, return_inverse=True)
+    return codigos.ravel(), categorias
+
+
+def chi2_independencia_columnas(x, y, alpha=0.05, correccion=True, disperso=None):
+    """
+    Prueba Chi-cuadrado de independencia a partir de dos columnas categóricas
+    crudas (sin agregar), codificadas como enteros o como texto.
+
+    Parámetros:
+    - x, y: columnas de la misma longitud (una observación por posición)
+    - alpha: nivel de significancia (por defecto 0.05)
+    - correccion: corrección de Yates cuando gl = 1 (solo en modo denso)
+    - disperso: True para guardar solo las celdas no nulas, False para la tabla
+      densa. Si es None se elige disperso cuando la tabla tendría más celdas que
+      max(len(x), 10**6).
+
+    En modo disperso el estadístico se obtiene de los marginales sin construir
+    la matriz de esperadas: como la suma de O y de E coincide,
+    Chi² = N * Σ O_ij² / (f_i * c_j) - N, y solo aportan las celdas con O_ij > 0.
+
+    Retorna:
+    - diccionario con estadístico, gl, valor crítico, valor p, la tabla (array
+      denso o scipy.sparse.coo_array) y las categorías de filas y columnas.
+    """
+    codigos_x, categorias_x = _codificar_categorias(x)
+    codigos_y, categorias_y = _codificar_categorias(y)
+    if len(codigos_x) != len(codigos_y):
+        raise ValueError("Las columnas deben tener la misma longitud.")
+
+    r, c = len(categorias_x), len(categorias_y)
+    if disperso is None:
+        disperso = r * c > max(len(codigos_x), 10**6)
+
+    if not disperso:
+        celdas = codigos_x * c + codigos_y
+        tabla = np.bincount(celdas, minlength=r * c).reshape(r, c)
+        resultado = chi2_independencia_lote(tabla, alpha=alpha, correccion=correccion)
+        chi2_stat = float(resultado["Estadístico Chi²"][0])
+        df = resultado["Grados de libertad"]
+        chi2_crit = resultado["Valor crítico"]
+        p_value = float(resultado["Valor p"][0])
+    else:
+        celdas, conteos = np.unique(codigos_x.astype(np.int64) * c + codigos_y, return_counts=True)
+        fila, columna = np.divmod(celdas, c)
+        tabla = sparse.coo_array((conteos, (fila, columna)), shape=(r, c))
+
+        marginal_filas = np.bincount(codigos_x, minlength=r).astype(float)
+        marginal_columnas = np.bincount(codigos_y, minlength=c).astype(float)
+        total = float(len(codigos_x))
+
+        df = (r - 1) * (c - 1)
+        chi2_stat = total * np.sum(conteos.astype(float) ** 2
+                                   / (marginal_filas[fila] * marginal_columnas[columna])) - total
+        chi2_stat = max(float(chi2_stat), 0.0)
+        chi2_crit = valor_critico('chi2', alpha, df, 'greater')
+        p_value = float(valor_p('chi2', chi2_stat, df)) if df > 0 else 1.0
+
+    return {
+        "Estadístico Chi²": chi2_stat,
+        "Grados de libertad": df,
+        "Valor crítico": chi2_crit,
+        "Valor p": p_value,
+        "Tabla": tabla,
+        "Categorías filas": categorias_x,
+        "Categorías columnas": categorias_y,
+        "Rechaza H₀": chi2_stat > chi2_crit
+    }
+
+
+def verificar_independencia_lote(semilla=0, tolerancia=1e-10):
+    """
+    Compara chi2_independencia_lote con stats.chi2_contingency tabla por
+    tabla en pilas 2x2 (con y sin Yates) y 3x4. Lanza AssertionError si el
+    estadístico o el valor p difieren en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    for forma, correccion in (((2, 2), True), ((2, 2), False), ((3, 4), True)):
+        tablas = rng.integers(1, 40, size=(25,) + forma)
+        resultado = chi2_independencia_lote(tablas, correccion=correccion)
+        for i, tabla in enumerate(tablas):
+            chi2_ref, p_ref, df_ref, _ = stats.chi2_contingency(tabla, correction=correccion)
+            assert resultado["Grados de libertad"] == df_ref, "Los grados de libertad no coinciden."
+            assert np.isclose(resultado["Estadístico Chi²"][i], chi2_ref, rtol=tolerancia, atol=0), (
+                "El estadístico no coincide con scipy.")
+            assert np.isclose(resultado["Valor p"][i], p_ref, rtol=tolerancia, atol=0), (
+                "El valor p no coincide con scipy.")
+
+
+def verificar_independencia_columnas(semilla=0, tolerancia=1e-10):
+    """
+    Compara chi2_independencia_columnas en modo denso y disperso, con
+    columnas enteras y de texto, contra stats.chi2_contingency sobre la tabla
+    cruzada. Lanza AssertionError si el estadístico o el valor p difieren en
+    más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    x = rng.integers(3, 8, 500)
+    y = np.array(["a", "b", "c", "d"])[(x + rng.integers(0, 3, 500)) % 4]
+    categorias_y = np.unique(y)
+    tabla = np.array([[np.sum((x == i) & (y == j)) for j in categorias_y] for i in np.unique(x)])
+    chi2_ref, p_ref, df_ref, _ = stats.chi2_contingency(tabla)
+
+    for disperso in (False, True):
+        resultado = chi2_independencia_columnas(x, y, disperso=disperso)
+        assert resultado["Grados de libertad"] == df_ref, "Los grados de libertad no coinciden."
+        assert np.isclose(resultado["Estadístico Chi²"], chi2_ref, rtol=tolerancia, atol=0), (
+            "El estadístico no coincide con scipy.")
+        assert np.isclose(resultado["Valor p"], p_ref, rtol=tolerancia, atol=0), (
+            "El valor p no coincide con scipy.")
+
+
 # === Ejemplos de uso ===
+if __name__ == "__main__":
+    # Ejemplo 1: Bondad de ajuste (se espera distribución uniforme)
+    observadas = [18, 22, 20, 25, 15]
+    esperadas = [20, 20, 20, 20, 20]
+    chi2_test(observadas, esperadas)
+
+    # Ejemplo 2: Independencia (tabla de contingencia)
+    tabla_contingencia = [
+        [30, 10],
+        [20, 40]
+    ]
+    chi2_test(tabla_contingencia)
 
-# Ejemplo 1: Bondad de ajuste (se espera distribución uniforme)
-observadas = [18, 22, 20, 25, 15]
-esperadas = [20, 20, 20, 20, 20]
-chi2_test(observadas, esperadas)
-
-# Ejemplo 2: Independencia (tabla de contingencia)
-tabla_contingencia = [
-    [30, 10],
-    [20, 40]
-]
-chi2_test(tabla_contingencia)
+    verificar_independencia_lote()
+    verificar_independencia_columnas()
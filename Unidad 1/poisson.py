@@ -1,6 +1,11 @@
+import os
+import tempfile
+
 import numpy as np
 import scipy.stats as stats
 
+from bondad_ajuste import chi2_bondad_discreta
+
 def chi2_poisson_test(observed_counts, alpha=0.05):
     """
     Realiza una prueba de bondad de ajuste Chi² para datos que se espera sigan
@@ -11,51 +16,23 @@ def chi2_poisson_test(observed_counts, alpha=0.05):
     - alpha: nivel de significancia (por defecto 0.05)
     
     Asume que el índice de la lista representa el valor k observado.
-    """
-    # Valores observados y total de muestras
-    k_values = np.arange(len(observed_counts))
-    total = np.sum(observed_counts)
-    
-    # Estimar λ (media muestral)
-    lambda_hat = np.sum(k_values * observed_counts) / total
-
-    # Calcular frecuencias esperadas usando la función de masa de Poisson
-    expected_probs = stats.poisson.pmf(k_values, mu=lambda_hat)
-    expected_freqs = expected_probs * total
 
-    # Combinar clases con frecuencias esperadas < 5
-    obs_comb, exp_comb = [], []
-    temp_obs, temp_exp = 0, 0
+    Retorna:
+    - el diccionario de chi2_bondad_discreta (o None si no hay clases suficientes)
+    """
+    # λ se estima con la media muestral (resta 1 grado de libertad); las
+    # clases con frecuencia esperada < 5 se agrupan, incluida la cola superior
+    resultado = chi2_bondad_discreta(observed_counts, stats.poisson, alpha=alpha)
 
-    for obs, exp in zip(observed_counts, expected_freqs):
-        if exp < 5:
-            temp_obs += obs
-            temp_exp += exp
-        else:
-            if temp_exp > 0:
-                obs_comb.append(temp_obs)
-                exp_comb.append(temp_exp)
-                temp_obs, temp_exp = 0, 0
-            obs_comb.append(obs)
-            exp_comb.append(exp)
-
-    # Agregar último grupo si quedó pendiente
-    if temp_exp > 0:
-        obs_comb.append(temp_obs)
-        exp_comb.append(temp_exp)
-
-    # Verificación
-    if len(obs_comb) < 2:
+    chi2_stat = resultado["Estadístico Chi²"][0]
+    if np.isnan(chi2_stat):
         print("No hay suficientes clases agrupadas con frecuencia esperada ≥ 5.")
         return
 
-    # Estadístico Chi² y grados de libertad
-    chi2_stat = np.sum((np.array(obs_comb) - np.array(exp_comb))**2 / np.array(exp_comb))
-    df = len(obs_comb) - 1 - 1  # -1 por estimar λ
-
-    # Valor crítico y p-valor
-    chi2_crit = stats.chi2.ppf(1 - alpha, df)
-    p_value = 1 - stats.chi2.cdf(chi2_stat, df)
+    lambda_hat = resultado["Parámetros"]["mu"][0]
+    df = resultado["Grados de libertad"][0]
+    chi2_crit = resultado["Valor crítico"][0]
+    p_value = resultado["Valor p"][0]
 
     # Mostrar resultados
     print(f"--- Prueba Chi² de bondad de ajuste a distribución Poisson ---")
@@ -70,8 +47,133 @@ def chi2_poisson_test(observed_counts, alpha=0.05):
     else:
         print("→ No se rechaza la H₀: los datos podrían seguir una distribución de Poisson.")
 
+    return resultado
+
+
+def _sumar_conteos(histograma, conteos):
+    """Suma al histograma de conteos (creciéndolo si hace falta) los conteos dados."""
+    nuevos = np.bincount(conteos)
+    if len(nuevos) > len(histograma):
+        histograma = np.pad(histograma, (0, len(nuevos) - len(histograma)))
+    histograma[:len(nuevos)] += nuevos
+    return histograma
+
+
+def histograma_conteos_timestamps(ruta, intervalo, dtype="int64", inicio=None, fin=None,
+                                  tam_bloque=10_000_000):
+    """
+    Construye el histograma de conteos por intervalo (cuántos intervalos tienen
+    k = 0, 1, 2, ... eventos) a partir de un archivo binario de timestamps
+    ordenados, leyéndolo por bloques con np.memmap en memoria acotada.
+
+    Parámetros:
+    - ruta: archivo binario con un timestamp por registro, en orden no decreciente
+    - intervalo: ancho de cada intervalo, en las mismas unidades que los timestamps
+    - dtype: tipo de dato de los registros (por defecto int64)
+    - inicio: comienzo del primer intervalo (por defecto, el primer timestamp)
+    - fin: final del período observado. Si es None, el último intervalo se
+      descarta por estar incompleto; si se da, se cuentan todos los intervalos
+      completos hasta fin, incluidos los vacíos finales.
+    - tam_bloque: registros por bloque
+
+    Cada bloque se agrupa en intervalos contando los tramos de igual índice
+    de intervalo; el intervalo abierto al final del bloque pasa al siguiente
+    y los intervalos vacíos entre eventos se suman como k = 0.
+    """
+    mapa = np.memmap(ruta, dtype=dtype, mode="r")
+    if len(mapa) == 0:
+        raise ValueError("El archivo no contiene timestamps.")
+    if inicio is None:
+        inicio = mapa[0]
+
+    limite = None
+    if fin is not None:
+        num_intervalos = int((fin - inicio) // intervalo)
+        limite = inicio + num_intervalos * intervalo
+
+    histograma = np.zeros(1, dtype=np.int64)
+    vacios = 0
+    actual, conteo_actual = -1, 0
+    ultimo = None
+
+    for desde in range(0, len(mapa), tam_bloque):
+        tiempos = np.asarray(mapa[desde:desde + tam_bloque])
+        if np.any(tiempos[1:] < tiempos[:-1]) or (ultimo is not None and tiempos[0] < ultimo):
+            raise ValueError("Los timestamps deben estar en orden no decreciente.")
+        ultimo = tiempos[-1]
+
+        tiempos = tiempos[tiempos >= inicio]
+        if limite is not None:
+            tiempos = tiempos[tiempos < limite]
+        if not len(tiempos):
+            continue
+
+        indices = ((tiempos - inicio) // intervalo).astype(np.int64)
+        comienzos = np.concatenate([[0], np.flatnonzero(indices[1:] != indices[:-1]) + 1])
+        cubetas = indices[comienzos]
+        conteos = np.diff(np.append(comienzos, len(indices)))
+
+        if cubetas[0] == actual:
+            conteos[0] += conteo_actual
+        else:
+            if actual >= 0:
+                histograma = _sumar_conteos(histograma, [conteo_actual])
+            vacios += int(cubetas[0] - actual - 1)
+
+        # Todos los intervalos del bloque salvo el último ya están cerrados
+        histograma = _sumar_conteos(histograma, conteos[:-1])
+        vacios += int(np.sum(np.diff(cubetas) - 1))
+        actual, conteo_actual = int(cubetas[-1]), int(conteos[-1])
+
+    # Sin fin, el último intervalo se descarta por estar incompleto
+    if limite is not None:
+        if actual >= 0:
+            histograma = _sumar_conteos(histograma, [conteo_actual])
+        vacios += num_intervalos - actual - 1
+
+    histograma[0] += vacios
+    return histograma
+
+
+def chi2_poisson_timestamps(ruta, intervalo, alpha=0.05, **opciones):
+    """
+    Prueba Chi² de Poisson directamente sobre un archivo de timestamps:
+    construye el histograma de conteos por intervalo en bloques (ver
+    histograma_conteos_timestamps) y lo pasa a chi2_poisson_test.
+
+    Retorna:
+    - (histograma de conteos, resultado de chi2_poisson_test)
+    """
+    histograma = histograma_conteos_timestamps(ruta, intervalo, **opciones)
+    return histograma, chi2_poisson_test(histograma, alpha=alpha)
+
+
+def verificar_histograma_timestamps(semilla=0):
+    """
+    Compara histograma_conteos_timestamps, con bloques pequeños para cruzar
+    sus bordes, contra el conteo directo con np.bincount de todos los
+    timestamps en memoria, con y sin fin. Lanza AssertionError si difieren.
+    """
+    rng = np.random.default_rng(semilla)
+    tiempos = np.sort(rng.integers(0, 100_000, 5000)).astype(np.int64)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "timestamps.bin")
+        tiempos.tofile(ruta)
+        for fin in (None, 120_000):
+            intervalos = ((tiempos[-1] - tiempos[0]) if fin is None else (fin - tiempos[0])) // 50
+            indices = (tiempos - tiempos[0]) // 50
+            por_intervalo = np.bincount(indices[indices < intervalos], minlength=intervalos)
+            referencia = np.bincount(por_intervalo)
+            for tam_bloque in (7, 1000, 10_000):
+                histograma = histograma_conteos_timestamps(ruta, 50, fin=fin, tam_bloque=tam_bloque)
+                assert np.array_equal(np.trim_zeros(histograma, "b"), referencia), (
+                    "El histograma no coincide con el conteo directo.")
+
 
 # === Ejemplo de uso ===
-# Observaciones para k = 0, 1, 2, ..., 6
-observadas = [50, 80, 70, 40, 20, 5, 2]
-chi2_poisson_test(observadas)
+if __name__ == "__main__":
+    # Observaciones para k = 0, 1, 2, ..., 6
+    observadas = [50, 80, 70, 40, 20, 5, 2]
+    chi2_poisson_test(observadas)
+
+    verificar_histograma_timestamps()
@@ -1,4 +1,4 @@
-from scipy.stats import norm
+from signos import prueba_signos
 
 # Datos de ejemplo
 datos = [12, 15, 14, 10, 11, 13, 17, 16, 12, 14]
@@ -7,36 +7,17 @@ datos = [12, 15, 14, 10, 11, 13, 17, 16, 12, 14]
 mediana_esperada = 13
 alpha = 0.05  # Nivel de significancia
 
-# Cálculo de signos
-positivos = sum(x > mediana_esperada for x in datos)
-negativos = sum(x < mediana_esperada for x in datos)
-empates = len(datos) - (positivos + negativos)
-
-# Estadísticos clave
-x = min(positivos, negativos)  # éxitos en prueba binomial
-n = positivos + negativos      # sin empates
-
-# Parámetros de la prueba normal aproximada (Z)
-media = n * 0.5
-desviacion = (n * 0.5 * 0.5) ** 0.5
-
-# Z calculado con corrección de continuidad
-z = (x - media + 0.5) / desviacion if x < media else (x - media - 0.5) / desviacion
-
-# Valor crítico Z para prueba bilateral
-z_critico = norm.ppf(1 - alpha / 2)
-
-# Valor p
-p_value = 2 * norm.cdf(-abs(z))
+# Prueba de signos (binomial exacta para n pequeño, normal con corrección si no)
+r = prueba_signos(datos, mediana_esperada, alpha)
 
 # Mostrar resultados
 print("=== Prueba de Signos ===")
-print(f"Positivos: {positivos}")
-print(f"Negativos: {negativos}")
-print(f"Empates (0): {empates}")
-print(f"x (menor de positivos/negativos): {x}")
-print(f"n (sin empates): {n}")
-print(f"z calculado: {z:.4f}")
-print(f"z crítico (α={alpha}): ±{z_critico:.4f}")
-print(f"p-value: {p_value:.4f}")
-print("Conclusión:", "Diferencia significativa" if abs(z) > z_critico else "No se rechaza H0 (sin diferencia)")
+print(f"Positivos: {r['Positivos']}")
+print(f"Negativos: {r['Negativos']}")
+print(f"Empates (0): {r['Empates']}")
+print(f"x (menor de positivos/negativos): {r['x']}")
+print(f"n (sin empates): {r['n']}")
+print(f"z calculado: {r['z']:.4f}")
+print(f"z crítico (α={alpha}): ±{r['z crítico']:.4f}")
+print(f"p-value{' (exacto)' if r['Exacto'] else ''}: {r['p-value']:.4f}")
+print("Conclusión:", "Diferencia significativa" if r["Diferencia significativa"] else "No se rechaza H0 (sin diferencia)")
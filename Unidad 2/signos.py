@@ -1,37 +1,206 @@
-from scipy.stats import norm
-# Datos de ejemplo
-datos = [12, 15, 14, 10, 11, 13, 17, 16, 12, 14]
-
-# Hipótesis nula: mediana esperada
-mediana_esperada = 13
-alpha = 0.05  # Nivel de significancia
-
-# Cálculo de signos
-positivos = sum(x > mediana_esperada for x in datos)
-negativos = sum(x < mediana_esperada for x in datos)
-empates = len(datos) - (positivos + negativos)
-
-# Estadísticos
-x = min(positivos, negativos)
-n = positivos + negativos
-
-# Z y p-value
-media = n * 0.5
-desviacion = (n * 0.5 * 0.5) ** 0.5
-z = (x - media + 0.5) / desviacion if x < media else (x - media - 0.5) / desviacion
-z_critico = norm.ppf(1 - alpha / 2)
-p_value = 2 * norm.cdf(-abs(z))
-
-# Resultados
-print("=== Prueba de Signos ===")
-print(f"Datos: {datos}")
-print(f"Mediana esperada (H₀): {mediana_esperada}")
-print(f"Positivos: {positivos}")
-print(f"Negativos: {negativos}")
-print(f"Empates (0): {empates}")
-print(f"x (menor de positivos/negativos): {x}")
-print(f"n (sin empates): {n}")
-print(f"z calculado: {z:.4f}")
-print(f"z crítico (α={alpha}): ±{z_critico:.4f}")
-print(f"p-value: {p_value:.4f}")
-print("Conclusión:", "Diferencia significativa" if abs(z) > z_critico else "No se rechaza H0 (sin diferencia)")
+import os
+import sys
+from functools import lru_cache
+from math import comb
+
+import numpy as np
+from scipy.stats import binom, binomtest, norm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from valores_criticos import valor_critico
+
+
+@lru_cache(maxsize=None)
+def _cdf_binomial_mitad(n):
+    """P(X <= x) para X ~ Binomial(n, 0.5), x = 0..n, con enteros exactos."""
+    return np.cumsum([comb(n, x) for x in range(n + 1)]) / 2 ** n
+
+
+@lru_cache(maxsize=8)
+def _tabla_signos(n_max):
+    """
+    Tabla (n_max+1, n_max+1) con la cdf de Binomial(n, 0.5) en la fila n, para
+    consultar muchos n a la vez con indexado de NumPy.
+    """
+    tabla = np.ones((n_max + 1, n_max + 1))
+    for n in range(n_max + 1):
+        tabla[n, :n + 1] = _cdf_binomial_mitad(n)
+    tabla.flags.writeable = False
+    return tabla
+
+
+def _estadisticos_signos(positivos, negativos, empates, alpha, n_exacto):
+    """
+    Z con corrección de continuidad, valor p (exacto para n <= n_exacto) y
+    decisión a partir de los conteos de signos (arrays).
+    """
+    x = np.minimum(positivos, negativos)
+    n = positivos + negativos
+
+    # Z con corrección de continuidad
+    media = n * 0.5
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desviacion = np.sqrt(n * 0.5 * 0.5)
+        z = np.where(x < media, x - media + 0.5, x - media - 0.5) / desviacion
+    p_value = 2 * norm.cdf(-np.abs(z))
+
+    # Valor p exacto para n pequeño
+    exacto = n <= n_exacto
+    if np.any(exacto):
+        p_value[exacto] = np.minimum(1.0, 2 * _tabla_signos(n_exacto)[n[exacto], x[exacto]])
+
+    z_critico = valor_critico('norm', alpha)
+    return {
+        "Positivos": positivos,
+        "Negativos": negativos,
+        "Empates": empates,
+        "x": x,
+        "n": n,
+        "z": z,
+        "z crítico": z_critico,
+        "p-value": p_value,
+        "Exacto": exacto,
+        "Diferencia significativa": p_value < alpha
+    }
+
+
+def prueba_signos(datos, mediana_esperada, alpha=0.05, n_exacto=25):
+    """
+    Prueba de signos para la mediana (bilateral).
+
+    Parámetros:
+    - datos: muestra 1-D o matriz (lote, n) con una muestra por fila; los NaN
+      se ignoran, así que las filas pueden rellenarse hasta el mismo largo
+    - mediana_esperada: mediana bajo H₀, común o una por fila
+    - alpha: nivel de significancia
+    - n_exacto: hasta este n (sin empates) el valor p es el binomial exacto,
+      min(1, 2 * P(X <= x)), leído de una tabla en caché; por encima se usa la
+      aproximación normal con corrección de continuidad
+
+    Retorna:
+    - diccionario con positivos, negativos, empates, x, n, z, z crítico, valor p
+      y decisión. Con una sola muestra los valores son escalares; con un lote,
+      arrays por fila.
+    """
+    datos = np.asarray(datos, dtype=float)
+    una_muestra = datos.ndim == 1 and np.ndim(mediana_esperada) == 0
+    datos = np.atleast_2d(datos)
+    mediana = np.broadcast_to(np.asarray(mediana_esperada, dtype=float), (datos.shape[0],))[:, None]
+
+    # Cálculo de signos (los NaN no cuentan como positivo, negativo ni empate)
+    positivos = np.count_nonzero(datos > mediana, axis=1)
+    negativos = np.count_nonzero(datos < mediana, axis=1)
+    empates = np.count_nonzero(datos == mediana, axis=1)
+
+    resultado = _estadisticos_signos(positivos, negativos, empates, alpha, n_exacto)
+    if una_muestra:
+        resultado = {clave: valor[0] if np.ndim(valor) else valor for clave, valor in resultado.items()}
+    return resultado
+
+
+def barrido_signos(datos, medianas, alpha=0.05, n_exacto=25):
+    """
+    Prueba de signos de una misma muestra contra muchas medianas candidatas
+    e intervalo de confianza de la mediana libre de distribución.
+
+    Los datos se ordenan una sola vez; para cada candidata, searchsorted da
+    cuántos valores quedan por debajo (negativos) y por encima (positivos),
+    y los empates son la diferencia. Costo O((n + m) log n) para m candidatas.
+
+    Parámetros:
+    - datos: muestra 1-D (los NaN se descartan)
+    - medianas: array de medianas candidatas
+    - alpha: nivel de significancia (también fija el nivel del intervalo)
+    - n_exacto: ver prueba_signos
+
+    Retorna:
+    - diccionario con los resultados de prueba_signos como arrays por candidata,
+      el intervalo de confianza (x_(k), x_(n-k+1)) y su nivel exacto
+      1 - 2 * P(X <= k - 1), con X ~ Binomial(n, 0.5)
+    """
+    ordenados = np.sort(np.asarray(datos, dtype=float).ravel())
+    ordenados = ordenados[~np.isnan(ordenados)]
+    medianas = np.atleast_1d(np.asarray(medianas, dtype=float))
+    total = len(ordenados)
+
+    negativos = np.searchsorted(ordenados, medianas, side="left")
+    positivos = total - np.searchsorted(ordenados, medianas, side="right")
+    empates = total - positivos - negativos
+
+    resultado = _estadisticos_signos(positivos, negativos, empates, alpha, n_exacto)
+
+    # k es el mayor entero con P(X <= k - 1) < alpha / 2
+    k = int(binom.ppf(alpha / 2, total, 0.5)) if total else 0
+    if k >= 1:
+        resultado["Intervalo de confianza"] = (ordenados[k - 1], ordenados[total - k])
+        resultado["Nivel de confianza"] = 1 - 2 * binom.cdf(k - 1, total, 0.5)
+    else:
+        resultado["Intervalo de confianza"] = (-np.inf, np.inf)
+        resultado["Nivel de confianza"] = 1.0
+    return resultado
+
+
+def verificar_signos(semilla=0, tolerancia=1e-10):
+    """
+    Compara prueba_signos (lote con NaN de relleno y filas sueltas) con
+    scipy.stats.binomtest en el camino exacto. Lanza AssertionError si algún
+    valor p difiere en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    datos = np.round(rng.normal(13, 3, (30, 20)))
+    datos[rng.random(datos.shape) < 0.2] = np.nan
+    lote = prueba_signos(datos, 13)
+    for fila, p_lote in zip(datos, lote["p-value"]):
+        fila = fila[~np.isnan(fila)]
+        positivos, negativos = int(np.sum(fila > 13)), int(np.sum(fila < 13))
+        referencia = binomtest(positivos, positivos + negativos, 0.5).pvalue if positivos + negativos else 1.0
+        assert np.isclose(p_lote, referencia, rtol=tolerancia, atol=0), "El valor p no coincide con scipy."
+        assert prueba_signos(fila, 13)["p-value"] == p_lote, "El lote no coincide con cada fila."
+
+
+def verificar_barrido(semilla=0, alpha=0.05, tolerancia=1e-10):
+    """
+    Comprueba barrido_signos contra scipy.stats.binomtest en candidatas entre
+    cada par de datos ordenados y fuera de sus extremos: mismos valores p, y
+    no se rechaza H₀ exactamente dentro del intervalo de confianza. Lanza
+    AssertionError si algo no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    datos = rng.normal(0, 1, 21)
+    ordenados = np.sort(datos)
+    candidatas = np.concatenate([[ordenados[0] - 1], (ordenados[1:] + ordenados[:-1]) / 2, [ordenados[-1] + 1]])
+    resultado = barrido_signos(datos, candidatas, alpha=alpha, n_exacto=len(datos))
+
+    inferior, superior = resultado["Intervalo de confianza"]
+    for candidata, p_value, rechaza in zip(candidatas, resultado["p-value"], resultado["Diferencia significativa"]):
+        referencia = binomtest(int(np.sum(datos > candidata)), len(datos), 0.5).pvalue
+        assert np.isclose(p_value, referencia, rtol=tolerancia, atol=0), "El valor p no coincide con scipy."
+        assert rechaza != (inferior < candidata < superior), "El intervalo no invierte la prueba."
+
+
+if __name__ == "__main__":
+    # Datos de ejemplo
+    datos = [12, 15, 14, 10, 11, 13, 17, 16, 12, 14]
+
+    # Hipótesis nula: mediana esperada
+    mediana_esperada = 13
+    alpha = 0.05  # Nivel de significancia
+
+    r = prueba_signos(datos, mediana_esperada, alpha)
+
+    # Resultados
+    print("=== Prueba de Signos ===")
+    print(f"Datos: {datos}")
+    print(f"Mediana esperada (H₀): {mediana_esperada}")
+    print(f"Positivos: {r['Positivos']}")
+    print(f"Negativos: {r['Negativos']}")
+    print(f"Empates (0): {r['Empates']}")
+    print(f"x (menor de positivos/negativos): {r['x']}")
+    print(f"n (sin empates): {r['n']}")
+    print(f"z calculado: {r['z']:.4f}")
+    print(f"z crítico (α={alpha}): ±{r['z crítico']:.4f}")
+    print(f"p-value{' (exacto)' if r['Exacto'] else ''}: {r['p-value']:.4f}")
+    print("Conclusión:", "Diferencia significativa" if r["Diferencia significativa"] else "No se rechaza H0 (sin diferencia)")
+
+    verificar_signos()
+    verificar_barrido()
@@ -1,28 +1,36 @@
+import itertools
+import math
+import os
+import tempfile
+from functools import lru_cache
+
 import numpy as np
 from scipy.stats import norm
 
-def runs_test(sequence, alpha=0.05):
+# Tabla exacta precalculada cargada desde disco (ver cargar_tabla_rachas)
+_TABLA_RACHAS = None
+
+def runs_test(sequence, alpha=0.05, exacto=False):
     """
     Realiza la prueba de rachas (runs test) para evaluar aleatoriedad.
     
     Args:
         sequence (list or array): Lista de valores binarios (0/1) o cualquier valor numérico.
         alpha (float): Nivel de significancia para la prueba (default=0.05).
+        exacto (bool): Si es True, el valor p sale de la distribución exacta del
+            número de rachas en lugar de la aproximación normal.
 
     Returns:
         dict: Resultados estadísticos de la prueba.
     """
     # Si no es binaria, convertir a secuencia de arriba/abajo respecto a la media
     sequence = np.array(sequence)
-    if not set(sequence).issubset({0, 1}):
+    if not np.all((sequence == 0) | (sequence == 1)):
         median = np.median(sequence)
         sequence = np.where(sequence >= median, 1, 0)
 
-    # Contar número de rachas
-    runs = 1  # al menos una racha
-    for i in range(1, len(sequence)):
-        if sequence[i] != sequence[i - 1]:
-            runs += 1
+    # Contar número de rachas (al menos una racha + cada cambio de valor)
+    runs = 1 + int(np.count_nonzero(sequence[1:] != sequence[:-1]))
 
     n1 = np.sum(sequence == 1)
     n0 = np.sum(sequence == 0)
@@ -41,7 +49,10 @@ def runs_test(sequence, alpha=0.05):
     z = (runs - mean_runs) / np.sqrt(var_runs)
 
     # Valor p (dos colas)
-    p_value = 2 * (1 - norm.cdf(abs(z)))
+    if exacto:
+        p_value = float(valor_p_rachas_exacto(runs, n1, n0))
+    else:
+        p_value = 2 * (1 - norm.cdf(abs(z)))
 
     result = {
         "n1 (unos)": int(n1),
@@ -51,12 +62,419 @@ def runs_test(sequence, alpha=0.05):
         "Varianza esperada": var_runs,
         "Estadístico Z": z,
         "Valor p": p_value,
+        "Método": "Exacto" if exacto else "Normal",
         "Conclusión": "Aleatoria" if p_value > alpha else "No aleatoria",
         "Nivel de significancia": alpha
     }
 
     return result
 
+
+def _distribucion_rachas(n1, n0):
+    """
+    Probabilidades exactas P(R = r), r = 0..n1+n0, del número de rachas
+    dados n1 unos y n0 ceros (todas las ordenaciones equiprobables).
+    Se calcula con enteros exactos y se divide al final.
+    """
+    total = math.comb(n1 + n0, n1)
+    probabilidades = np.zeros(n1 + n0 + 1)
+    for r in range(2, n1 + n0 + 1):
+        k = r // 2
+        if r % 2 == 0:
+            formas = 2 * math.comb(n1 - 1, k - 1) * math.comb(n0 - 1, k - 1)
+        else:
+            formas = (math.comb(n1 - 1, k) * math.comb(n0 - 1, k - 1)
+                      + math.comb(n1 - 1, k - 1) * math.comb(n0 - 1, k))
+        probabilidades[r] = formas / total
+    return probabilidades
+
+
+@lru_cache(maxsize=4096)
+def _colas_rachas(n1, n0):
+    """
+    Matriz (n1+n0+1) x 2 con P(R <= r) y P(R >= r). La distribución es
+    simétrica en (n1, n0), así que se guarda una sola vez por par. Si hay
+    una tabla cargada desde disco que cubre el par, se lee de ella.
+    """
+    a, b = sorted((int(n1), int(n0)))
+    if _TABLA_RACHAS is not None and a + b < _TABLA_RACHAS.shape[1]:
+        return np.array(_TABLA_RACHAS[a, b, :a + b + 1])
+
+    probabilidades = _distribucion_rachas(a, b)
+    colas = np.column_stack([np.cumsum(probabilidades),
+                             np.cumsum(probabilidades[::-1])[::-1]])
+    colas.flags.writeable = False
+    return colas
+
+
+def valor_p_rachas_exacto(rachas, n1, n0):
+    """
+    Valor p exacto de dos colas, min(1, 2 * min(P(R <= r), P(R >= r))).
+
+    Acepta escalares o arrays. Cada par (n1, n0) distinto se calcula una sola
+    vez y queda en una caché LRU en memoria; las llamadas siguientes son una
+    consulta a la tabla. Devuelve NaN cuando n1 == 0 o n0 == 0.
+    """
+    rachas, n1, n0 = np.broadcast_arrays(*(np.asarray(v, dtype=np.int64) for v in (rachas, n1, n0)))
+    p_value = np.full(rachas.shape, np.nan)
+
+    validas = (n1 > 0) & (n0 > 0)
+    pares, grupo = np.unique(np.stack([np.minimum(n1, n0)[validas], np.maximum(n1, n0)[validas]]),
+                             axis=1, return_inverse=True)
+    orden = np.argsort(grupo, kind="stable")
+    cortes = np.cumsum(np.bincount(grupo, minlength=pares.shape[1]))[:-1]
+    posiciones = np.flatnonzero(validas.ravel())
+
+    for (a, b), indices in zip(pares.T, np.split(orden, cortes)):
+        colas = _colas_rachas(int(a), int(b))
+        r = rachas.ravel()[posiciones[indices]]
+        p_value.ravel()[posiciones[indices]] = np.minimum(1.0, 2 * colas[r].min(axis=1))
+
+    return p_value[()] if p_value.ndim == 0 else p_value
+
+
+def guardar_tabla_rachas(ruta, n_max=100):
+    """
+    Precalcula las colas exactas para todos los pares con n1 + n0 <= n_max
+    y las guarda en un archivo .npy de forma (n_max//2+1, n_max+1, n_max+1, 2)
+    indexado por [min(n1, n0), max(n1, n0), r, cola].
+    """
+    tabla = np.full((n_max // 2 + 1, n_max + 1, n_max + 1, 2), np.nan)
+    for a in range(1, n_max // 2 + 1):
+        for b in range(a, n_max - a + 1):
+            tabla[a, b, :a + b + 1] = _colas_rachas(a, b)
+    np.save(ruta, tabla)
+
+
+def cargar_tabla_rachas(ruta):
+    """
+    Carga (como memory-map de solo lectura) una tabla creada con
+    guardar_tabla_rachas para que las pruebas exactas la consulten.
+    """
+    global _TABLA_RACHAS
+    _TABLA_RACHAS = np.load(ruta, mmap_mode="r")
+    _colas_rachas.cache_clear()
+
+
+def _empaquetar_secuencias(secuencias):
+    """
+    Convierte una matriz 2-D o una lista de secuencias de distinta longitud
+    en una matriz rellena con NaN y su máscara de posiciones válidas.
+    """
+    if isinstance(secuencias, np.ndarray) and secuencias.ndim == 2:
+        matriz = secuencias.astype(float, copy=False)
+        validos = np.ones(matriz.shape, dtype=bool)
+        return matriz, validos, False
+
+    filas = [np.asarray(s, dtype=float).ravel() for s in secuencias]
+    longitudes = np.array([len(f) for f in filas])
+    if len(filas) and np.all(longitudes == longitudes[0]):
+        matriz = np.stack(filas)
+        return matriz, np.ones(matriz.shape, dtype=bool), False
+
+    ancho = int(longitudes.max()) if len(filas) else 0
+    validos = np.arange(ancho) < longitudes[:, None]
+    matriz = np.full((len(filas), ancho), np.nan)
+    if len(filas):
+        matriz[validos] = np.concatenate(filas)
+    return matriz, validos, True
+
+
+def _contar_rachas_lote(matriz, validos, umbral):
+    """
+    Binariza cada fila respecto a su umbral (1 si >= umbral) y cuenta rachas,
+    unos y ceros considerando solo las posiciones válidas.
+    """
+    binaria = (matriz >= umbral[:, None]) & validos
+    longitudes = validos.sum(axis=1)
+
+    # Cada cambio entre posiciones válidas consecutivas abre una racha nueva
+    cambios = (binaria[:, 1:] != binaria[:, :-1]) & validos[:, 1:]
+    rachas = np.where(longitudes > 0, 1 + np.count_nonzero(cambios, axis=1), 0)
+
+    n1 = np.count_nonzero(binaria, axis=1)
+    n0 = longitudes - n1
+    return rachas, n1, n0
+
+
+def _estadisticos_rachas(rachas, n1, n0):
+    """
+    Media, varianza, Z y valor p (dos colas) de la aproximación normal del
+    número de rachas. Acepta escalares o arrays; las filas con n1 == 0 o
+    n0 == 0 devuelven NaN.
+    """
+    n1 = np.asarray(n1, dtype=float)
+    n0 = np.asarray(n0, dtype=float)
+    n = n1 + n0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = (2 * n1 * n0) / n + 1
+        varianza = (2 * n1 * n0 * (2 * n1 * n0 - n1 - n0)) / (n ** 2 * (n - 1))
+        z = (rachas - media) / np.sqrt(varianza)
+    p_value = 2 * norm.sf(np.abs(z))
+    invalidas = (n1 == 0) | (n0 == 0)
+    if np.any(invalidas):
+        media, varianza, z, p_value = (
+            np.where(invalidas, np.nan, v) for v in (media, varianza, z, p_value)
+        )
+    return media, varianza, z, p_value
+
+
+def runs_test_lote(secuencias, alpha=0.05, referencia=None, exacto=False):
+    """
+    Prueba de rachas vectorizada para muchas secuencias a la vez.
+
+    Args:
+        secuencias (2-D array or list of lists): Una secuencia por fila. Las
+            filas pueden tener distinta longitud (listas irregulares).
+        alpha (float): Nivel de significancia para la prueba (default=0.05).
+        referencia (float, array or None): Umbral para binarizar (1 si >= referencia).
+            Puede ser un escalar o un valor por fila. Si es None, se sigue el
+            criterio de runs_test: las filas binarias (0/1) se usan tal cual y
+            el resto se binariza respecto a su mediana.
+        exacto (bool): Si es True, valores p de la distribución exacta
+            (ver valor_p_rachas_exacto).
+
+    Returns:
+        dict: Resultados por fila como arrays. Las filas que no contienen ambos
+        valores tienen Z y valor p NaN y "Aleatoria" en False.
+    """
+    matriz, validos, irregular = _empaquetar_secuencias(secuencias)
+
+    if referencia is None:
+        es_binaria = np.all((matriz == 0) | (matriz == 1) | ~validos, axis=1)
+        if np.all(es_binaria):
+            umbral = np.ones(matriz.shape[0])
+        else:
+            mediana = np.nanmedian(matriz, axis=1) if irregular else np.median(matriz, axis=1)
+            umbral = np.where(es_binaria, 1.0, mediana)
+    else:
+        umbral = np.broadcast_to(np.asarray(referencia, dtype=float), (matriz.shape[0],))
+
+    rachas, n1, n0 = _contar_rachas_lote(matriz, validos, umbral)
+    media, varianza, z, p_value = _estadisticos_rachas(rachas, n1, n0)
+    if exacto:
+        p_value = valor_p_rachas_exacto(rachas, n1, n0)
+
+    return {
+        "n1 (unos)": n1,
+        "n0 (ceros)": n0,
+        "Número de rachas observadas": rachas,
+        "Media esperada": media,
+        "Varianza esperada": varianza,
+        "Estadístico Z": z,
+        "Valor p": p_value,
+        "Aleatoria": p_value > alpha,
+        "Nivel de significancia": alpha
+    }
+
+
+class RachasMovil:
+    """
+    Prueba de rachas sobre una ventana deslizante con las últimas `ventana`
+    observaciones de una serie en vivo.
+
+    Cada observación nueva actualiza en O(1) el número de unos y de cambios
+    (rachas - 1): se suma el cambio con la observación anterior y se resta
+    el de la observación que sale de la ventana. El umbral es fijo; una
+    mediana móvil cambiaría la binarización de toda la ventana en cada paso.
+
+    Args:
+        ventana (int): Número de observaciones de la ventana (>= 2).
+        referencia (float or None): Umbral (1 si >= referencia). Si es None,
+            los datos se consideran binarios (1 si el valor es distinto de 0).
+        alpha (float): Nivel de significancia para la prueba (default=0.05).
+    """
+
+    def __init__(self, ventana, referencia=None, alpha=0.05):
+        if ventana < 2:
+            raise ValueError("La ventana debe tener al menos 2 observaciones.")
+        self.ventana = int(ventana)
+        self.referencia = referencia
+        self.alpha = alpha
+        self._buffer = np.zeros(self.ventana, dtype=bool)
+        self._inicio = 0
+        self._cuenta = 0
+        self._unos = 0
+        self._cambios = 0
+
+    @property
+    def completa(self):
+        return self._cuenta == self.ventana
+
+    def _binarizar(self, valores):
+        valores = np.asarray(valores)
+        if self.referencia is None:
+            return valores != 0
+        return valores >= self.referencia
+
+    def agregar(self, valor):
+        """
+        Incorpora una observación y devuelve (Z, valor p) de la ventana
+        actual; ambos son NaN mientras la ventana no esté completa.
+        """
+        nuevo = bool(self._binarizar(valor))
+        v = self.ventana
+
+        if self._cuenta:
+            self._cambios += nuevo != bool(self._buffer[(self._inicio + self._cuenta - 1) % v])
+        if self._cuenta == v:
+            viejo = bool(self._buffer[self._inicio])
+            self._unos -= viejo
+            self._cambios -= viejo != bool(self._buffer[(self._inicio + 1) % v])
+            self._buffer[self._inicio] = nuevo
+            self._inicio = (self._inicio + 1) % v
+        else:
+            self._buffer[(self._inicio + self._cuenta) % v] = nuevo
+            self._cuenta += 1
+        self._unos += nuevo
+
+        n1, n0 = self._unos, v - self._unos
+        if not self.completa or n1 == 0 or n0 == 0:
+            return math.nan, math.nan
+
+        # Versión escalar de _estadisticos_rachas, sin la sobrecarga de NumPy
+        media = (2 * n1 * n0) / v + 1
+        varianza = (2 * n1 * n0 * (2 * n1 * n0 - v)) / (v ** 2 * (v - 1))
+        if varianza <= 0:
+            return math.nan, math.nan
+        z = (self._cambios + 1 - media) / math.sqrt(varianza)
+        return z, math.erfc(abs(z) / math.sqrt(2))
+
+    def agregar_lote(self, valores):
+        """
+        Incorpora un array de observaciones y devuelve, para cada una, los
+        resultados de la ventana que termina en ella.
+
+        Se calcula con sumas acumuladas de unos y de cambios sobre la cola
+        de la ventana anterior más los datos nuevos, sin bucle en Python.
+
+        Returns:
+            dict: Arrays de la misma longitud que `valores`. Z y valor p son
+            NaN en las posiciones donde la ventana todavía no está completa.
+        """
+        nuevos = self._binarizar(valores).ravel()
+        v = self.ventana
+        previos = self._buffer[(self._inicio + np.arange(self._cuenta)) % v]
+        serie = np.concatenate([previos, nuevos])
+
+        unos_acum = np.concatenate([[0], np.cumsum(serie)])
+        cambios_acum = np.concatenate([[0], np.cumsum(serie[1:] != serie[:-1])])
+
+        fin = len(previos) + np.arange(len(nuevos))
+        inicio = np.maximum(fin - v + 1, 0)
+        n1 = unos_acum[fin + 1] - unos_acum[inicio]
+        n0 = fin - inicio + 1 - n1
+        rachas = cambios_acum[fin] - cambios_acum[inicio] + 1
+
+        media, varianza, z, p_value = _estadisticos_rachas(rachas, n1, n0)
+        incompletas = fin - inicio + 1 < v
+        z = np.where(incompletas, np.nan, z)
+        p_value = np.where(incompletas, np.nan, p_value)
+
+        # El estado queda con la última ventana
+        cola = serie[-v:]
+        self._buffer[:len(cola)] = cola
+        self._inicio = 0
+        self._cuenta = len(cola)
+        self._unos = int(np.count_nonzero(cola))
+        self._cambios = int(np.count_nonzero(cola[1:] != cola[:-1]))
+
+        return {
+            "n1 (unos)": n1,
+            "n0 (ceros)": n0,
+            "Número de rachas observadas": rachas,
+            "Estadístico Z": z,
+            "Valor p": p_value,
+            "Aleatoria": p_value > self.alpha
+        }
+
+def verificar_rachas_lote(semilla=0, tolerancia=1e-10):
+    """
+    Compara runs_test_lote (matriz y lista irregular, umbral en la mediana)
+    con runstest_1samp de statsmodels fila por fila. Lanza AssertionError si
+    Z o el valor p difieren en más de la tolerancia relativa.
+    """
+    from statsmodels.sandbox.stats.runs import runstest_1samp
+
+    rng = np.random.default_rng(semilla)
+    matriz = rng.normal(size=(40, 31))
+    irregulares = [rng.normal(size=n) for n in rng.integers(10, 60, 40)]
+    for secuencias in (matriz, irregulares):
+        resultado = runs_test_lote(secuencias)
+        for i, fila in enumerate(secuencias):
+            z_ref, p_ref = runstest_1samp(fila, cutoff=np.median(fila), correction=False)
+            assert np.isclose(resultado["Estadístico Z"][i], z_ref, rtol=tolerancia, atol=0), (
+                "Z no coincide con statsmodels.")
+            assert np.isclose(resultado["Valor p"][i], p_ref, rtol=tolerancia, atol=0), (
+                "El valor p no coincide con statsmodels.")
+
+
+def verificar_rachas_movil(semilla=0, ventana=25, tolerancia=1e-10):
+    """
+    Compara RachasMovil (agregar y agregar_lote alternados) con
+    runstest_1samp de statsmodels sobre cada ventana completa. Lanza
+    AssertionError si Z o el valor p difieren en más de la tolerancia.
+    """
+    from statsmodels.sandbox.stats.runs import runstest_1samp
+
+    rng = np.random.default_rng(semilla)
+    serie = rng.normal(size=200)
+    monitor = RachasMovil(ventana, referencia=0.0)
+    resultados = [monitor.agregar(v) for v in serie[:40]]
+    lote = monitor.agregar_lote(serie[40:150])
+    resultados += list(zip(lote["Estadístico Z"], lote["Valor p"]))
+    resultados += [monitor.agregar(v) for v in serie[150:]]
+
+    for fin, (z, p_value) in enumerate(resultados):
+        if fin < ventana - 1:
+            assert np.isnan(z) and np.isnan(p_value), "Hubo resultado con la ventana incompleta."
+            continue
+        z_ref, p_ref = runstest_1samp(serie[fin - ventana + 1:fin + 1], cutoff=0.0, correction=False)
+        assert np.isclose(z, z_ref, rtol=tolerancia, atol=0), "Z no coincide con statsmodels."
+        assert np.isclose(p_value, p_ref, rtol=1e-8, atol=0), "El valor p no coincide con statsmodels."
+
+
+def verificar_rachas_exacto(tolerancia=1e-12):
+    """
+    Compara valor_p_rachas_exacto con la enumeración de todas las
+    ordenaciones de n1 unos y n0 ceros (n1 + n0 <= 12), calculado en memoria
+    y desde una tabla guardada y cargada de disco. Lanza AssertionError si
+    algún valor p difiere en más de la tolerancia.
+    """
+    global _TABLA_RACHAS
+    casos = []
+    for n1 in range(1, 8):
+        for n0 in range(1, 13 - n1):
+            conteos = np.zeros(n1 + n0 + 1)
+            for unos in itertools.combinations(range(n1 + n0), n1):
+                secuencia = np.zeros(n1 + n0, dtype=bool)
+                secuencia[list(unos)] = True
+                conteos[1 + np.count_nonzero(secuencia[1:] != secuencia[:-1])] += 1
+            probabilidades = conteos / conteos.sum()
+            for r in np.flatnonzero(conteos):
+                referencia = min(1.0, 2 * min(probabilidades[:r + 1].sum(), probabilidades[r:].sum()))
+                casos.append((r, n1, n0, referencia))
+    rachas, n1, n0, referencia = (np.array(v) for v in zip(*casos))
+
+    anterior = _TABLA_RACHAS
+    try:
+        _TABLA_RACHAS = None
+        _colas_rachas.cache_clear()
+        assert np.allclose(valor_p_rachas_exacto(rachas, n1, n0), referencia, rtol=0, atol=tolerancia), (
+            "El valor p exacto no coincide con la enumeración.")
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, "rachas.npy")
+            guardar_tabla_rachas(ruta, n_max=12)
+            cargar_tabla_rachas(ruta)
+            assert np.allclose(valor_p_rachas_exacto(rachas, n1, n0), referencia, rtol=0, atol=tolerancia), (
+                "El valor p de la tabla en disco no coincide con la enumeración.")
+            # Soltar el memory-map antes de borrar la carpeta
+            _TABLA_RACHAS = None
+    finally:
+        _TABLA_RACHAS = anterior
+        _colas_rachas.cache_clear()
+
+
 # Ejemplo de uso:
 if __name__ == "__main__":
     # Puedes probar con una secuencia binaria o numérica
@@ -65,3 +483,7 @@ if __name__ == "__main__":
     
     for k, v in resultados.items():
         print(f"{k}: {v}")
+
+    verificar_rachas_lote()
+    verificar_rachas_movil()
+    verificar_rachas_exacto()
@@ -1,7 +1,17 @@
+import itertools
+import os
+import sys
+import tempfile
+
 import numpy as np
 from scipy.stats import norm
 
-def runs_test_numericos(datos, alpha=0.05, referencia=None):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aletoriedad import (_contar_rachas_lote, _empaquetar_secuencias, _estadisticos_rachas,
+                         valor_p_rachas_exacto)
+from valores_criticos import valor_critico
+
+def runs_test_numericos(datos, alpha=0.05, referencia=None, exacto=False):
     """
     Prueba de rachas para secuencia numérica (aleatoriedad).
     
@@ -9,6 +19,8 @@ def runs_test_numericos(datos, alpha=0.05, referencia=None):
         datos (list): Lista de valores numéricos.
         alpha (float): Nivel de significancia (por defecto 0.05).
         referencia (float or None): Umbral de referencia. Si es None, se usa la mediana.
+        exacto (bool): Si es True, el valor p sale de la distribución exacta del
+            número de rachas en lugar de la aproximación normal.
 
     Returns:
         dict: Resultados estadísticos de la prueba.
@@ -23,10 +35,7 @@ def runs_test_numericos(datos, alpha=0.05, referencia=None):
     binaria = np.where(datos >= referencia, 1, 0)
 
     # Contar rachas
-    rachas = 1
-    for i in range(1, len(binaria)):
-        if binaria[i] != binaria[i - 1]:
-            rachas += 1
+    rachas = 1 + int(np.count_nonzero(binaria[1:] != binaria[:-1]))
 
     a = np.sum(binaria == 1)  # número de unos (≥ referencia)
     b = np.sum(binaria == 0)  # número de ceros (< referencia)
@@ -40,8 +49,11 @@ def runs_test_numericos(datos, alpha=0.05, referencia=None):
     media = (2 * a * b) / (a + b) + 1
     varianza = (2 * a * b * (2 * a * b - a - b)) / ((a + b)**2 * (a + b - 1))
     z = (rachas - media) / np.sqrt(varianza)
-    p_value = 2 * (1 - norm.cdf(abs(z)))
-    z_critico = norm.ppf(1 - alpha / 2)
+    if exacto:
+        p_value = float(valor_p_rachas_exacto(rachas, a, b))
+    else:
+        p_value = 2 * (1 - norm.cdf(abs(z)))
+    z_critico = valor_critico('norm', alpha)
 
     return {
         "Referencia usada": referencia,
@@ -55,9 +67,289 @@ def runs_test_numericos(datos, alpha=0.05, referencia=None):
         "Z calculado": z,
         "Z crítico": z_critico,
         "p-value": p_value,
+        "Método": "Exacto" if exacto else "Normal",
+        "Conclusión": "Aleatoria" if p_value > alpha else "No aleatoria"
+    }
+
+
+def runs_test_numericos_lote(datos, alpha=0.05, referencia=None, exacto=False):
+    """
+    Prueba de rachas numérica para muchas secuencias en una sola pasada.
+
+    Args:
+        datos (2-D array or list of lists): Una secuencia numérica por fila
+            (se admiten filas de distinta longitud).
+        alpha (float): Nivel de significancia (por defecto 0.05).
+        referencia (float, array or None): Umbral común o uno por fila. Si es
+            None, se usa la mediana de cada fila.
+        exacto (bool): Si es True, valores p de la distribución exacta.
+
+    Returns:
+        dict: Resultados por fila como arrays. Las filas sin ambos grupos
+        respecto al umbral tienen Z y p-value NaN.
+    """
+    matriz, validos, irregular = _empaquetar_secuencias(datos)
+
+    if referencia is None:
+        referencia = np.nanmedian(matriz, axis=1) if irregular else np.median(matriz, axis=1)
+    umbral = np.broadcast_to(np.asarray(referencia, dtype=float), (matriz.shape[0],))
+
+    rachas, a, b = _contar_rachas_lote(matriz, validos, umbral)
+    media, varianza, z, p_value = _estadisticos_rachas(rachas, a, b)
+    if exacto:
+        p_value = valor_p_rachas_exacto(rachas, a, b)
+
+    return {
+        "Referencia usada": umbral,
+        "Total de datos": a + b,
+        "Número de unos (≥ ref)": a,
+        "Número de ceros (< ref)": b,
+        "Número de rachas observadas": rachas,
+        "Media esperada de rachas": media,
+        "Varianza esperada": varianza,
+        "Z calculado": z,
+        "Z crítico": valor_critico('norm', alpha),
+        "p-value": p_value,
+        "Aleatoria": p_value > alpha
+    }
+
+
+_SIGNO = np.uint64(1 << 63)
+
+
+def _bloques_archivo(ruta, formato=None, dtype="float64", columna=0, tam_bloque=1_000_000):
+    """
+    Devuelve una función que, cada vez que se llama, recorre el archivo en
+    bloques de a lo sumo tam_bloque valores (float64). Los binarios se leen
+    con np.memmap; los CSV, línea a línea tomando la columna indicada.
+    """
+    if formato is None:
+        formato = "csv" if os.path.splitext(ruta)[1].lower() in (".csv", ".txt") else "bin"
+    if formato not in ("csv", "bin"):
+        raise ValueError("El formato debe ser 'csv' o 'bin'.")
+
+    def bloques_bin():
+        if os.path.getsize(ruta) == 0:
+            return
+        mapa = np.memmap(ruta, dtype=dtype, mode="r")
+        for inicio in range(0, len(mapa), tam_bloque):
+            yield np.asarray(mapa[inicio:inicio + tam_bloque], dtype=np.float64)
+
+    def bloques_csv():
+        with open(ruta) as f:
+            while True:
+                lineas = list(itertools.islice(f, tam_bloque))
+                if not lineas:
+                    return
+                yield np.loadtxt(lineas, delimiter=",", usecols=columna, ndmin=1, dtype=np.float64)
+
+    return bloques_csv if formato == "csv" else bloques_bin
+
+
+def _claves_ordenables(valores):
+    """Transforma float64 en uint64 que conservan el orden numérico."""
+    bits = np.ascontiguousarray(valores, dtype=np.float64).view(np.uint64)
+    return np.where(bits & _SIGNO, ~bits, bits | _SIGNO)
+
+
+def _valor_de_clave(clave):
+    clave = np.uint64(clave)
+    bits = clave ^ _SIGNO if clave & _SIGNO else ~clave
+    return float(np.array([bits], dtype=np.uint64).view(np.float64)[0])
+
+
+def _mediana_por_seleccion(bloques, limite):
+    """
+    Mediana exacta (igual a np.median) sin cargar todos los datos.
+
+    Selección por radix sobre claves de 64 bits: cada recorrido cuenta los
+    16 bits siguientes de las claves que siguen siendo candidatas y se queda
+    con la cubeta que contiene el elemento central. Cuando la cubeta cabe en
+    `limite` valores se carga y se resuelve con np.partition. Con datos
+    reales suele bastar un recorrido de conteo y uno de recolección.
+
+    Returns:
+        tuple: (mediana, número total de datos)
+    """
+    n = 0
+    prefijo, desplazamiento, debajo, en_rango = 0, 64, 0, None
+    k_bajo = k_alto = 0
+
+    while en_rango is None or (en_rango > limite and desplazamiento > 0):
+        desplazamiento -= 16
+        histograma = np.zeros(1 << 16, dtype=np.int64)
+        for bloque in bloques():
+            claves = _claves_ordenables(bloque)
+            if en_rango is None:
+                n += len(claves)
+            else:
+                claves = claves[(claves >> (desplazamiento + 16)) == prefijo]
+            cubetas = ((claves >> desplazamiento) & 0xFFFF).astype(np.intp)
+            histograma += np.bincount(cubetas, minlength=1 << 16)
+
+        if en_rango is None:
+            if n == 0:
+                raise ValueError("El archivo no contiene datos.")
+            k_bajo, k_alto = (n - 1) // 2, n // 2
+
+        acumulado = np.cumsum(histograma)
+        cubeta = int(np.searchsorted(acumulado, k_bajo - debajo, side="right"))
+        debajo += int(acumulado[cubeta] - histograma[cubeta])
+        prefijo = (prefijo << 16) | cubeta
+        en_rango = int(histograma[cubeta])
+
+    # Último recorrido: recolectar la cubeta y el mínimo por encima de ella
+    # (necesario si n es par y el segundo elemento central cae fuera).
+    candidatos = []
+    minimo_superior = np.inf
+    for bloque in bloques():
+        grupo = _claves_ordenables(bloque) >> desplazamiento
+        if desplazamiento > 0:
+            candidatos.append(bloque[grupo == prefijo])
+        superiores = bloque[grupo > prefijo]
+        if superiores.size:
+            minimo_superior = min(minimo_superior, float(superiores.min()))
+
+    i_bajo, i_alto = k_bajo - debajo, k_alto - debajo
+    if desplazamiento > 0:
+        candidatos = np.concatenate(candidatos)
+        posiciones = [i_bajo, i_alto] if i_alto < en_rango else [i_bajo]
+        candidatos = np.partition(candidatos, posiciones)
+        v_bajo = candidatos[i_bajo]
+        v_alto = candidatos[i_alto] if i_alto < en_rango else minimo_superior
+    else:
+        # La cubeta es una única clave: todos sus valores son iguales
+        v_bajo = _valor_de_clave(prefijo)
+        v_alto = v_bajo if i_alto < en_rango else minimo_superior
+
+    return (v_bajo + v_alto) / 2, n
+
+
+def _contar_rachas_bloques(bloques, umbrales):
+    """
+    Cuenta rachas y unos para uno o varios umbrales en un solo recorrido,
+    arrastrando el último valor binario entre bloques consecutivos.
+    """
+    umbrales = np.atleast_1d(np.asarray(umbrales, dtype=float))
+    rachas = np.zeros(len(umbrales), dtype=np.int64)
+    unos = np.zeros(len(umbrales), dtype=np.int64)
+    n = 0
+    ultimo = None
+
+    for bloque in bloques:
+        if not len(bloque):
+            continue
+        binaria = bloque[None, :] >= umbrales[:, None]
+        rachas += np.count_nonzero(binaria[:, 1:] != binaria[:, :-1], axis=1)
+        rachas += 1 if ultimo is None else (binaria[:, 0] != ultimo)
+        ultimo = binaria[:, -1]
+        unos += np.count_nonzero(binaria, axis=1)
+        n += len(bloque)
+
+    return rachas, unos, n
+
+
+def runs_test_numericos_stream(ruta, alpha=0.05, referencia=None, modo="exacto",
+                               formato=None, dtype="float64", columna=0,
+                               tam_bloque=1_000_000, num_candidatos=33):
+    """
+    Prueba de rachas numérica sobre un archivo más grande que la memoria.
+
+    Args:
+        ruta (str): Archivo binario (leído con np.memmap) o CSV.
+        alpha (float): Nivel de significancia (por defecto 0.05).
+        referencia (float or None): Umbral de referencia. Si se da, basta una
+            sola pasada en cualquier modo.
+        modo (str): Cómo obtener la mediana cuando referencia es None:
+            - 'exacto': primero se busca la mediana exacta por selección
+              (ver _mediana_por_seleccion) y después se cuentan las rachas.
+            - 'una_pasada': se toman num_candidatos cuantiles del primer bloque
+              como umbrales candidatos, se cuentan las rachas de todos ellos en
+              el mismo recorrido y se usa el candidato cuyo número de unos
+              quede más cerca de n/2. La prueba es exacta para el umbral
+              elegido; "Cuantil de la referencia" indica cuánto se aleja de
+              la mediana real.
+        formato (str or None): 'bin' o 'csv'. Si es None se deduce de la extensión.
+        dtype (str): Tipo de dato de los archivos binarios.
+        columna (int): Columna a usar en los CSV.
+        tam_bloque (int): Valores por bloque; acota la memoria usada.
+        num_candidatos (int): Umbrales candidatos en el modo 'una_pasada'.
+
+    Returns:
+        dict: Resultados estadísticos de la prueba.
+    """
+    if modo not in ("exacto", "una_pasada"):
+        raise ValueError("El modo debe ser 'exacto' o 'una_pasada'.")
+
+    bloques = _bloques_archivo(ruta, formato, dtype, columna, tam_bloque)
+
+    if referencia is not None:
+        candidatos = [referencia]
+    elif modo == "exacto":
+        referencia, _ = _mediana_por_seleccion(bloques, tam_bloque)
+        candidatos = [referencia]
+    else:
+        primero = next(iter(bloques()), np.empty(0))
+        if not len(primero):
+            raise ValueError("El archivo no contiene datos.")
+        candidatos = np.unique(np.quantile(primero, np.linspace(0.02, 0.98, num_candidatos)))
+
+    rachas, unos, n = _contar_rachas_bloques(bloques(), candidatos)
+    elegido = int(np.argmin(np.abs(2 * unos - n)))
+    referencia = float(np.atleast_1d(candidatos)[elegido])
+    rachas, a = int(rachas[elegido]), int(unos[elegido])
+    b = n - a
+
+    if a == 0 or b == 0:
+        return {
+            "error": "La secuencia no tiene ambos grupos respecto al umbral; no se puede aplicar la prueba de rachas."
+        }
+
+    media, varianza, z, p_value = (float(v) for v in _estadisticos_rachas(rachas, a, b))
+    z_critico = valor_critico('norm', alpha)
+
+    return {
+        "Referencia usada": referencia,
+        "Cuantil de la referencia": b / n,
+        "Modo": modo,
+        "Total de datos": n,
+        "Número de unos (≥ ref)": a,
+        "Número de ceros (< ref)": b,
+        "Número de rachas observadas": rachas,
+        "Media esperada de rachas": media,
+        "Varianza esperada": varianza,
+        "Z calculado": z,
+        "Z crítico": z_critico,
+        "p-value": p_value,
         "Conclusión": "Aleatoria" if p_value > alpha else "No aleatoria"
     }
 
+def verificar_stream(semilla=0, tolerancia=1e-10):
+    """
+    Compara runs_test_numericos_stream en modo exacto, sobre archivos binario
+    y CSV leídos en bloques pequeños, con runstest_1samp de statsmodels en
+    la mediana de los datos en memoria (n par, con empates y valores
+    negativos). Lanza AssertionError si la mediana, Z o el valor p no
+    coinciden.
+    """
+    from statsmodels.sandbox.stats.runs import runstest_1samp
+
+    rng = np.random.default_rng(semilla)
+    datos = np.round(rng.normal(0, 50, 5000), 1)
+    z_ref, p_ref = runstest_1samp(datos, cutoff=np.median(datos), correction=False)
+    with tempfile.TemporaryDirectory() as carpeta:
+        binario, csv = os.path.join(carpeta, "datos.bin"), os.path.join(carpeta, "datos.csv")
+        datos.tofile(binario)
+        np.savetxt(csv, datos, delimiter=",")
+        for ruta in (binario, csv):
+            resultado = runs_test_numericos_stream(ruta, tam_bloque=97)
+            assert resultado["Referencia usada"] == np.median(datos), "La mediana no coincide con np.median."
+            assert np.isclose(resultado["Z calculado"], z_ref, rtol=tolerancia, atol=0), (
+                "Z no coincide con statsmodels.")
+            assert np.isclose(resultado["p-value"], p_ref, rtol=tolerancia, atol=0), (
+                "El valor p no coincide con statsmodels.")
+
+
 # Ejemplo de uso:
 if __name__ == "__main__":
     datos = [13, 17, 15, 12, 14, 11, 10, 18, 16, 12]
@@ -65,3 +357,5 @@ if __name__ == "__main__":
 
     for k, v in resultado.items():
         print(f"{k}: {v}")
+
+    verificar_stream()
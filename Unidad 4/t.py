@@ -1,6 +1,14 @@
-from scipy.stats import ttest_ind, t
+import os
+import sys
+from functools import lru_cache
+
+from scipy.optimize import brentq
+from scipy.stats import norm, t, ttest_ind
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from valores_criticos import ajustar_valores_p, valor_critico, valor_p
+
 def prueba_t_independiente(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided', equal_var=True):
     """
     Prueba t para muestras independientes con valor crítico y conclusión.
@@ -36,13 +44,13 @@ def prueba_t_independiente(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided'
 
     # Valor crítico
     if alternativa == 'two-sided':
-        t_crit = t.ppf(1 - alpha / 2, df=gl)
+        t_crit = valor_critico('t', alpha, gl, 'two-sided')
         decision = abs(t_stat) > t_crit
     elif alternativa == 'less':
-        t_crit = t.ppf(alpha, df=gl)
+        t_crit = valor_critico('t', alpha, gl, 'less')
         decision = t_stat < t_crit
     elif alternativa == 'greater':
-        t_crit = t.ppf(1 - alpha, df=gl)
+        t_crit = valor_critico('t', alpha, gl, 'greater')
         decision = t_stat > t_crit
     else:
         raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
@@ -61,7 +69,401 @@ def prueba_t_independiente(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided'
 
     return t_stat, p_valor, gl, t_crit
 
-grupo_a = [20, 22, 19, 23, 21]
-grupo_b = [25, 27, 29, 26, 28]
 
-prueba_t_independiente(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided', equal_var=True)
+def _resumen_columnas(matriz):
+    """Conteo, media y varianza muestral (ddof=1) por columna, ignorando NaN."""
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim == 1:
+        matriz = matriz[:, None]
+    validos = ~np.isnan(matriz)
+    n = validos.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = np.where(validos, matriz, 0).sum(axis=0) / n
+        desvios = np.where(validos, matriz - media, 0)
+        varianza = (desvios ** 2).sum(axis=0) / (n - 1)
+    return n, media, varianza
+
+
+def _estadistico_t(n1, media1, var1, n2, media2, var2, equal_var):
+    """
+    Estadístico t y grados de libertad a partir de los resúmenes de cada
+    grupo (escalares o arrays): agrupado si equal_var, Welch si no.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if equal_var:
+            gl = n1 + n2 - 2
+            var_agrupada = ((n1 - 1) * var1 + (n2 - 1) * var2) / gl
+            error = np.sqrt(var_agrupada * (1 / n1 + 1 / n2))
+        else:
+            # Welch-Satterthwaite approximation
+            a, b = var1 / n1, var2 / n2
+            gl = (a + b) ** 2 / (a ** 2 / (n1 - 1) + b ** 2 / (n2 - 1))
+            error = np.sqrt(a + b)
+        t_stat = (media1 - media2) / error
+    return t_stat, gl
+
+
+def prueba_t_columnas(matriz_a, matriz_b, alpha=0.05, alternativa='two-sided', equal_var=True,
+                      ajuste='fdr_bh'):
+    """
+    Pruebas t independientes columna a columna para muchas métricas a la vez.
+
+    Parámetros:
+    - matriz_a, matriz_b: arrays (observaciones, métricas); los NaN se ignoran
+      y cada columna puede tener distinto número de observaciones
+    - alpha: nivel de significancia
+    - alternativa: 'two-sided', 'less', 'greater'
+    - equal_var: True si se asumen varianzas iguales, False para Welch
+    - ajuste: 'fdr_bh', 'holm', 'bonferroni' o None para la corrección por
+      comparaciones múltiples sobre todas las métricas
+
+    Retorna:
+    - diccionario con arrays por métrica: t, gl, valor p, valor crítico t,
+      valor p ajustado y decisión (valor p ajustado < alpha)
+    """
+    n1, media1, var1 = _resumen_columnas(matriz_a)
+    n2, media2, var2 = _resumen_columnas(matriz_b)
+    t_stat, gl = _estadistico_t(n1, media1, var1, n2, media2, var2, equal_var)
+
+    p_valor = valor_p('t', t_stat, gl, alternativa)
+    t_crit = valor_critico('t', alpha, gl, alternativa)
+    p_ajustado = ajustar_valores_p(p_valor, ajuste) if ajuste else p_valor
+
+    return {
+        "Estadístico t": t_stat,
+        "Grados de libertad": gl,
+        "Valor p": p_valor,
+        "Valor crítico t": t_crit,
+        "Valor p ajustado": p_ajustado,
+        "Rechaza H₀": p_ajustado < alpha
+    }
+
+
+def verificar_t_columnas(semilla=0, tolerancia=1e-10):
+    """
+    Compara prueba_t_columnas (con NaN y columnas de distinto tamaño) con
+    ttest_ind(nan_policy='omit') columna a columna, y los valores p
+    ajustados con multipletests de statsmodels. Lanza AssertionError si algo
+    difiere en más de la tolerancia relativa.
+    """
+    from statsmodels.stats.multitest import multipletests
+
+    rng = np.random.default_rng(semilla)
+    matriz_a = rng.normal(0, 1, (30, 12))
+    matriz_b = rng.normal(np.linspace(0, 1, 12), 2, (25, 12))
+    matriz_a[rng.random(matriz_a.shape) < 0.15] = np.nan
+    matriz_b[rng.random(matriz_b.shape) < 0.15] = np.nan
+    for equal_var in (True, False):
+        for alternativa in ('two-sided', 'less', 'greater'):
+            referencia = ttest_ind(matriz_a, matriz_b, equal_var=equal_var, alternative=alternativa,
+                                   nan_policy='omit')
+            for ajuste in ('fdr_bh', 'holm', 'bonferroni'):
+                resultado = prueba_t_columnas(matriz_a, matriz_b, equal_var=equal_var,
+                                              alternativa=alternativa, ajuste=ajuste)
+                assert np.allclose(resultado["Estadístico t"], referencia.statistic, rtol=tolerancia, atol=0), (
+                    "t no coincide con scipy.")
+                assert np.allclose(resultado["Valor p"], referencia.pvalue, rtol=tolerancia, atol=0), (
+                    "El valor p no coincide con scipy.")
+                ajustados = multipletests(np.asarray(referencia.pvalue), method=ajuste)[1]
+                assert np.allclose(resultado["Valor p ajustado"], ajustados, rtol=tolerancia, atol=0), (
+                    "El valor p ajustado no coincide con statsmodels.")
+
+
+class ResumenGrupo:
+    """
+    Estadísticos suficientes de un grupo para la prueba t: conteo, media y M2
+    (suma de cuadrados de desvíos), escalares o un valor por métrica.
+
+    Se actualiza por bloques en O(1) por bloque después de resumirlo y se
+    combina con el resumen de otro fragmento (otro archivo, worker o
+    proceso) con la fórmula de varianza en paralelo de Chan et al., así que
+    los datos crudos nunca tienen que reunirse en un solo nodo. Es un objeto
+    simple que se puede serializar con pickle.
+    """
+
+    def __init__(self, n=0, media=0.0, m2=0.0):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+
+    def _sumar(self, n_b, media_b, m2_b):
+        n = self.n + n_b
+        # Con conteos escalares un fragmento vacío no cambia nada y la
+        # fórmula dividiría por cero antes de llegar a np.where
+        if np.ndim(n) == 0 and n_b == 0:
+            return ResumenGrupo(self.n, self.media, self.m2)
+        delta = media_b - self.media
+        with np.errstate(divide="ignore", invalid="ignore"):
+            media = np.where(n > 0, self.media + delta * n_b / n, 0.0)
+            m2 = np.where(n > 0, self.m2 + m2_b + delta ** 2 * self.n * n_b / n, 0.0)
+        escalar = np.ndim(n) == 0
+        return ResumenGrupo(n if escalar else np.asarray(n),
+                            float(media) if escalar else media,
+                            float(m2) if escalar else m2)
+
+    def actualizar(self, datos):
+        """
+        Incorpora un bloque de observaciones (1-D, o (observaciones, métricas));
+        los NaN se ignoran.
+        """
+        datos = np.asarray(datos, dtype=float)
+        n_b, media_b, var_b = _resumen_columnas(datos)
+        media_b = np.where(n_b > 0, media_b, 0.0)
+        m2_b = np.where(n_b > 1, var_b * (n_b - 1), 0.0)
+        if datos.ndim == 1:
+            n_b, media_b, m2_b = int(n_b[0]), media_b[0], m2_b[0]
+        nuevo = self._sumar(n_b, media_b, m2_b)
+        self.n, self.media, self.m2 = nuevo.n, nuevo.media, nuevo.m2
+        return self
+
+    def combinar(self, otro):
+        """Devuelve un resumen nuevo con los datos de ambos fragmentos."""
+        return self._sumar(otro.n, otro.media, otro.m2)
+
+    __add__ = combinar
+
+    def __radd__(self, otro):
+        # sum(resumenes) empieza sumando 0
+        if isinstance(otro, int) and otro == 0:
+            return self
+        return NotImplemented
+
+    @property
+    def varianza(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.m2 / (self.n - 1)
+
+
+def verificar_resumen_grupo(semilla=0, tolerancia=1e-10):
+    """
+    Compara prueba_t_resumen sobre fragmentos combinados (incluidos
+    fragmentos vacíos y la suma de resúmenes vacíos) con scipy.stats.ttest_ind
+    sobre los datos completos, y lanza AssertionError si t o el valor p
+    difieren en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    grupo_a, grupo_b = rng.normal(10, 2, 37), rng.normal(11, 3, 23)
+    vacio = ResumenGrupo() + ResumenGrupo()
+    assert vacio.n == 0 and sum([ResumenGrupo(), ResumenGrupo()]).n == 0, "La suma de resúmenes vacíos falló."
+
+    fragmentos_a = [ResumenGrupo().actualizar(f) for f in np.split(grupo_a, [0, 10, 10, 30])]
+    fragmentos_b = [ResumenGrupo().actualizar(f) for f in np.split(grupo_b, [5, 23])]
+    for equal_var in (True, False):
+        t_stat, p_valor, _, _ = prueba_t_resumen(sum(fragmentos_a) + vacio, sum(fragmentos_b),
+                                                  equal_var=equal_var)
+        referencia = ttest_ind(grupo_a, grupo_b, equal_var=equal_var)
+        assert np.isclose(t_stat, referencia.statistic, rtol=tolerancia, atol=0), "t no coincide con scipy."
+        assert np.isclose(p_valor, referencia.pvalue, rtol=tolerancia, atol=0), "El valor p no coincide con scipy."
+
+
+def prueba_t_resumen(resumen_a, resumen_b, alpha=0.05, alternativa='two-sided', equal_var=True):
+    """
+    Prueba t para muestras independientes a partir de dos ResumenGrupo, con el
+    mismo t, gl, valor p y valor crítico que prueba_t_independiente (sin
+    imprimir). Con resúmenes por métrica devuelve arrays.
+
+    Retorna:
+    - Estadístico t
+    - Valor p
+    - Grados de libertad
+    - Valor crítico t
+    """
+    t_stat, gl = _estadistico_t(resumen_a.n, resumen_a.media, resumen_a.varianza,
+                                resumen_b.n, resumen_b.media, resumen_b.varianza, equal_var)
+    p_valor = valor_p('t', t_stat, gl, alternativa)
+    t_crit = valor_critico('t', alpha, gl, alternativa)
+    return t_stat, p_valor, gl, t_crit
+
+
+# Funciones de gasto de alfa de Lan-DeMets: alfa bilateral acumulado gastado
+# hasta la fracción de información tau (0 < tau <= 1). La de O'Brien-Fleming
+# gasta alpha/2 por cola con 2 - 2*Phi(z_{1-alpha/4} / sqrt(tau)).
+_FUNCIONES_GASTO = {
+    'obrien-fleming': lambda tau, alpha: 4 * norm.sf(norm.isf(alpha / 4) / np.sqrt(tau)),
+    'pocock': lambda tau, alpha: alpha * np.log(1 + (np.e - 1) * tau),
+}
+
+# Puntos de la malla para integrar la densidad del proceso entre revisiones
+_PUNTOS_MALLA = 1001
+
+
+@lru_cache(maxsize=128)
+def fronteras_secuenciales(revisiones, alpha=0.05, gasto='obrien-fleming'):
+    """
+    Fronteras Z bilaterales de un diseño secuencial por grupos con
+    `revisiones` revisiones equiespaciadas en información.
+
+    En cada revisión k la frontera c_k cumple que la probabilidad, bajo H₀,
+    de cruzarla por primera vez allí es igual al alfa gastado entre k-1 y k.
+    Se obtiene propagando la subdensidad de S_k = Z_k * sqrt(tau_k) (un
+    movimiento browniano) sobre una malla y resolviendo c_k con brentq. El
+    resultado queda en caché por (revisiones, alpha, gasto).
+
+    Retorna:
+    - tupla con las fronteras Z de cada revisión
+    """
+    if gasto not in _FUNCIONES_GASTO:
+        raise ValueError("El gasto debe ser 'obrien-fleming' o 'pocock'.")
+    tau = np.arange(1, revisiones + 1) / revisiones
+    gastado = _FUNCIONES_GASTO[gasto](tau, alpha)
+    incrementos = np.diff(np.concatenate([[0.0], gastado]))
+
+    fronteras = []
+    malla = densidad = None
+    tau_anterior = 0.0
+    for tau_k, alfa_k in zip(tau, incrementos):
+        desvio = np.sqrt(tau_k - tau_anterior)
+        if densidad is None:
+            frontera = norm.isf(alfa_k / 2)
+        else:
+            def exceso(c):
+                limite = c * np.sqrt(tau_k)
+                salida = norm.cdf((-limite - malla) / desvio) + norm.sf((limite - malla) / desvio)
+                return np.trapezoid(densidad * salida, malla) - alfa_k
+            frontera = brentq(exceso, 0.0, 40.0)
+        fronteras.append(float(frontera))
+
+        # Subdensidad de S_k dentro de la región de continuación
+        limite = frontera * np.sqrt(tau_k)
+        nueva = np.linspace(-limite, limite, _PUNTOS_MALLA)
+        if densidad is None:
+            densidad = norm.pdf(nueva, scale=np.sqrt(tau_k))
+        else:
+            nucleo = norm.pdf((nueva[:, None] - malla[None, :]) / desvio) / desvio
+            densidad = np.trapezoid(nucleo * densidad, malla, axis=1)
+        malla = nueva
+        tau_anterior = tau_k
+
+    return tuple(fronteras)
+
+
+class MonitorSecuencialT:
+    """
+    Monitoreo secuencial por grupos de una prueba t bilateral sobre datos que
+    llegan en vivo.
+
+    Los datos nuevos se agregan a dos ResumenGrupo (sin guardar la historia)
+    y cada revisión intermedia calcula t y gl desde los resúmenes en O(1).
+    El t se lleva a la escala Z conservando su probabilidad de cola y se
+    compara con la frontera de la revisión, precalculada con una función de
+    gasto de alfa (ver fronteras_secuenciales). Así el error tipo I total se
+    mantiene en alpha aunque se mire el experimento varias veces.
+
+    Args:
+        revisiones (int): Número planificado de revisiones.
+        alpha (float): Nivel de significancia global.
+        gasto (str): 'obrien-fleming' o 'pocock'.
+        equal_var (bool): True si se asumen varianzas iguales, False para Welch.
+    """
+
+    def __init__(self, revisiones, alpha=0.05, gasto='obrien-fleming', equal_var=True):
+        self.revisiones = revisiones
+        self.alpha = alpha
+        self.equal_var = equal_var
+        self.fronteras = fronteras_secuenciales(revisiones, alpha, gasto)
+        self.alfa_gastado = _FUNCIONES_GASTO[gasto](np.arange(1, revisiones + 1) / revisiones, alpha)
+        self.grupo_a = ResumenGrupo()
+        self.grupo_b = ResumenGrupo()
+        self.revision = 0
+        self.detenido = False
+
+    def actualizar(self, datos_a=None, datos_b=None):
+        """Incorpora observaciones nuevas de uno o ambos grupos."""
+        if datos_a is not None:
+            self.grupo_a.actualizar(datos_a)
+        if datos_b is not None:
+            self.grupo_b.actualizar(datos_b)
+        return self
+
+    def revisar(self):
+        """
+        Realiza la siguiente revisión intermedia planificada.
+
+        Mientras algún grupo tenga menos de 2 observaciones no hay varianza
+        que estimar: se devuelve un resultado sin decisión (t, gl, Z y valor
+        p en NaN, sin detener y sin gastar alfa) y la revisión planificada
+        no se consume.
+
+        Retorna:
+        - diccionario con t, gl, Z equivalente, frontera, alfa gastado y si
+          corresponde detener el experimento
+        """
+        if self.revision >= self.revisiones:
+            raise ValueError("Ya se realizaron todas las revisiones planificadas.")
+        k = self.revision
+
+        if np.any(np.asarray(self.grupo_a.n) < 2) or np.any(np.asarray(self.grupo_b.n) < 2):
+            return {
+                "Revisión": k + 1,
+                "Estadístico t": np.nan,
+                "Grados de libertad": np.nan,
+                "Z equivalente": np.nan,
+                "Frontera Z": self.fronteras[k],
+                "Valor p nominal": np.nan,
+                "Alfa gastado": float(self.alfa_gastado[k - 1]) if k else 0.0,
+                "Detener": False
+            }
+        self.revision += 1
+
+        t_stat, gl = _estadistico_t(self.grupo_a.n, self.grupo_a.media, self.grupo_a.varianza,
+                                    self.grupo_b.n, self.grupo_b.media, self.grupo_b.varianza,
+                                    self.equal_var)
+        p_nominal = 2 * t.sf(abs(t_stat), gl)
+        z = norm.isf(p_nominal / 2)
+        detener = bool(z >= self.fronteras[k])
+        self.detenido = self.detenido or detener
+
+        return {
+            "Revisión": k + 1,
+            "Estadístico t": float(t_stat),
+            "Grados de libertad": float(gl),
+            "Z equivalente": float(z),
+            "Frontera Z": self.fronteras[k],
+            "Valor p nominal": float(p_nominal),
+            "Alfa gastado": float(self.alfa_gastado[k]),
+            "Detener": detener
+        }
+
+
+# Fronteras publicadas de Lan-DeMets (O'Brien-Fleming, 5 revisiones, alpha = 0.05)
+_FRONTERAS_REFERENCIA = (4.8769, 3.3569, 2.6803, 2.2898, 2.0310)
+
+
+def verificar_monitor(semilla=0, tolerancia=1e-3):
+    """
+    Comprueba MonitorSecuencialT: sin decisión mientras algún grupo tiene
+    menos de 2 observaciones, t igual al de scipy.stats.ttest_ind en cada
+    revisión y fronteras iguales a las publicadas (hasta la tolerancia).
+    Lanza AssertionError si algo no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    monitor = MonitorSecuencialT(5)
+    assert np.allclose(monitor.fronteras, _FRONTERAS_REFERENCIA, rtol=0, atol=tolerancia), (
+        "Las fronteras no coinciden con las publicadas.")
+
+    for datos_a, datos_b in (([], []), ([1.0], [2.0, 3.0])):
+        resultado = monitor.actualizar(datos_a, datos_b).revisar()
+        assert np.isnan(resultado["Estadístico t"]) and not resultado["Detener"], "Hubo decisión sin datos."
+    assert monitor.revision == 0, "Una revisión sin datos consumió la revisión planificada."
+
+    grupo_a, grupo_b = [1.0], [2.0, 3.0]
+    for _ in range(5):
+        nuevos_a, nuevos_b = rng.normal(0, 1, 20), rng.normal(0.3, 1, 20)
+        grupo_a, grupo_b = np.concatenate([grupo_a, nuevos_a]), np.concatenate([grupo_b, nuevos_b])
+        resultado = monitor.actualizar(nuevos_a, nuevos_b).revisar()
+        referencia = ttest_ind(grupo_a, grupo_b)
+        assert np.isclose(resultado["Estadístico t"], referencia.statistic, rtol=1e-10, atol=0), (
+            "t no coincide con scipy.")
+        assert np.isclose(resultado["Valor p nominal"], referencia.pvalue, rtol=1e-8, atol=0), (
+            "El valor p no coincide con scipy.")
+
+
+if __name__ == "__main__":
+    grupo_a = [20, 22, 19, 23, 21]
+    grupo_b = [25, 27, 29, 26, 28]
+
+    prueba_t_independiente(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided', equal_var=True)
+
+    verificar_t_columnas()
+    verificar_resumen_grupo()
+    verificar_monitor()
@@ -1,6 +1,24 @@
-from scipy.stats import mannwhitneyu, norm
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from scipy.stats import mannwhitneyu
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rangos import (alinear_conteos, rango_entero, rangos_desde_conteos, rangos_medios_ordenados,
+                    tabla_conteos)
+from valores_criticos import valor_critico, valor_p
+
+def _sigma_u(n1, n2, suma_empates):
+    """
+    Desviación estándar de U bajo H0 con corrección por empates, donde
+    suma_empates = Σ (t³ - t) sobre los grupos de valores repetidos.
+    """
+    n = n1 + n2
+    return np.sqrt(n1 * n2 / 12 * ((n + 1) - suma_empates / (n * (n - 1))))
+
+
 def prueba_mann_whitney(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided'):
     """
     Prueba U de Mann-Whitney con cálculo de Z y valores críticos.
@@ -26,22 +44,23 @@ def prueba_mann_whitney(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided'):
     u = resultado.statistic
     p_valor = resultado.pvalue
 
-    # Media y desviación estándar bajo H0
+    # Media y desviación estándar bajo H0 (con corrección por empates)
+    _, repeticiones = np.unique(np.concatenate([grupo_a, grupo_b]), return_counts=True)
     mu_u = n1 * n2 / 2
-    sigma_u = np.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    sigma_u = _sigma_u(n1, n2, np.sum(repeticiones ** 3 - repeticiones))
 
     # Estadístico Z
     z = (u - mu_u) / sigma_u
 
     # Valores críticos según el tipo de prueba
     if alternativa == 'two-sided':
-        z_crit = norm.ppf(1 - alpha / 2)
+        z_crit = valor_critico('norm', alpha, alternativa='two-sided')
         decision = abs(z) > z_crit
     elif alternativa == 'less':
-        z_crit = norm.ppf(alpha)
+        z_crit = valor_critico('norm', alpha, alternativa='less')
         decision = z < z_crit
     elif alternativa == 'greater':
-        z_crit = norm.ppf(1 - alpha)
+        z_crit = valor_critico('norm', alpha, alternativa='greater')
         decision = z > z_crit
     else:
         raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
@@ -61,7 +80,407 @@ def prueba_mann_whitney(grupo_a, grupo_b, alpha=0.05, alternativa='two-sided'):
 
     return u, p_valor, z, z_crit
 
-grupo_a = [12, 15, 14, 10, 13]
-grupo_b = [22, 25, 24, 23, 26]
 
-prueba_mann_whitney(grupo_a, grupo_b)
+def _resultado_u(u, n1, n2, suma_empates, alpha, alternativa, continuidad):
+    """Z, valor p y decisión a partir de U y del término de empates."""
+    mu_u = n1 * n2 / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma_u = _sigma_u(n1, n2, suma_empates)
+        z = (u - mu_u) / sigma_u
+
+        correccion = 0.5 if continuidad else 0.0
+        if alternativa == 'two-sided':
+            z_p = (np.abs(u - mu_u) - correccion) / sigma_u
+        elif alternativa == 'less':
+            z_p = (u - mu_u + correccion) / sigma_u
+        elif alternativa == 'greater':
+            z_p = (u - mu_u - correccion) / sigma_u
+        else:
+            raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
+    p_valor = valor_p('norm', z_p, alternativa=alternativa)
+
+    z_crit = valor_critico('norm', alpha, alternativa=alternativa)
+    if alternativa == 'two-sided':
+        decision = np.abs(z) > z_crit
+    elif alternativa == 'less':
+        decision = z < z_crit
+    else:
+        decision = z > z_crit
+
+    return {
+        "Estadístico U": u,
+        "Estadístico Z": z,
+        "Valor p": p_valor,
+        "Valor crítico Z": z_crit,
+        "Rechaza H₀": decision
+    }
+
+
+def mann_whitney_lote(matriz_a, matriz_b, alpha=0.05, alternativa='two-sided', continuidad=True):
+    """
+    Prueba U de Mann-Whitney para muchas métricas a la vez, con aproximación
+    normal corregida por empates.
+
+    Parámetros:
+    - matriz_a: array (n1, métricas) con el grupo A (una métrica por columna)
+    - matriz_b: array (n2, métricas) con el grupo B
+    - alpha: nivel de significancia (por defecto 0.05)
+    - alternativa: 'two-sided', 'less' o 'greater'
+    - continuidad: corrección de continuidad en el valor p, como
+      mannwhitneyu(method='asymptotic')
+
+    Los datos combinados se ordenan una sola vez por columna (argsort en el
+    eje 0); los rangos medios y la suma Σ (t³ - t) de los empates salen de
+    los tramos de valores iguales, en O(n log n) por métrica y sin bucle en
+    Python sobre las métricas. Si todos los datos son enteros con pocos
+    valores distintos (escalas tipo Likert) no se ordena: los rangos salen
+    de una tabla de conteos por métrica y grupo en O(n + rango).
+
+    Retorna:
+    - diccionario con arrays por métrica: U (del grupo A), Z, valor p, valor
+      crítico Z y decisión
+    """
+    matriz_a = np.asarray(matriz_a, dtype=float)
+    matriz_b = np.asarray(matriz_b, dtype=float)
+    if matriz_a.ndim == 1:
+        matriz_a, matriz_b = matriz_a[:, None], matriz_b[:, None]
+    n1, n2 = matriz_a.shape[0], matriz_b.shape[0]
+
+    combinados = np.concatenate([matriz_a, matriz_b], axis=0)
+    entero = rango_entero(combinados)
+    if entero is not None and entero[1] <= combinados.shape[0]:
+        # Enteros pequeños: rangos medios desde una tabla (métrica, grupo, valor)
+        minimo, cubetas = entero
+        metricas = combinados.shape[1]
+        etiquetas = np.arange(metricas) * 2 + (np.arange(n1 + n2) >= n1)[:, None]
+        tabla = tabla_conteos(etiquetas, combinados, metricas * 2, minimo, cubetas)
+        _, sumas, _, suma_empates = rangos_desde_conteos(tabla.reshape(metricas, 2, cubetas))
+        r1 = sumas[:, 0]
+    else:
+        orden = np.argsort(combinados, axis=0, kind="stable")
+        ordenados = np.take_along_axis(combinados, orden, axis=0)
+        rangos, repeticiones = rangos_medios_ordenados(ordenados)
+
+        # Cada elemento de un grupo de t empates aporta t² - 1, y su suma es Σ (t³ - t)
+        suma_empates = np.sum(repeticiones ** 2 - 1, axis=0)
+        r1 = np.sum(np.where(orden < n1, rangos, 0), axis=0)
+
+    return _resultado_u(r1 - n1 * (n1 + 1) / 2, n1, n2, suma_empates, alpha, alternativa, continuidad)
+
+
+def mann_whitney_conteos(tabla_a, tabla_b, alpha=0.05, alternativa='two-sided', continuidad=True):
+    """
+    Prueba U de Mann-Whitney a partir de conteos por valor ya agregados, en
+    O(valores distintos): sirve para enviar tablas de frecuencias (p. ej. de
+    respuestas 1..7) en lugar de las observaciones.
+
+    Parámetros:
+    - tabla_a, tabla_b: diccionario {valor: conteo} o par (valores, conteos)
+      de cada grupo
+    - alpha, alternativa, continuidad: como en mann_whitney_lote
+
+    Retorna:
+    - el mismo diccionario que mann_whitney_lote, con escalares
+    """
+    _, tabla = alinear_conteos([tabla_a, tabla_b])
+    _, sumas, tamanos, suma_empates = rangos_desde_conteos(tabla)
+    n1, n2 = tamanos
+    return _resultado_u(sumas[0] - n1 * (n1 + 1) / 2, n1, n2, suma_empates,
+                        alpha, alternativa, continuidad)
+
+
+def verificar_mann_whitney_lote(semilla=0, tolerancia=1e-10):
+    """
+    Compara mann_whitney_lote (datos continuos con empates) con
+    mannwhitneyu(method='asymptotic') métrica por métrica, con y sin
+    corrección de continuidad y para cada alternativa. Lanza AssertionError
+    si U o el valor p difieren en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    matriz_a = np.round(rng.normal(0, 1, (40, 10)), 1)
+    matriz_b = np.round(rng.normal(np.linspace(0, 0.8, 10), 1, (33, 10)), 1)
+    for continuidad in (True, False):
+        for alternativa in ('two-sided', 'less', 'greater'):
+            resultado = mann_whitney_lote(matriz_a, matriz_b, alternativa=alternativa, continuidad=continuidad)
+            referencia = mannwhitneyu(matriz_a, matriz_b, alternative=alternativa, method='asymptotic',
+                                      use_continuity=continuidad)
+            assert np.allclose(resultado["Estadístico U"], referencia.statistic, rtol=tolerancia, atol=0), (
+                "U no coincide con scipy.")
+            assert np.allclose(resultado["Valor p"], referencia.pvalue, rtol=tolerancia, atol=0), (
+                "El valor p no coincide con scipy.")
+
+
+def verificar_conteos(semilla=0, tolerancia=1e-10):
+    """
+    Compara la vía de conteos (mann_whitney_lote con enteros tipo Likert y
+    mann_whitney_conteos con tablas {valor: conteo}) con
+    mannwhitneyu(method='asymptotic') sobre las observaciones. Lanza
+    AssertionError si U o el valor p difieren en más de la tolerancia.
+    """
+    rng = np.random.default_rng(semilla)
+    matriz_a = rng.integers(1, 8, (60, 6))
+    matriz_b = np.clip(rng.integers(1, 8, (45, 6)) + rng.integers(0, 2, (45, 6)), 1, 7)
+    resultado = mann_whitney_lote(matriz_a, matriz_b)
+    referencia = mannwhitneyu(matriz_a, matriz_b, method='asymptotic')
+    assert np.allclose(resultado["Estadístico U"], referencia.statistic, rtol=tolerancia, atol=0), (
+        "U no coincide con scipy.")
+    assert np.allclose(resultado["Valor p"], referencia.pvalue, rtol=tolerancia, atol=0), (
+        "El valor p no coincide con scipy.")
+
+    for columna in range(matriz_a.shape[1]):
+        tablas = [dict(zip(*np.unique(m[:, columna], return_counts=True))) for m in (matriz_a, matriz_b)]
+        resultado = mann_whitney_conteos(*tablas)
+        assert np.isclose(resultado["Estadístico U"], referencia.statistic[columna], rtol=tolerancia, atol=0), (
+            "U desde conteos no coincide con scipy.")
+        assert np.isclose(resultado["Valor p"], referencia.pvalue[columna], rtol=tolerancia, atol=0), (
+            "El valor p desde conteos no coincide con scipy.")
+
+
+# Valores con |x| menor que este límite caen en la cubeta del cero
+_MINIMO_BOSQUEJO = 1e-12
+
+
+class BosquejoRangos:
+    """
+    Histograma logarítmico combinable (al estilo DDSketch) de un grupo, para
+    la prueba de Mann-Whitney aproximada.
+
+    Cada valor x cae en la cubeta ⌈log_γ |x|⌉ con γ = (1 + precision) /
+    (1 - precision), con signo para los negativos y una cubeta aparte para
+    el cero, así que dos valores de la misma cubeta difieren a lo sumo en un
+    factor γ. Las cubetas no dependen de los datos: dos bosquejos con la
+    misma precisión se combinan sumando conteos, en cualquier orden y en
+    cualquier nodo. Ocupa O(log_γ(max / min)) enteros sin importar cuántas
+    observaciones resuma.
+    """
+
+    def __init__(self, precision=0.001, claves=None, conteos=None):
+        self.precision = precision
+        self.claves = np.empty(0, dtype=np.int64) if claves is None else claves
+        self.conteos = np.empty(0, dtype=np.int64) if conteos is None else conteos
+
+    @property
+    def n(self):
+        return int(self.conteos.sum())
+
+    def _claves_de(self, datos):
+        gamma = (1 + self.precision) / (1 - self.precision)
+        absolutos = np.abs(datos)
+        con_magnitud = absolutos >= _MINIMO_BOSQUEJO
+        # El desplazamiento deja positivo el índice de toda cubeta no nula, así
+        # que el orden de las claves con signo coincide con el de los valores
+        desplazamiento = 1 - int(np.floor(np.log(_MINIMO_BOSQUEJO) / np.log(gamma)))
+        indice = np.ceil(np.log(np.where(con_magnitud, absolutos, 1.0)) / np.log(gamma))
+        return np.where(con_magnitud, np.sign(datos) * (indice + desplazamiento), 0).astype(np.int64)
+
+    def _sumar(self, claves, conteos):
+        todas, posicion = np.unique(np.concatenate([self.claves, claves]), return_inverse=True)
+        suma = np.bincount(posicion, weights=np.concatenate([self.conteos, conteos]),
+                           minlength=len(todas))
+        return BosquejoRangos(self.precision, todas, suma.astype(np.int64))
+
+    def actualizar(self, datos):
+        """Incorpora un bloque de observaciones; los NaN se ignoran."""
+        datos = np.asarray(datos, dtype=float).ravel()
+        claves, conteos = np.unique(self._claves_de(datos[~np.isnan(datos)]), return_counts=True)
+        nuevo = self._sumar(claves, conteos)
+        self.claves, self.conteos = nuevo.claves, nuevo.conteos
+        return self
+
+    def combinar(self, otro):
+        """Devuelve un bosquejo nuevo con los datos de ambos fragmentos."""
+        if otro.precision != self.precision:
+            raise ValueError("Solo se pueden combinar bosquejos con la misma precisión.")
+        return self._sumar(otro.claves, otro.conteos)
+
+    __add__ = combinar
+
+
+def _abrir_fragmento(fragmento, dtype):
+    """Un fragmento es un array o la ruta de un archivo binario (np.memmap)."""
+    if isinstance(fragmento, (str, os.PathLike)):
+        return np.memmap(fragmento, dtype=dtype, mode="r")
+    return np.asarray(fragmento).ravel()
+
+
+def _bosquejar_fragmento(argumentos):
+    """Bosquejo de un fragmento, leído por bloques en memoria acotada."""
+    fragmento, precision, dtype, tam_bloque = argumentos
+    datos = _abrir_fragmento(fragmento, dtype)
+    bosquejo = BosquejoRangos(precision)
+    for inicio in range(0, len(datos), tam_bloque):
+        bosquejo.actualizar(datos[inicio:inicio + tam_bloque])
+    return bosquejo
+
+
+def bosquejar_fragmentos(fragmentos, precision=0.001, procesos=None, dtype=np.float64,
+                         tam_bloque=1 << 22):
+    """
+    Construye el bosquejo de cada fragmento en un pool de procesos y devuelve
+    su combinación.
+
+    Parámetros:
+    - fragmentos: lista de arrays o rutas de archivos binarios de un grupo
+    - precision: precisión relativa de las cubetas de BosquejoRangos
+    - procesos: número de procesos (None usa todos los núcleos; 1 no usa pool)
+    - dtype: tipo de dato de los archivos binarios
+    - tam_bloque: observaciones leídas por bloque dentro de cada fragmento
+    """
+    tareas = [(fragmento, precision, dtype, tam_bloque) for fragmento in fragmentos]
+    if procesos == 1 or len(tareas) <= 1:
+        bosquejos = map(_bosquejar_fragmento, tareas)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            bosquejos = list(pool.map(_bosquejar_fragmento, tareas))
+
+    total = BosquejoRangos(precision)
+    for bosquejo in bosquejos:
+        total = total + bosquejo
+    return total
+
+
+def mann_whitney_bosquejos(bosquejo_a, bosquejo_b, alpha=0.05, alternativa='two-sided'):
+    """
+    Prueba U de Mann-Whitney a partir de los bosquejos combinados de cada grupo.
+
+    Cada cubeta se trata como un bloque de empates: una observación de A
+    suma las de B de cubetas inferiores más la mitad de las de su misma
+    cubeta. Como dentro de la cubeta j el aporte verdadero está entre 0 y
+    a_j·b_j, el error cumple
+
+        |U - U_aprox| <= ½ Σ_j a_j·b_j
+
+    La varianza usa la misma corrección por empates que la vía exacta,
+    estimada con las cubetas como grupos de empates (t_j = a_j + b_j), y el
+    valor p la misma corrección de continuidad, así que ambas vías coinciden
+    cuando cada cubeta contiene un solo valor distinto. Como las cubetas
+    pueden juntar valores distintos, Σ(t³ - t) de las cubetas es una cota
+    superior de la verdadera y la σ verdadera queda entre la corregida y la
+    de datos sin empates. El intervalo del valor p recorre U ± la cota de
+    error con esos dos extremos de σ, así que contiene el valor p exacto.
+
+    Retorna:
+    - diccionario con U, Z, valor p, valor crítico Z, decisión, la cota de
+      error de U y el intervalo del valor p
+    """
+    if bosquejo_a.precision != bosquejo_b.precision:
+        raise ValueError("Los bosquejos de ambos grupos deben tener la misma precisión.")
+    claves = np.union1d(bosquejo_a.claves, bosquejo_b.claves)
+    a = np.zeros(len(claves))
+    b = np.zeros(len(claves))
+    a[np.searchsorted(claves, bosquejo_a.claves)] = bosquejo_a.conteos
+    b[np.searchsorted(claves, bosquejo_b.claves)] = bosquejo_b.conteos
+    n1, n2 = a.sum(), b.sum()
+
+    b_menores = np.cumsum(b) - b
+    u = float(np.sum(a * (b_menores + b / 2)))
+    cota = float(np.sum(a * b) / 2)
+    repeticiones = a + b
+    suma_empates = float(np.sum(repeticiones ** 3 - repeticiones))
+
+    resultado = _resultado_u(u, n1, n2, suma_empates, alpha, alternativa, continuidad=True)
+
+    # Extremos del valor p: U en [U - cota, U + cota] (incluida la media si
+    # cae dentro) y Σ(t³ - t) entre 0 y la de las cubetas
+    mu_u = n1 * n2 / 2
+    candidatos_u = [u - cota, u + cota] + ([mu_u] if u - cota <= mu_u <= u + cota else [])
+    extremos = _resultado_u(np.repeat(candidatos_u, 2), n1, n2,
+                            np.tile([0.0, suma_empates], len(candidatos_u)),
+                            alpha, alternativa, continuidad=True)["Valor p"]
+
+    return {
+        "Estadístico U": u,
+        "Estadístico Z": float(resultado["Estadístico Z"]),
+        "Valor p": float(resultado["Valor p"]),
+        "Valor crítico Z": resultado["Valor crítico Z"],
+        "Rechaza H₀": bool(resultado["Rechaza H₀"]),
+        "Cota de error U": cota,
+        "Intervalo valor p": (float(np.min(extremos)), float(np.max(extremos))),
+        "Exacto": False
+    }
+
+
+def verificar_bosquejos(semilla=0, tolerancia=1e-10):
+    """
+    Compara la vía aproximada de prueba_mann_whitney_aproximada (forzada con
+    limite_exacto=0 y fragmentos de distinto tamaño) con mannwhitneyu
+    (method='asymptotic'): con datos continuos U cae dentro de la cota de
+    error y el valor p dentro del intervalo informado; con enteros (un
+    solo valor por cubeta) ambos coinciden. Lanza AssertionError si no.
+    """
+    rng = np.random.default_rng(semilla)
+    continuos = (rng.lognormal(0, 1, 3000), rng.lognormal(0.05, 1, 2500))
+    enteros = (rng.integers(-20, 20, 3000).astype(float), rng.integers(-18, 22, 2500).astype(float))
+    for alternativa in ('two-sided', 'less', 'greater'):
+        for (datos_a, datos_b), exacto in ((continuos, False), (enteros, True)):
+            resultado = prueba_mann_whitney_aproximada(np.array_split(datos_a, [100, 1700]),
+                                                       np.array_split(datos_b, [900]), alternativa=alternativa,
+                                                       limite_exacto=0, procesos=1)
+            referencia = mannwhitneyu(datos_a, datos_b, alternative=alternativa, method='asymptotic')
+            inferior, superior = resultado["Intervalo valor p"]
+            if exacto:
+                assert np.isclose(resultado["Estadístico U"], referencia.statistic, rtol=tolerancia, atol=0), (
+                    "U no coincide con scipy con un solo valor por cubeta.")
+                assert np.isclose(resultado["Valor p"], referencia.pvalue, rtol=tolerancia, atol=0), (
+                    "El valor p no coincide con scipy con un solo valor por cubeta.")
+            assert abs(resultado["Estadístico U"] - referencia.statistic) <= resultado["Cota de error U"], (
+                "U queda fuera de la cota de error.")
+            assert inferior * (1 - tolerancia) <= referencia.pvalue <= superior * (1 + tolerancia), (
+                "El valor p de scipy queda fuera del intervalo informado.")
+
+
+def prueba_mann_whitney_aproximada(fragmentos_a, fragmentos_b, alpha=0.05, alternativa='two-sided',
+                                   precision=0.001, limite_exacto=10_000_000, procesos=None,
+                                   dtype=np.float64, tam_bloque=1 << 22):
+    """
+    Prueba U de Mann-Whitney para grupos repartidos en fragmentos (archivos o
+    arrays) que no caben juntos en memoria.
+
+    Parámetros:
+    - fragmentos_a, fragmentos_b: listas de arrays o rutas de archivos
+      binarios con las observaciones de cada grupo
+    - alpha: nivel de significancia (por defecto 0.05)
+    - alternativa: 'two-sided', 'less' o 'greater'
+    - precision: precisión relativa de los bosquejos (ver BosquejoRangos)
+    - limite_exacto: si n1 + n2 no lo supera se cargan los datos y se usa
+      mann_whitney_lote (exacto en U, con corrección por empates)
+    - procesos: procesos del pool que construye los bosquejos
+    - dtype: tipo de dato de los archivos binarios
+    - tam_bloque: observaciones leídas por bloque
+
+    Retorna:
+    - diccionario de mann_whitney_bosquejos; en la vía exacta la cota de
+      error es 0 y el intervalo del valor p se reduce a un punto
+    """
+    tamanos = [len(_abrir_fragmento(f, dtype)) for f in list(fragmentos_a) + list(fragmentos_b)]
+    if sum(tamanos) <= limite_exacto:
+        datos_a = np.concatenate([_abrir_fragmento(f, dtype) for f in fragmentos_a]).astype(float)
+        datos_b = np.concatenate([_abrir_fragmento(f, dtype) for f in fragmentos_b]).astype(float)
+        datos_a, datos_b = datos_a[~np.isnan(datos_a)], datos_b[~np.isnan(datos_b)]
+        resultado = mann_whitney_lote(datos_a, datos_b, alpha, alternativa)
+        p = float(resultado["Valor p"][0])
+        return {
+            "Estadístico U": float(resultado["Estadístico U"][0]),
+            "Estadístico Z": float(resultado["Estadístico Z"][0]),
+            "Valor p": p,
+            "Valor crítico Z": resultado["Valor crítico Z"],
+            "Rechaza H₀": bool(resultado["Rechaza H₀"][0]),
+            "Cota de error U": 0.0,
+            "Intervalo valor p": (p, p),
+            "Exacto": True
+        }
+
+    bosquejo_a = bosquejar_fragmentos(fragmentos_a, precision, procesos, dtype, tam_bloque)
+    bosquejo_b = bosquejar_fragmentos(fragmentos_b, precision, procesos, dtype, tam_bloque)
+    return mann_whitney_bosquejos(bosquejo_a, bosquejo_b, alpha, alternativa)
+
+
+if __name__ == "__main__":
+    grupo_a = [12, 15, 14, 10, 13]
+    grupo_b = [22, 25, 24, 23, 26]
+
+    prueba_mann_whitney(grupo_a, grupo_b)
+
+    verificar_mann_whitney_lote()
+    verificar_conteos()
+    verificar_bosquejos()
@@ -1,7 +1,166 @@
-from scipy.stats import wilcoxon, norm
+import itertools
+import os
+import sys
+import tempfile
+from functools import lru_cache
+
+from scipy.stats import rankdata, wilcoxon
 import numpy as np
 
-def prueba_wilcoxon(pareados_a, pareados_b, alpha=0.05, alternativa='two-sided'):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from valores_criticos import valor_critico, valor_p
+
+# Tabla exacta precalculada cargada desde disco (ver cargar_tabla_wilcoxon)
+_TABLA_WILCOXON = None
+
+# Las tablas en memoria se construyen hasta el siguiente múltiplo de este paso
+_PASO_TABLA = 64
+
+
+@lru_cache(maxsize=8)
+def _tabla_wilcoxon(n_max):
+    """
+    Matriz (n_max+1, n_max(n_max+1)/2 + 1) con P(W+ <= w) para cada n sin
+    empates. Se construye por programación dinámica sobre las probabilidades,
+    p_n(w) = (p_{n-1}(w) + p_{n-1}(w - n)) / 2, así que una sola pasada da
+    todas las filas n = 0..n_max en O(n_max³).
+    """
+    maximo = n_max * (n_max + 1) // 2
+    tabla = np.ones((n_max + 1, maximo + 1))
+    probabilidades = np.zeros(maximo + 1)
+    probabilidades[0] = 1.0
+    for n in range(1, n_max + 1):
+        tope = n * (n + 1) // 2
+        desplazada = np.zeros(tope + 1)
+        desplazada[n:] = probabilidades[:tope + 1 - n]
+        probabilidades[:tope + 1] = (probabilidades[:tope + 1] + desplazada) / 2
+        tabla[n, :tope + 1] = np.cumsum(probabilidades[:tope + 1])
+    tabla.flags.writeable = False
+    return tabla
+
+
+def _cdf_wilcoxon(n):
+    """P(W+ <= w), w = 0..n(n+1)/2, desde la tabla de disco si la cubre."""
+    if _TABLA_WILCOXON is not None and n < _TABLA_WILCOXON.shape[0]:
+        return _TABLA_WILCOXON[n, :n * (n + 1) // 2 + 1]
+    n_max = -(-max(n, 1) // _PASO_TABLA) * _PASO_TABLA
+    return _tabla_wilcoxon(n_max)[n, :n * (n + 1) // 2 + 1]
+
+
+@lru_cache(maxsize=1024)
+def _cdf_rangos_dobles(rangos_dobles):
+    """
+    P(W+ <= w) de la distribución de permutación condicionada a los rangos
+    observados (con empates o ceros de Pratt). Los rangos medios se duplican
+    para que sean enteros y se aplica la misma programación dinámica que en
+    _tabla_wilcoxon sobre esos rangos; w está en unidades de medio rango.
+    """
+    total = sum(rangos_dobles)
+    probabilidades = np.zeros(total + 1)
+    probabilidades[0] = 1.0
+    for rango in rangos_dobles:
+        desplazada = np.zeros(total + 1)
+        desplazada[rango:] = probabilidades[:total + 1 - rango]
+        probabilidades = (probabilidades + desplazada) / 2
+    cdf = np.cumsum(probabilidades)
+    cdf.flags.writeable = False
+    return cdf
+
+
+def valor_p_wilcoxon_exacto(w, n, alternativa='two-sided'):
+    """
+    Valor p exacto de W+ (suma de rangos de las diferencias positivas) sin
+    empates, para escalares o arrays. Es una consulta a la tabla: P(W+ >= w)
+    se obtiene por simetría como P(W+ <= n(n+1)/2 - w).
+    """
+    w, n = np.broadcast_arrays(np.asarray(w, dtype=np.int64), np.asarray(n, dtype=np.int64))
+    p_value = np.empty(w.shape)
+    for tamano in np.unique(n):
+        cdf = _cdf_wilcoxon(int(tamano))
+        en_grupo = n == tamano
+        p_value[en_grupo] = _colas(cdf, w[en_grupo], len(cdf) - 1, alternativa)
+    return p_value[()] if p_value.ndim == 0 else p_value
+
+
+def _colas(cdf, w, maximo, alternativa):
+    """Valor p a partir de la CDF de W+ en [0, maximo], simétrica en maximo/2."""
+    inferior = cdf[np.clip(w, 0, maximo)]
+    superior = cdf[np.clip(maximo - w, 0, maximo)]
+    if alternativa == 'two-sided':
+        return np.minimum(1.0, 2 * np.minimum(inferior, superior))
+    if alternativa == 'less':
+        return inferior
+    if alternativa == 'greater':
+        return superior
+    raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
+
+
+def guardar_tabla_wilcoxon(ruta, n_max=100):
+    """
+    Precalcula P(W+ <= w) para todo n <= n_max y la guarda en un archivo .npy
+    de forma (n_max+1, n_max(n_max+1)/2 + 1) indexado por [n, w].
+    """
+    np.save(ruta, _tabla_wilcoxon(n_max))
+
+
+def cargar_tabla_wilcoxon(ruta):
+    """
+    Carga (como memory-map de solo lectura) una tabla creada con
+    guardar_tabla_wilcoxon para que las pruebas exactas la consulten.
+    """
+    global _TABLA_WILCOXON
+    _TABLA_WILCOXON = np.load(ruta, mmap_mode="r")
+
+
+def verificar_wilcoxon_exacto(semilla=0, tolerancia=1e-10):
+    """
+    Comprueba los valores p exactos de W+: sin empates contra
+    scipy.stats.wilcoxon(method='exact'), en memoria y desde una tabla
+    guardada y cargada de disco; con empates contra la enumeración de los
+    2^n signos. Lanza AssertionError si algo difiere más de la tolerancia.
+    """
+    global _TABLA_WILCOXON
+    rng = np.random.default_rng(semilla)
+    alternativas = ('two-sided', 'less', 'greater')
+
+    anterior = _TABLA_WILCOXON
+    try:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, "wilcoxon.npy")
+            guardar_tabla_wilcoxon(ruta, n_max=30)
+            for tabla in (None, ruta):
+                _TABLA_WILCOXON = None
+                if tabla is not None:
+                    cargar_tabla_wilcoxon(tabla)
+                for n in (1, 5, 12, 30, 45):
+                    d = rng.permutation(np.arange(1, n + 1)) * rng.choice([-1.0, 1.0], n)
+                    w_mas = int(np.sum(np.abs(d)[d > 0]))
+                    for alternativa in alternativas:
+                        referencia = wilcoxon(d, alternative=alternativa, method='exact').pvalue
+                        assert np.isclose(valor_p_wilcoxon_exacto(w_mas, n, alternativa), referencia,
+                                          rtol=tolerancia, atol=0), "El valor p exacto no coincide con scipy."
+            # Soltar el memory-map antes de borrar la carpeta
+            _TABLA_WILCOXON = None
+    finally:
+        _TABLA_WILCOXON = anterior
+
+    d = np.array([1.0, -1.0, 2.0, 2.0, -3.0, 3.0, 3.0, 4.0, -5.0, 5.0, 6.0, -6.0])
+    rangos = rankdata(np.abs(d))
+    w_mas = rangos[d > 0].sum()
+    signos = np.array(list(itertools.product([0.0, 1.0], repeat=len(d))))
+    distribucion = signos @ rangos
+    cdf = _cdf_rangos_dobles(tuple(sorted(np.rint(2 * rangos).astype(int).tolist())))
+    for alternativa in alternativas:
+        inferior, superior = np.mean(distribucion <= w_mas), np.mean(distribucion >= w_mas)
+        referencia = {'two-sided': min(1.0, 2 * min(inferior, superior)),
+                      'less': inferior, 'greater': superior}[alternativa]
+        p_valor = _colas(cdf, int(round(2 * w_mas)), len(cdf) - 1, alternativa)
+        assert np.isclose(p_valor, referencia, rtol=tolerancia, atol=0), (
+            "El valor p con empates no coincide con la enumeración.")
+
+
+def prueba_wilcoxon(pareados_a, pareados_b, alpha=0.05, alternativa='two-sided',
+                    n_exacto=50, ceros='wilcox'):
     """
     Prueba de Wilcoxon para muestras pareadas.
 
@@ -9,11 +168,16 @@ def prueba_wilcoxon(pareados_a, pareados_b, alpha=0.05, alternativa='two-sided')
     - pareados_a, pareados_b: listas o arrays de datos relacionados (antes/después, control/tratamiento)
     - alpha: nivel de significancia
     - alternativa: 'two-sided', 'less', 'greater'
+    - n_exacto: hasta este número de diferencias no nulas el valor p es
+      exacto (tabla precalculada sin empates; distribución de permutación
+      de los rangos observados con empates)
+    - ceros: 'wilcox' descarta las diferencias nulas; 'pratt' las incluye al
+      asignar rangos y luego las descarta
 
     Retorna:
     - Estadístico W
     - Valor p
-    - Estadístico Z (aproximado)
+    - Estadístico Z (corregido por empates)
     - Valor crítico Z
     - Interpretación del resultado
     """
@@ -21,34 +185,59 @@ def prueba_wilcoxon(pareados_a, pareados_b, alpha=0.05, alternativa='two-sided')
     # Validación de longitudes
     if len(pareados_a) != len(pareados_b):
         raise ValueError("Las muestras deben tener la misma longitud para la prueba de Wilcoxon.")
+    if ceros not in ('wilcox', 'pratt'):
+        raise ValueError("ceros debe ser 'wilcox' o 'pratt'.")
 
-    resultado = wilcoxon(pareados_a, pareados_b, alternative=alternativa)
-    w_stat = resultado.statistic
-    p_valor = resultado.pvalue
+    d = np.asarray(pareados_a, dtype=float) - np.asarray(pareados_b, dtype=float)
+    if ceros == 'wilcox':
+        d = d[d != 0]
+    rangos = rankdata(np.abs(d))
+    rangos, d = rangos[d != 0], d[d != 0]
+    n = len(d)
 
-    # Cálculo de Z aproximado (sólo válido si n es razonablemente grande)
-    n = len(pareados_a)
-    mu_w = n * (n + 1) / 4
-    sigma_w = np.sqrt(n * (n + 1) * (2 * n + 1) / 24)
-    z = (w_stat - mu_w) / sigma_w
+    # W+ y su distribución bajo H0: cada rango entra con signo + o - con
+    # probabilidad 1/2, así que E[W+] = Σr/2 y Var[W+] = Σr²/4. Sin empates
+    # esto es n(n+1)/4 y n(n+1)(2n+1)/24; con empates Σr² ya descuenta
+    # Σ(t³ - t)/12 por los rangos medios.
+    w_mas = float(rangos[d > 0].sum())
+    w_menos = float(rangos.sum() - w_mas)
+    w_stat = min(w_mas, w_menos) if alternativa == 'two-sided' else w_mas
+    mu_w = rangos.sum() / 2
+    sigma_w = np.sqrt(np.sum(rangos ** 2) / 4)
+
+    # Estadístico Z
+    z = (w_mas - mu_w) / sigma_w
 
     # Valor crítico de Z
     if alternativa == 'two-sided':
-        z_crit = norm.ppf(1 - alpha / 2)
+        z_crit = valor_critico('norm', alpha, alternativa='two-sided')
         decision = abs(z) > z_crit
     elif alternativa == 'less':
-        z_crit = norm.ppf(alpha)
+        z_crit = valor_critico('norm', alpha, alternativa='less')
         decision = z < z_crit
     elif alternativa == 'greater':
-        z_crit = norm.ppf(1 - alpha)
+        z_crit = valor_critico('norm', alpha, alternativa='greater')
         decision = z > z_crit
     else:
         raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
 
+    # Valor p exacto por consulta a la tabla, o normal para n grande. Con el
+    # valor p exacto la decisión sale de él, no de la regla z vs z crítico
+    rangos_dobles = np.rint(2 * rangos).astype(np.int64)
+    if n <= n_exacto and np.array_equal(np.sort(rangos_dobles), 2 * np.arange(1, n + 1)):
+        p_valor = float(valor_p_wilcoxon_exacto(int(w_mas), n, alternativa))
+        decision = p_valor < alpha
+    elif n <= n_exacto:
+        cdf = _cdf_rangos_dobles(tuple(sorted(rangos_dobles.tolist())))
+        p_valor = float(_colas(cdf, int(round(2 * w_mas)), len(cdf) - 1, alternativa))
+        decision = p_valor < alpha
+    else:
+        p_valor = float(valor_p('norm', z, alternativa=alternativa))
+
     # Resultados
     print(f"Estadístico W (Wilcoxon): {w_stat}")
     print(f"Valor p: {p_valor:.5f}")
-    print(f"Estadístico Z (aproximado): {z:.5f}")
+    print(f"Estadístico Z (corregido por empates): {z:.5f}")
     print(f"Valor crítico Z (α = {alpha}): {z_crit:.5f}")
 
     if decision:
@@ -60,7 +249,11 @@ def prueba_wilcoxon(pareados_a, pareados_b, alpha=0.05, alternativa='two-sided')
 
     return w_stat, p_valor, z, z_crit
 
-antes = [85, 90, 88, 75, 95]
-despues = [87, 91, 86, 78, 97]
 
-prueba_wilcoxon(antes, despues, alpha=0.05, alternativa='two-sided')
+if __name__ == "__main__":
+    antes = [85, 90, 88, 75, 95]
+    despues = [87, 91, 86, 78, 97]
+
+    prueba_wilcoxon(antes, despues, alpha=0.05, alternativa='two-sided')
+
+    verificar_wilcoxon_exacto()
@@ -1,10 +1,376 @@
+import os
+import sys
+
 import numpy as np
 from scipy import stats
+from scipy.optimize import curve_fit
 import statsmodels.api as sm
 
-def analizar_modelos(x, y):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from remuestreo import intervalos_bootstrap
+
+# Orden de los modelos en el resultado compacto de analizar_modelos_ligero
+MODELOS = ("Lineal", "Logarítmico", "Parabólico", "Exponencial", "Potencial")
+
+# Columnas del resultado compacto; el modelo lineal en x o ln(x) deja NaN en b2
+COLUMNAS_RESULTADO = ("R²", "b0", "b1", "b2", "t0", "t1", "t2", "p0", "p1", "p2")
+
+
+def _disenos(x, y):
+    """
+    Matrices de diseño y respuesta de los cinco modelos, con ln(x) y ln(y)
+    calculados una sola vez. x e y son (n,) o (series, n).
+    """
+    ln_x = np.log(x)
+    ln_y = np.log(y)
+    uno = np.ones_like(x)
+    lineal = np.stack([uno, x], axis=-1)
+    logaritmico = np.stack([uno, ln_x], axis=-1)
+    return {
+        "Lineal": (lineal, y),
+        "Logarítmico": (logaritmico, y),
+        "Parabólico": (np.stack([uno, x, x ** 2], axis=-1), y),
+        "Exponencial": (lineal, ln_y),
+        "Potencial": (logaritmico, ln_y),
+    }
+
+
+def _ajuste_mco(X, y):
+    """
+    Mínimos cuadrados por QR para una pila de problemas pequeños
+    X (..., n, k), y (..., n): coeficientes, t, p y R² de cada uno sin crear
+    objetos de statsmodels.
+
+    Las series con datos no finitos (p. ej. ln de valores <= 0) o de rango
+    deficiente (algún |r_jj| despreciable frente al mayor, como x constante)
+    quedan con NaN en todos sus resultados sin afectar al resto del lote.
+    """
+    n, k = X.shape[-2:]
+    finitas = np.all(np.isfinite(X), axis=(-2, -1)) & np.all(np.isfinite(y), axis=-1)
+    X = np.where(finitas[..., None, None], X, 1.0)
+    y = np.where(finitas[..., None], y, 0.0)
+    q, r = np.linalg.qr(X)
+
+    diagonal = np.abs(np.diagonal(r, axis1=-2, axis2=-1))
+    tolerancia = max(n, k) * np.finfo(float).eps * diagonal.max(axis=-1, keepdims=True)
+    validas = finitas & np.all(diagonal > tolerancia, axis=-1)
+    # Las series inválidas se resuelven con R = I para no detener el lote
+    r = np.where(validas[..., None, None], r, np.eye(k))
+
+    coeficientes = np.linalg.solve(r, np.einsum("...nk,...n->...k", q, y)[..., None])[..., 0]
+    residuos = y - np.einsum("...nk,...k->...n", X, coeficientes)
+    sce = np.sum(residuos ** 2, axis=-1)
+    stc = np.sum((y - y.mean(axis=-1, keepdims=True)) ** 2, axis=-1)
+    df = n - k
+
+    # diag((XᵀX)⁻¹) = suma por filas de R⁻¹ al cuadrado
+    r_inv = np.linalg.inv(r)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        errores = np.sqrt(sce[..., None] / df * np.sum(r_inv ** 2, axis=-1))
+        t_vals = coeficientes / errores
+        p_vals = 2 * stats.t.sf(np.abs(t_vals), df)
+        r_squared = 1 - sce / stc
+
+    invalidas = ~validas
+    r_squared = np.where(invalidas, np.nan, r_squared)
+    coeficientes, t_vals, p_vals = (np.where(invalidas[..., None], np.nan, v)
+                                    for v in (coeficientes, t_vals, p_vals))
+    return r_squared, coeficientes, t_vals, p_vals
+
+
+def analizar_modelos_ligero(x, y):
+    """
+    Ajusta los cinco modelos de analizar_modelos sin statsmodels ni
+    impresiones, para comparar familias de modelos en muchas series.
+
+    Parámetros:
+    - x, y: arrays (n,) de una serie o (series, n) con una serie por fila
+
+    Las transformaciones ln(x) y ln(y) se calculan una vez y cada modelo se
+    resuelve con una QR apilada sobre todas las series. Los modelos
+    exponencial y potencial se ajustan linealizados, igual que en
+    analizar_modelos.
+
+    Retorna:
+    - array (5, 10) para una serie o (series, 5, 10), con los modelos en el
+      orden de MODELOS y las columnas de COLUMNAS_RESULTADO
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    resultado = np.full(x.shape[:-1] + (len(MODELOS), len(COLUMNAS_RESULTADO)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        disenos = _disenos(x, y)
+    for i, nombre in enumerate(MODELOS):
+        X, respuesta = disenos[nombre]
+        k = X.shape[-1]
+        r_squared, coeficientes, t_vals, p_vals = _ajuste_mco(X, respuesta)
+        resultado[..., i, 0] = r_squared
+        resultado[..., i, 1:1 + k] = coeficientes
+        resultado[..., i, 4:4 + k] = t_vals
+        resultado[..., i, 7:7 + k] = p_vals
+    return resultado
+
+
+def resumen_modelo(x, y, nombre):
+    """
+    Ajusta con statsmodels uno de los MODELOS de una serie, para construir su
+    summary() solo cuando se pide.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X, respuesta = _disenos(np.asarray(x, dtype=float), np.asarray(y, dtype=float))[nombre]
+    return sm.OLS(respuesta, X).fit()
+
+
+def bootstrap_modelo(x, y, nombre, tipo="pares", replicas=10_000, nivel=0.95,
+                     tam_bloque=500, semilla=None, procesos=1):
+    """
+    Intervalos bootstrap de los coeficientes de uno de los MODELOS de una
+    serie, por pares o por residuos (ver intervalos_bootstrap). Los modelos
+    exponencial y potencial se remuestrean en su forma linealizada, así que
+    el primer coeficiente es ln(a).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X, respuesta = _disenos(np.asarray(x, dtype=float), np.asarray(y, dtype=float))[nombre]
+    return intervalos_bootstrap(X, respuesta, tipo, replicas, nivel, tam_bloque, semilla, procesos)
+
+
+def verificar_ligero(semilla=0, tolerancia=1e-8):
+    """
+    Compara analizar_modelos_ligero con sm.OLS modelo por modelo en un lote
+    de series (incluida la del ejemplo, con x = 1900..1950), y comprueba que
+    las series de rango deficiente o fuera del dominio de ln quedan en NaN
+    solo en los modelos afectados. Lanza AssertionError si algo no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    x = np.vstack([np.linspace(1900, 1950, 6), rng.uniform(1, 10, (5, 6))])
+    y = np.vstack([[75, 91.97, 105.7, 122.78, 131.7, 178.5], rng.uniform(1, 50, (5, 6))])
+    resultado = analizar_modelos_ligero(x, y)
+    for serie in range(len(x)):
+        for i, nombre in enumerate(MODELOS):
+            ajuste = resumen_modelo(x[serie], y[serie], nombre)
+            k = len(ajuste.params)
+            fila = resultado[serie, i]
+            for columnas, referencia in (([0], [ajuste.rsquared]), (slice(1, 1 + k), ajuste.params),
+                                         (slice(4, 4 + k), ajuste.tvalues), (slice(7, 7 + k), ajuste.pvalues)):
+                assert np.allclose(fila[columnas], referencia, rtol=tolerancia, atol=0), (
+                    f"{nombre} no coincide con statsmodels.")
+
+    constante = analizar_modelos_ligero(np.full(6, 3.0), y[1])
+    assert np.all(np.isnan(constante)), "Una x constante no quedó en NaN."
+    negativos = analizar_modelos_ligero(x[1], y[1] - 30)
+    con_ln_y = [MODELOS.index("Exponencial"), MODELOS.index("Potencial")]
+    sin_ln_y = [MODELOS.index(m) for m in ("Lineal", "Logarítmico", "Parabólico")]
+    assert np.all(np.isnan(negativos[con_ln_y])), "ln(y) con y <= 0 no quedó en NaN."
+    assert np.all(np.isfinite(negativos[sin_ln_y, :3])), "Una serie con y <= 0 afectó a los modelos sin ln(y)."
+
+
+def _inicial_lineal(x, y, nombre):
+    """
+    Parámetros de arranque: la solución linealizada del modelo por MCO. Si
+    la linealización no está definida para una serie (y <= 0 en los modelos
+    exponencial y potencial) se arranca de la constante a = media(y), b = 0.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X, respuesta = _disenos(x, y)[nombre]
+    coeficientes = _ajuste_mco(X, respuesta)[1]
+    if nombre in ("Exponencial", "Potencial"):
+        coeficientes[..., 0] = np.exp(coeficientes[..., 0])
+        sin_arranque = ~np.all(np.isfinite(coeficientes), axis=-1)
+        coeficientes[sin_arranque] = 0.0
+        coeficientes[sin_arranque, 0] = y[sin_arranque].mean(axis=-1)
+    return coeficientes
+
+
+# Por familia: predicción f(x, θ) y jacobiano ∂f/∂θ (..., n, k). Los modelos
+# exponencial y potencial se ajustan en la escala original de y.
+_FAMILIAS = {
+    "Lineal": (
+        lambda x, p: p[..., :1] + p[..., 1:2] * x,
+        lambda x, p: np.stack([np.ones_like(x), x], axis=-1),
+    ),
+    "Logarítmico": (
+        lambda x, p: p[..., :1] + p[..., 1:2] * np.log(x),
+        lambda x, p: np.stack([np.ones_like(x), np.log(x)], axis=-1),
+    ),
+    "Parabólico": (
+        lambda x, p: p[..., :1] + p[..., 1:2] * x + p[..., 2:3] * x ** 2,
+        lambda x, p: np.stack([np.ones_like(x), x, x ** 2], axis=-1),
+    ),
+    "Exponencial": (
+        lambda x, p: p[..., :1] * np.exp(p[..., 1:2] * x),
+        lambda x, p: np.stack([np.exp(p[..., 1:2] * x),
+                               p[..., :1] * x * np.exp(p[..., 1:2] * x)], axis=-1),
+    ),
+    "Potencial": (
+        lambda x, p: p[..., :1] * x ** p[..., 1:2],
+        lambda x, p: np.stack([x ** p[..., 1:2],
+                               p[..., :1] * np.log(x) * x ** p[..., 1:2]], axis=-1),
+    ),
+}
+
+
+def ajustar_curvas_lote(x, y, familia, max_iter=100, tol=1e-10, amortiguamiento=1e-3):
+    """
+    Mínimos cuadrados no lineales verdaderos para muchas series de igual
+    longitud a la vez, con Levenberg-Marquardt vectorizado.
+
+    Parámetros:
+    - x: array (n,) común a todas las series o (series, n)
+    - y: array (series, n) con una serie por fila (o (n,) para una serie)
+    - familia: uno de MODELOS; 'Exponencial' es y = a·e^(bx) y 'Potencial'
+      y = a·x^b, ajustados sin linealizar
+    - max_iter: máximo de iteraciones
+    - tol: cambio relativo de la suma de cuadrados para declarar convergencia
+    - amortiguamiento: λ inicial de Levenberg-Marquardt
+
+    Cada serie arranca de su solución linealizada (la de analizar_modelos),
+    o de la constante media(y) si no está definida, y tiene su propio λ: el
+    paso (JᵀJ + λ·diag(JᵀJ)) δ = Jᵀr se resuelve para todas las series
+    activas con un solo np.linalg.solve apilado; si baja la suma de
+    cuadrados se acepta y λ se divide por 10, si no se multiplica por 10.
+    Las familias lineales en los parámetros convergen en un paso.
+
+    Retorna:
+    - diccionario con parámetros, errores estándar (s²·(JᵀJ)⁻¹ en la
+      solución), SCE, R², iteraciones y si cada serie convergió. Las series
+      que no convergen, tienen datos no finitos o x <= 0 en los modelos
+      logarítmico y potencial quedan con NaN y Convergió = False, sin
+      afectar al resto del lote.
+    """
+    if familia not in _FAMILIAS:
+        raise ValueError(f"La familia debe ser una de {MODELOS}.")
+    funcion, jacobiano = _FAMILIAS[familia]
+    y = np.asarray(y, dtype=float)
+    x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+    una_serie = y.ndim == 1
+    if una_serie:
+        x, y = x[None], y[None]
+    series, n = y.shape
+
+    # Series fuera del dominio del modelo: se rechazan de entrada
+    dominio = np.all(np.isfinite(x), axis=-1) & np.all(np.isfinite(y), axis=-1)
+    if familia in ("Logarítmico", "Potencial"):
+        dominio &= np.all(x > 0, axis=-1)
+
+    parametros = _inicial_lineal(x, y, familia)
+    parametros[~dominio] = np.nan
+    k = parametros.shape[-1]
+    with np.errstate(over="ignore", invalid="ignore"):
+        sce = np.sum((y - funcion(x, parametros)) ** 2, axis=-1)
+    sce = np.where(np.isfinite(sce), sce, np.inf)
+    lam = np.full(series, float(amortiguamiento))
+    iteraciones = np.zeros(series, dtype=int)
+    convergio = np.zeros(series, dtype=bool)
+    activas = np.isfinite(parametros).all(axis=-1)
+
+    for _ in range(max_iter):
+        indices = np.flatnonzero(activas)
+        if len(indices) == 0:
+            break
+        xa, ya, pa = x[indices], y[indices], parametros[indices]
+        with np.errstate(over="ignore", invalid="ignore"):
+            J = jacobiano(xa, pa)
+            residuos = ya - funcion(xa, pa)
+            jtj = np.einsum("snk,snl->skl", J, J)
+            jtr = np.einsum("snk,sn->sk", J, residuos)
+            # Piso en la diagonal para que una columna nula de J no haga
+            # singular el sistema amortiguado
+            diagonal = np.einsum("skk->sk", jtj)
+            diagonal = np.maximum(diagonal, 1e-12 * diagonal.max(axis=-1, keepdims=True) + 1e-300)
+            finitos = np.all(np.isfinite(jtj), axis=(-2, -1)) & np.all(np.isfinite(jtr), axis=-1)
+            activas[indices[~finitos]] = False
+            indices, pa, xa, ya = indices[finitos], pa[finitos], xa[finitos], ya[finitos]
+            jtj, jtr, diagonal = jtj[finitos], jtr[finitos], diagonal[finitos]
+            sistema = jtj + lam[indices, None, None] * np.eye(k) * diagonal[:, None, :]
+            delta = np.linalg.solve(sistema, jtr[..., None])[..., 0]
+            candidato = pa + delta
+            sce_nueva = np.sum((ya - funcion(xa, candidato)) ** 2, axis=-1)
+        iteraciones[indices] += 1
+
+        mejora = np.isfinite(sce_nueva) & (sce_nueva <= sce[indices])
+        cambio = np.abs(sce[indices] - sce_nueva) <= tol * np.maximum(sce[indices], 1e-300)
+        paso_nulo = np.all(np.abs(delta) <= tol * (np.abs(pa) + tol), axis=-1)
+
+        aceptadas = indices[mejora]
+        parametros[aceptadas] = candidato[mejora]
+        sce[aceptadas] = sce_nueva[mejora]
+        lam[indices] = np.where(mejora, lam[indices] / 10, lam[indices] * 10)
+
+        terminadas = indices[(mejora & cambio) | paso_nulo]
+        convergio[terminadas] = True
+        activas[terminadas] = False
+        activas[indices[lam[indices] > 1e16]] = False
+
+    # La covarianza se calcula solo para las series que convergieron a una
+    # solución finita; el resto queda en NaN
+    validas = convergio & np.all(np.isfinite(parametros), axis=-1) & np.isfinite(sce)
+    convergio &= validas
+    parametros[~validas] = np.nan
+    sce = np.where(validas, sce, np.nan)
+    errores = np.full((series, k), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        J = jacobiano(x[validas], parametros[validas])
+        covarianza = np.linalg.pinv(np.einsum("snk,snl->skl", J, J))
+        errores[validas] = np.sqrt(sce[validas, None] / (n - k) * np.einsum("skk->sk", covarianza))
+        stc = np.sum((y - y.mean(axis=-1, keepdims=True)) ** 2, axis=-1)
+        r_squared = 1 - sce / stc
+
+    resultado = {
+        "Parámetros": parametros,
+        "Errores estándar": errores,
+        "SCE": sce,
+        "R²": r_squared,
+        "Iteraciones": iteraciones,
+        "Convergió": convergio
+    }
+    if una_serie:
+        resultado = {clave: valor[0] for clave, valor in resultado.items()}
+    return resultado
+
+
+def verificar_curvas(semilla=0, tolerancia=1e-5):
+    """
+    Compara ajustar_curvas_lote con scipy.optimize.curve_fit serie por serie
+    para los modelos exponencial y potencial, con una serie con NaN y otra
+    con x <= 0 en el mismo lote, que deben quedar en NaN sin afectar al
+    resto. Lanza AssertionError si los parámetros o sus errores estándar
+    difieren en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    x = np.tile(np.linspace(0.5, 4, 15), (6, 1))
+    for familia, a, b in (("Exponencial", 3.0, 0.4), ("Potencial", 2.0, 1.3)):
+        funcion = _FAMILIAS[familia][0]
+        y = funcion(x, np.array([a, b])) * (1 + 0.05 * rng.normal(size=x.shape))
+        x_lote, y_lote = x.copy(), y.copy()
+        y_lote[4, 3] = np.nan
+        x_lote[5, 0] = -1.0 if familia == "Potencial" else np.inf
+        resultado = ajustar_curvas_lote(x_lote, y_lote, familia)
+
+        assert np.all(np.isnan(resultado["Parámetros"][4:])) and not np.any(resultado["Convergió"][4:]), (
+            "Una serie fuera del dominio no quedó en NaN.")
+        for serie in range(4):
+            referencia, covarianza = curve_fit(lambda t, p0, p1: funcion(t, np.array([p0, p1])),
+                                               x[serie], y[serie], p0=[a, b])
+            assert resultado["Convergió"][serie], f"{familia} no convergió."
+            assert np.allclose(resultado["Parámetros"][serie], referencia, rtol=tolerancia, atol=0), (
+                f"Los parámetros de {familia} no coinciden con curve_fit.")
+            assert np.allclose(resultado["Errores estándar"][serie], np.sqrt(np.diag(covarianza)),
+                               rtol=10 * tolerancia, atol=0), (
+                f"Los errores estándar de {familia} no coinciden con curve_fit.")
+
+
+def analizar_modelos(x, y, ligero=False):
+    """
+    Compara los modelos lineal, logarítmico, parabólico, exponencial y
+    potencial. Con ligero=True no imprime y devuelve el resultado compacto de
+    analizar_modelos_ligero.
+    """
+    if ligero:
+        return analizar_modelos_ligero(x, y)
+
     x = np.array(x, dtype=float)
     y = np.array(y, dtype=float)
+    disenos = _disenos(x, y)
 
     def imprimir_resultados(nombre, modelo, X):
         print(f"\nModelo {nombre}:")
@@ -21,52 +387,51 @@ def analizar_modelos(x, y):
 
     print("=== REGRESIÓN LINEAL ===")
     # Lineal: y = a + b*x
-    X_lineal = sm.add_constant(x)
+    X_lineal, _ = disenos["Lineal"]
     modelo_lineal = sm.OLS(y, X_lineal).fit()
     imprimir_resultados("Lineal", modelo_lineal, X_lineal)
 
     print("\n=== REGRESIÓN LOGARÍTMICA ===")
     # Logarítmica: y = a + b*ln(x)
-    x_log = np.log(x)
-    X_log = sm.add_constant(x_log)
+    X_log, _ = disenos["Logarítmico"]
     modelo_log = sm.OLS(y, X_log).fit()
     imprimir_resultados("Logarítmico", modelo_log, X_log)
 
     print("\n=== REGRESIÓN PARABÓLICA (CUADRÁTICA) ===")
     # Cuadrática: y = a + b1*x + b2*x²
-    x2 = x**2
-    X_parab = sm.add_constant(np.column_stack((x, x2)))
+    X_parab, _ = disenos["Parabólico"]
     modelo_parab = sm.OLS(y, X_parab).fit()
     imprimir_resultados("Parabólico", modelo_parab, X_parab)
 
     print("\n=== REGRESIÓN EXPONENCIAL ===")
     # Exponencial: y = a * e^(b*x) → ln(y) = ln(a) + b*x
-    ln_y = np.log(y)
-    X_exp = sm.add_constant(x)
+    X_exp, ln_y = disenos["Exponencial"]
     modelo_exp = sm.OLS(ln_y, X_exp).fit()
     imprimir_resultados("Exponencial", modelo_exp, X_exp)
 
     print("\n=== REGRESIÓN POTENCIAL ===")
     # Potencial: y = a*x^b → ln(y) = ln(a) + b*ln(x)
-    ln_x = np.log(x)
-    ln_y = np.log(y)
-    X_pot = sm.add_constant(ln_x)
+    X_pot, ln_y = disenos["Potencial"]
     modelo_pot = sm.OLS(ln_y, X_pot).fit()
     imprimir_resultados("Potencial", modelo_pot, X_pot)
 
-# Ejemplo de uso
-x = [1900
-,1910
-,1920
-,1930
-,1940
-,1950
-]
-y = [75,
-91.97,
-105.7,
-122.78,
-131.7,
-178.5
-]
-analizar_modelos(x, y)
+if __name__ == "__main__":
+    # Ejemplo de uso
+    x = [1900
+    ,1910
+    ,1920
+    ,1930
+    ,1940
+    ,1950
+    ]
+    y = [75,
+    91.97,
+    105.7,
+    122.78,
+    131.7,
+    178.5
+    ]
+    analizar_modelos(x, y)
+
+    verificar_ligero()
+    verificar_curvas()
@@ -1,6 +1,37 @@
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+from scipy import stats
 import statsmodels.api as sm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from remuestreo import intervalos_bootstrap
+
+
+def _imprimir_resultados(coeficientes, r_squared, t_vals, p_vals, correlaciones):
+    print("\nCoeficientes:")
+    for i, coef in enumerate(coeficientes):
+        if i == 0:
+            print(f"Intercepto (a): {coef}")
+        else:
+            print(f"Coeficiente x{i}: {coef}")
+
+    print(f"\nR²: {r_squared}")
+
+    print("\nEstadísticos t y p-valores:")
+    for i, (t, p) in enumerate(zip(t_vals, p_vals)):
+        nombre = "Intercepto" if i == 0 else f"x{i}"
+        print(f"{nombre}: t = {t}, p = {p}")
+
+    # Matriz de correlación entre y y cada x
+    print("\nCoeficientes de correlación de Pearson entre cada xᵢ y y:")
+    for i, r in enumerate(correlaciones):
+        print(f"r(x{i}, y): {r}")
+
+
 def regresion_multiple(y, *x_listas):
     """
     Realiza regresión lineal múltiple con análisis estadístico
@@ -18,29 +49,475 @@ def regresion_multiple(y, *x_listas):
     print("=== REGRESIÓN MÚLTIPLE ===")
     print(modelo.summary())
 
-    print("\nCoeficientes:")
-    for i, coef in enumerate(modelo.params):
-        if i == 0:
-            print(f"Intercepto (a): {coef}")
+    correlaciones = [np.corrcoef(x, y)[0, 1] for x in X_vars]
+    _imprimir_resultados(modelo.params, modelo.rsquared, modelo.tvalues, modelo.pvalues, correlaciones)
+
+
+def bootstrap_regresion_multiple(y, *x_listas, tipo="pares", replicas=10_000, nivel=0.95,
+                                 tam_bloque=500, semilla=None, procesos=1):
+    """
+    Intervalos bootstrap de los coeficientes de regresion_multiple
+    (intercepto primero), por pares o por residuos; ver intervalos_bootstrap.
+    """
+    X = sm.add_constant(np.column_stack([np.array(x, dtype=float) for x in x_listas]))
+    return intervalos_bootstrap(X, np.array(y, dtype=float), tipo, replicas, nivel,
+                                tam_bloque, semilla, procesos)
+
+
+class MomentosRegresion:
+    """
+    Estadísticos suficientes de una regresión lineal: n, medias y matriz de
+    comomentos centrados de las columnas [x1, ..., xp, y].
+
+    Con eso alcanzan XᵀX, Xᵀy e yᵀy (centrados) para los coeficientes, R², t,
+    p y las correlaciones de Pearson. Dos fragmentos se combinan con la
+    versión matricial de la fórmula de Chan et al.,
+
+        C = C_a + C_b + δ δᵀ · n_a n_b / n,   δ = media_b - media_a,
+
+    que es estable aunque las medias sean grandes frente a la dispersión, a
+    diferencia de sumar productos crudos. Es un objeto simple que se puede
+    serializar con pickle.
+    """
+
+    def __init__(self, n=0, media=None, comomentos=None):
+        self.n = n
+        self.media = media
+        self.comomentos = comomentos
+
+    def actualizar(self, bloque):
+        """
+        Incorpora un bloque (filas, p + 1) con la y en la última columna; las
+        filas con algún NaN se descartan.
+        """
+        bloque = np.asarray(bloque, dtype=float)
+        bloque = bloque[~np.isnan(bloque).any(axis=1)]
+        if len(bloque) == 0:
+            return self
+        media = bloque.mean(axis=0)
+        centrado = bloque - media
+        nuevo = self.combinar(MomentosRegresion(len(bloque), media, centrado.T @ centrado))
+        self.n, self.media, self.comomentos = nuevo.n, nuevo.media, nuevo.comomentos
+        return self
+
+    def combinar(self, otro):
+        """Devuelve los momentos de ambos fragmentos juntos."""
+        if otro.n == 0:
+            return MomentosRegresion(self.n, self.media, self.comomentos)
+        if self.n == 0:
+            return MomentosRegresion(otro.n, otro.media, otro.comomentos)
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        media = self.media + delta * otro.n / n
+        comomentos = self.comomentos + otro.comomentos + np.outer(delta, delta) * self.n * otro.n / n
+        return MomentosRegresion(n, media, comomentos)
+
+    __add__ = combinar
+
+    def resultados(self):
+        """
+        Coeficientes (intercepto primero), errores estándar, t, p, R² y
+        correlaciones de Pearson de cada x con y, iguales a los de sm.OLS
+        con constante.
+        """
+        p = len(self.media) - 1
+        cxx = self.comomentos[:p, :p]
+        cxy = self.comomentos[:p, p]
+        cyy = self.comomentos[p, p]
+        media_x, media_y = self.media[:p], self.media[p]
+
+        inversa = np.linalg.inv(cxx)
+        pendientes = inversa @ cxy
+        intercepto = media_y - media_x @ pendientes
+        sce = cyy - cxy @ pendientes
+        df = self.n - p - 1
+        s2 = sce / df
+
+        # Var(a) = s²(1/n + x̄ᵀ Cxx⁻¹ x̄); Var(b) = s² diag(Cxx⁻¹)
+        varianzas = s2 * np.concatenate([[1 / self.n + media_x @ inversa @ media_x], np.diag(inversa)])
+        coeficientes = np.concatenate([[intercepto], pendientes])
+        errores = np.sqrt(varianzas)
+        t_vals = coeficientes / errores
+        return {
+            "n": self.n,
+            "Coeficientes": coeficientes,
+            "Errores estándar": errores,
+            "t": t_vals,
+            "p": 2 * stats.t.sf(np.abs(t_vals), df),
+            "R²": 1 - sce / cyy,
+            "Correlaciones": cxy / np.sqrt(np.diag(cxx) * cyy)
+        }
+
+
+def _barrer(matriz, k):
+    """
+    Operador sweep simétrico sobre el pivote k, en el lugar. Un pivote ya
+    barrido tiene diagonal negativa (-1/d) y entonces se aplica el barrido
+    inverso, que cambia el signo de la fila y columna k: barrer dos veces k
+    devuelve la matriz original, así que agregar y quitar una variable del
+    modelo cuesta O(p²).
+    """
+    d = matriz[k, k]
+    fila = matriz[k].copy()
+    matriz -= np.outer(fila, fila) / d
+    matriz[k] = fila / d if d > 0 else -fila / d
+    matriz[:, k] = matriz[k]
+    matriz[k, k] = -1 / d
+
+
+def _criterios(sce, q, n, stc):
+    """R², R² ajustado, AIC y BIC (como sm.OLS) de un modelo con q predictores."""
+    log_verosimilitud = -n / 2 * (np.log(2 * np.pi * sce / n) + 1)
+    return {
+        "SCE": sce,
+        "R²": 1 - sce / stc,
+        "R² ajustado": 1 - (sce / (n - q - 1)) / (stc / (n - 1)),
+        "AIC": -2 * log_verosimilitud + 2 * (q + 1),
+        "BIC": -2 * log_verosimilitud + np.log(n) * (q + 1),
+    }
+
+
+# Clave de orden de cada criterio (menor es mejor)
+_ORDEN_CRITERIO = {"r2_ajustado": lambda m: -m["R² ajustado"],
+                   "aic": lambda m: m["AIC"], "bic": lambda m: m["BIC"]}
+
+
+def _paso_a_paso(comomentos, n, criterio, metodo):
+    """
+    Selección hacia adelante o hacia atrás. En cada paso el cambio de SCE de
+    agregar o quitar cada variable sale de la matriz barrida sin barrer
+    (ΔSCE_j = -a_jy² / a_jj); solo se barre la variable elegida.
+    """
+    p = comomentos.shape[0] - 1
+    matriz = comomentos.copy()
+    stc = comomentos[p, p]
+    incluidas = np.zeros(p, dtype=bool)
+    if metodo == "atras":
+        for j in range(p):
+            _barrer(matriz, j)
+        incluidas[:] = True
+
+    clave = _ORDEN_CRITERIO[criterio]
+    actual = dict(_criterios(matriz[p, p], int(incluidas.sum()), n, stc),
+                  Predictores=tuple((np.flatnonzero(incluidas) + 1).tolist()))
+    recorrido = [actual]
+    while True:
+        candidatas = np.flatnonzero(incluidas if metodo == "atras" else ~incluidas)
+        if len(candidatas) == 0:
+            return recorrido
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sce = matriz[p, p] - matriz[candidatas, p] ** 2 / matriz[candidatas, candidatas]
+        q = int(incluidas.sum()) + (-1 if metodo == "atras" else 1)
+        valores = [clave(_criterios(s, q, n, stc)) for s in sce]
+        mejor = int(np.nanargmin(valores))
+        if not valores[mejor] < clave(actual):
+            return recorrido
+        j = candidatas[mejor]
+        _barrer(matriz, j)
+        incluidas[j] = not incluidas[j]
+        actual = dict(_criterios(matriz[p, p], q, n, stc),
+                      Predictores=tuple((np.flatnonzero(incluidas) + 1).tolist()))
+        recorrido.append(actual)
+
+
+def _mejores_subconjuntos(comomentos, n, cotas_iniciales):
+    """
+    Mejor subconjunto (menor SCE) de cada tamaño por ramificación y poda.
+
+    Se parte del modelo completo y se quitan variables; cada subconjunto se
+    visita una sola vez porque un nodo solo puede quitar variables de su
+    lista de candidatas. Como quitar variables nunca baja la SCE, la SCE de
+    un nodo acota la de todos sus descendientes y la rama se poda si no
+    mejora ningún tamaño alcanzable. Las candidatas se ordenan de mayor a
+    menor ΔSCE para que los subárboles grandes cuelguen de los nodos con
+    SCE alta, que son los que más se podan.
+    """
+    p = comomentos.shape[0] - 1
+    mejor_sce = np.full(p + 1, np.inf)
+    mejor_conjunto = [None] * (p + 1)
+    for conjunto, sce in cotas_iniciales:
+        if sce < mejor_sce[len(conjunto)]:
+            mejor_sce[len(conjunto)], mejor_conjunto[len(conjunto)] = sce, conjunto
+
+    completa = comomentos.copy()
+    for j in range(p):
+        _barrer(completa, j)
+
+    def visitar(matriz, incluidas, candidatas):
+        q = len(incluidas)
+        if matriz[p, p] < mejor_sce[q]:
+            mejor_sce[q], mejor_conjunto[q] = matriz[p, p], tuple(sorted(incluidas))
+        if not candidatas:
+            return
+        candidatas = np.array(candidatas)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = -matriz[candidatas, p] ** 2 / matriz[candidatas, candidatas]
+        orden = np.argsort(-delta)
+        candidatas, delta = candidatas[orden], delta[orden]
+        for i, j in enumerate(candidatas):
+            restantes = candidatas[i + 1:]
+            sce_hijo = matriz[p, p] + delta[i]
+            # El hijo alcanza los tamaños q-1-len(restantes) .. q-1
+            if np.all(sce_hijo >= mejor_sce[q - 1 - len(restantes):q]):
+                continue
+            hijo = matriz.copy()
+            _barrer(hijo, j)
+            visitar(hijo, [v for v in incluidas if v != j], list(restantes))
+
+    visitar(completa, list(range(p)), list(range(p)))
+    return [(conjunto, sce) for conjunto, sce in zip(mejor_conjunto, mejor_sce) if conjunto is not None]
+
+
+def buscar_predictores_momentos(momentos, metodo="exhaustivo", criterio="bic", max_exhaustivo=40):
+    """
+    Búsqueda de predictores a partir de los MomentosRegresion de todos los
+    candidatos (por ejemplo, acumulados con regresion_multiple_por_bloques).
+
+    Parámetros:
+    - momentos: MomentosRegresion con las columnas [x1, ..., xp, y]
+    - metodo: 'adelante', 'atras' o 'exhaustivo' (mejor subconjunto)
+    - criterio: 'bic', 'aic' o 'r2_ajustado' para ordenar y detener la búsqueda
+    - max_exhaustivo: máximo de candidatos para el método exhaustivo
+
+    La matriz de productos cruzados se forma una sola vez y cada modelo se
+    obtiene barriendo (operador sweep) una variable a partir de otro, sin
+    reajustar. El exhaustivo halla el mejor subconjunto de cada tamaño con
+    ramificación y poda, sembrando las cotas con los dos métodos paso a paso;
+    dentro de un tamaño fijo R² ajustado, AIC y BIC ordenan igual que la SCE,
+    así que el mejor modelo global está entre ellos.
+
+    Retorna:
+    - diccionario con el mejor modelo y la lista de modelos evaluados
+      (recorrido paso a paso, o el mejor de cada tamaño), ordenada por el
+      criterio. Los predictores se numeran x1..xp como en regresion_multiple.
+    """
+    if criterio not in _ORDEN_CRITERIO:
+        raise ValueError("El criterio debe ser 'bic', 'aic' o 'r2_ajustado'.")
+    comomentos, n = momentos.comomentos, momentos.n
+    p = comomentos.shape[0] - 1
+
+    if metodo in ("adelante", "atras"):
+        modelos = _paso_a_paso(comomentos, n, criterio, metodo)
+    elif metodo == "exhaustivo":
+        if p > max_exhaustivo:
+            raise ValueError(f"Demasiados candidatos para el método exhaustivo ({p} > {max_exhaustivo}).")
+        cotas = [(tuple(v - 1 for v in m["Predictores"]), m["SCE"])
+                 for metodo_paso in ("adelante", "atras")
+                 for m in _paso_a_paso(comomentos, n, criterio, metodo_paso)]
+        stc = comomentos[p, p]
+        modelos = [dict(_criterios(sce, len(conjunto), n, stc), Predictores=tuple(int(v) + 1 for v in conjunto))
+                   for conjunto, sce in _mejores_subconjuntos(comomentos, n, cotas)]
+    else:
+        raise ValueError("El método debe ser 'adelante', 'atras' o 'exhaustivo'.")
+
+    modelos = sorted(modelos, key=_ORDEN_CRITERIO[criterio])
+    return {"Mejor modelo": modelos[0], "Modelos": modelos}
+
+
+def buscar_predictores(y, *x_listas, metodo="exhaustivo", criterio="bic", max_exhaustivo=40):
+    """
+    Búsqueda de predictores para y entre las variables x_listas (ver
+    buscar_predictores_momentos), en lugar de llamar a regresion_multiple
+    con cada combinación.
+    """
+    bloque = np.column_stack([np.asarray(x, dtype=float) for x in x_listas] + [np.asarray(y, dtype=float)])
+    momentos = MomentosRegresion().actualizar(bloque)
+    return buscar_predictores_momentos(momentos, metodo, criterio, max_exhaustivo)
+
+
+def _tareas_archivo(ruta, formato, tam_bloque, procesos, dtype, num_columnas):
+    """
+    Divide el archivo en tareas independientes: rangos de filas para 'npy' y
+    'bin', rangos de bytes alineados a líneas para 'csv' y grupos de filas
+    para 'parquet'.
+    """
+    if formato in ("npy", "bin"):
+        filas = len(_abrir_matriz(ruta, formato, dtype, num_columnas))
+        return [(inicio, min(inicio + tam_bloque, filas)) for inicio in range(0, filas, tam_bloque)]
+    if formato == "csv":
+        tamano = os.path.getsize(ruta)
+        partes = max(1, 4 * (procesos or os.cpu_count() or 1))
+        cortes = np.linspace(0, tamano, partes + 1).astype(np.int64)
+        return [(int(a), int(b)) for a, b in zip(cortes[:-1], cortes[1:]) if b > a]
+    import pyarrow.parquet as pq
+    return [(grupo, None) for grupo in range(pq.ParquetFile(ruta).num_row_groups)]
+
+
+def _abrir_matriz(ruta, formato, dtype, num_columnas):
+    if formato == "npy":
+        return np.load(ruta, mmap_mode="r")
+    return np.memmap(ruta, dtype=dtype, mode="r").reshape(-1, num_columnas)
+
+
+def _momentos_tarea(argumentos):
+    """Momentos de una tarea de _tareas_archivo, leída por bloques."""
+    ruta, formato, (inicio, fin), columnas, tam_bloque, dtype, num_columnas, encabezado = argumentos
+    momentos = MomentosRegresion()
+
+    if formato in ("npy", "bin"):
+        matriz = _abrir_matriz(ruta, formato, dtype, num_columnas)
+        return momentos.actualizar(matriz[inicio:fin][:, columnas])
+
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta)
+        for lote in archivo.iter_batches(batch_size=tam_bloque, row_groups=[inicio], columns=columnas):
+            momentos.actualizar(np.column_stack([lote.column(c).to_numpy(zero_copy_only=False)
+                                                 for c in columnas]))
+        return momentos
+
+    # CSV: cada línea pertenece a la tarea en cuyo rango empieza
+    with open(ruta, "rb") as f:
+        if inicio > 0:
+            f.seek(inicio - 1)
+            posicion = inicio - 1 + len(f.readline())
         else:
-            print(f"Coeficiente x{i}: {coef}")
+            posicion = 0
+            if encabezado:
+                posicion += len(f.readline())
+        while posicion < fin:
+            lineas = []
+            for linea in itertools.islice(f, tam_bloque):
+                lineas.append(linea.decode())
+                posicion += len(linea)
+                if posicion >= fin:
+                    break
+            if not lineas:
+                break
+            momentos.actualizar(np.loadtxt(lineas, delimiter=",", usecols=columnas, ndmin=2))
+    return momentos
 
-    print(f"\nR²: {modelo.rsquared}")
-    
-    print("\nEstadísticos t y p-valores:")
-    for i, (t, p) in enumerate(zip(modelo.tvalues, modelo.pvalues)):
-        nombre = "Intercepto" if i == 0 else f"x{i}"
-        print(f"{nombre}: t = {t}, p = {p}")
 
-    # Matriz de correlación entre y y cada x
-    print("\nCoeficientes de correlación de Pearson entre cada xᵢ y y:")
-    for i, x in enumerate(X_vars):
-        r = np.corrcoef(x, y)[0, 1]
-        print(f"r(x{i}, y): {r}")
+def regresion_multiple_por_bloques(ruta, columna_y, columnas_x, formato=None, procesos=None,
+                                   tam_bloque=1_000_000, dtype="float64", num_columnas=None,
+                                   encabezado=False, imprimir=True):
+    """
+    Regresión lineal múltiple sobre un archivo que no cabe en memoria, en una
+    sola pasada por bloques y en un pool de procesos.
+
+    Parámetros:
+    - ruta: archivo .csv, .parquet, .npy (memory-map) o binario crudo
+    - columna_y: columna de la variable dependiente (índice, o nombre en Parquet)
+    - columnas_x: columnas de las variables independientes
+    - formato: 'csv', 'parquet', 'npy' o 'bin' (por defecto según la extensión)
+    - procesos: número de procesos (None usa todos los núcleos; 1 no usa pool)
+    - tam_bloque: filas leídas por bloque
+    - dtype, num_columnas: tipo y número de columnas de los binarios crudos
+    - encabezado: si el CSV tiene una fila de encabezado
+    - imprimir: muestra los mismos resultados que regresion_multiple (sin
+      el summary() de statsmodels, que necesita los datos)
+
+    Cada tarea acumula sus MomentosRegresion y los parciales se combinan al
+    final, así que la memoria queda acotada por tam_bloque. Requiere pyarrow
+    solo para Parquet.
+
+    Retorna:
+    - diccionario de MomentosRegresion.resultados()
+    """
+    if formato is None:
+        extension = os.path.splitext(ruta)[1].lower()
+        formato = {".csv": "csv", ".txt": "csv", ".parquet": "parquet", ".npy": "npy"}.get(extension, "bin")
+    if formato not in ("csv", "parquet", "npy", "bin"):
+        raise ValueError("El formato debe ser 'csv', 'parquet', 'npy' o 'bin'.")
+    if formato == "bin" and num_columnas is None:
+        raise ValueError("Los binarios crudos necesitan num_columnas.")
+
+    columnas = list(columnas_x) + [columna_y]
+    tareas = [(ruta, formato, rango, columnas, tam_bloque, dtype, num_columnas, encabezado)
+              for rango in _tareas_archivo(ruta, formato, tam_bloque, procesos, dtype, num_columnas)]
+    if procesos == 1 or len(tareas) <= 1:
+        parciales = map(_momentos_tarea, tareas)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            parciales = list(pool.map(_momentos_tarea, tareas))
+
+    momentos = MomentosRegresion()
+    for parcial in parciales:
+        momentos = momentos + parcial
+    resultado = momentos.resultados()
+
+    if imprimir:
+        print("=== REGRESIÓN MÚLTIPLE (POR BLOQUES) ===")
+        print(f"Observaciones: {resultado['n']}")
+        _imprimir_resultados(resultado["Coeficientes"], resultado["R²"], resultado["t"],
+                             resultado["p"], resultado["Correlaciones"])
+    return resultado
+
+
+def verificar_busqueda(semilla=0, tolerancia=1e-8):
+    """
+    Compara buscar_predictores (método exhaustivo) con ajustar sm.OLS sobre
+    todos los subconjuntos de 5 candidatos, para cada criterio, y comprueba
+    que barrer dos veces un pivote devuelve la matriz original. Lanza
+    AssertionError si algo no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    X = rng.normal(size=(60, 5))
+    y = 1 + 2 * X[:, 0] - X[:, 2] + 0.3 * X[:, 4] + rng.normal(size=60)
+
+    subconjuntos = [c for q in range(6) for c in itertools.combinations(range(5), q)]
+    ajustes = {c: sm.OLS(y, np.column_stack([np.ones(60)] + [X[:, j] for j in c])).fit() for c in subconjuntos}
+    referencia = {"bic": lambda f: f.bic, "aic": lambda f: f.aic, "r2_ajustado": lambda f: -f.rsquared_adj}
+    for criterio, clave in referencia.items():
+        mejor = min(subconjuntos, key=lambda c: clave(ajustes[c]))
+        modelo = buscar_predictores(y, *X.T, criterio=criterio)["Mejor modelo"]
+        assert modelo["Predictores"] == tuple(j + 1 for j in mejor), f"Mejor modelo distinto ({criterio})."
+        assert np.isclose(modelo["AIC"], ajustes[mejor].aic, rtol=tolerancia, atol=0), "El AIC no coincide."
+
+    comomentos = MomentosRegresion().actualizar(np.column_stack([X, y])).comomentos
+    matriz = comomentos.copy()
+    for k in (0, 3, 1, 3, 1, 0):
+        _barrer(matriz, k)
+    assert np.allclose(matriz, comomentos, rtol=tolerancia, atol=0), "Barrer dos veces no es la identidad."
+
+
+def verificar_momentos(semilla=0, tolerancia=1e-8):
+    """
+    Compara MomentosRegresion, acumulado en fragmentos (uno vacío y filas
+    con NaN incluidos), y regresion_multiple_por_bloques sobre archivos .npy,
+    .csv y binario crudo, con y sin pool, contra sm.OLS con constante sobre
+    los datos completos. Lanza AssertionError si algo no coincide.
+    """
+    import tempfile
+
+    rng = np.random.default_rng(semilla)
+    X = 1000 + rng.normal(size=(200, 3))
+    y = 5 + 2 * X[:, 0] - X[:, 1] + rng.normal(size=200)
+    datos = np.column_stack([X, y])
+    ajuste = sm.OLS(y, sm.add_constant(X)).fit()
+
+    def comparar(resultado):
+        assert resultado["n"] == 200, "El número de observaciones no coincide."
+        for clave, referencia in (("Coeficientes", ajuste.params), ("Errores estándar", ajuste.bse),
+                                  ("t", ajuste.tvalues), ("p", ajuste.pvalues), ("R²", ajuste.rsquared)):
+            assert np.allclose(resultado[clave], referencia, rtol=tolerancia, atol=0), (
+                f"{clave} no coincide con statsmodels.")
+
+    con_nan = np.vstack([datos[:70], [[np.nan, 1, 2, 3]], datos[70:]])
+    momentos = MomentosRegresion()
+    for fragmento in (con_nan[:50], con_nan[50:50], con_nan[50:130], con_nan[130:]):
+        momentos = momentos + MomentosRegresion().actualizar(fragmento)
+    comparar(momentos.resultados())
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = {"npy": os.path.join(carpeta, "datos.npy"), "csv": os.path.join(carpeta, "datos.csv"),
+                 "bin": os.path.join(carpeta, "datos.bin")}
+        np.save(rutas["npy"], datos)
+        np.savetxt(rutas["csv"], datos, delimiter=",", fmt="%.17g")
+        datos.tofile(rutas["bin"])
+        for formato, ruta in rutas.items():
+            for procesos in (1, 2):
+                comparar(regresion_multiple_por_bloques(ruta, 3, [0, 1, 2], procesos=procesos, tam_bloque=37,
+                                                        num_columnas=4, imprimir=False))
+
+
+if __name__ == "__main__":
+    # Ejemplo de uso
+    y = [10, 12, 13, 15, 18]
+    x1 = [1, 2, 3, 4, 5]
+    x2 = [2, 3, 5, 7, 11]
 
-# Ejemplo de uso
-y = [10, 12, 13, 15, 18]
-x1 = [1, 2, 3, 4, 5]
-x2 = [2, 3, 5, 7, 11]
+    regresion_multiple(y, x1, x2)
 
-regresion_multiple(y, x1, x2)
+    verificar_busqueda()
+    verificar_momentos()
@@ -1,63 +1,219 @@
-from scipy.stats import kruskal, chi2, rankdata
-
-# Valores de entrada: puedes modificar estos grupos
-grupo1 = [4, 5, 3, 3, 6, 1, 2, 2, 7, 5, 6, 4]
-grupo2 = [1, 3, 2, 1, 1, 3, 4, 5]
-
-# Lista de todos los grupos
-grupos = [grupo1, grupo2]
-nombres_grupos = [f"Grupo {i+1}" for i in range(len(grupos))]
-
-# Parámetros
-k = len(grupos)
-n = sum(len(g) for g in grupos)
-df = k - 1
-alpha = 0.05
-
-# Concatenar datos y asignar rangos
-todos_los_datos = sum(grupos, [])
-ranks = rankdata(todos_los_datos)
-
-# Asignar rangos a cada grupo
-rangos_por_grupo = []
-inicio = 0
-for grupo in grupos:
-    fin = inicio + len(grupo)
-    rangos = ranks[inicio:fin]
-    rangos_por_grupo.append(rangos)
-    inicio = fin
-
-# Mostrar valores, rangos y suma de rangos de cada grupo
-for nombre, grupo, rangos in zip(nombres_grupos, grupos, rangos_por_grupo):
-    rangos_lista = [float(r) for r in rangos]  # convertir a float simple
-    suma_rangos = sum(rangos_lista)
-    print(f"\n{nombre} (n = {len(grupo)}):")
-    print(f"  Valores: {grupo}")
-    print(f"  Rangos:  {rangos_lista}")
-    print(f"  Suma de rangos: {suma_rangos:.2f}")
-
-# Prueba de Kruskal-Wallis
-stat, p = kruskal(*grupos)
-
-# Valor crítico
-critical_value = chi2.ppf(1 - alpha, df)
-
-# Tamaño del efecto (eta²)
-eta_squared = (stat - k + 1) / (n - k)
-
-# Resultados
-print(f"\nEstadístico H de Kruskal-Wallis: {stat:.4f}")
-print(f"Valor p: {p:.4f}")
-print(f"Valor crítico para α = {alpha}: {critical_value:.4f}")
-print(f"Tamaño del efecto (η²): {eta_squared:.4f}")
-
-# Interpretaciones
-if p < alpha:
-    print("Resultado (valor p): Diferencias significativas entre los grupos.")
-else:
-    print("Resultado (valor p): No hay diferencias significativas entre los grupos.")
-
-if stat > critical_value:
-    print("Resultado (valor crítico): H > valor crítico → se rechaza H0.")
-else:
-    print("Resultado (valor crítico): H <= valor crítico → no se rechaza H0.")
+import os
+import sys
+
+import numpy as np
+from scipy.stats import kruskal, rankdata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rangos import (alinear_conteos, rango_entero, rangos_desde_conteos, rangos_medios_ordenados,
+                    tabla_conteos)
+from valores_criticos import ajustar_valores_p, valor_critico, valor_p
+
+
+def _estadistico_h(sumas, tamanos, suma_empates):
+    """H de Kruskal-Wallis corregido por empates a partir de las sumas de rangos."""
+    n = np.sum(tamanos, axis=-1)
+    h = 12 / (n * (n + 1)) * np.sum(sumas ** 2 / tamanos, axis=-1) - 3 * (n + 1)
+    return h / (1 - suma_empates / (n ** 3 - n))
+
+
+def _dunn(rangos_medios, tamanos, suma_empates, ajuste):
+    """
+    Comparaciones de Dunn entre todos los pares de grupos como matrices
+    (k, k) calculadas de una vez a partir de los rangos medios:
+
+        z_ij = (R̄_i - R̄_j) / sqrt((N(N+1)/12 - Σ(t³-t)/(12(N-1))) (1/n_i + 1/n_j))
+
+    El ajuste por comparaciones múltiples se aplica a los k(k-1)/2 pares del
+    triángulo superior y se refleja en la matriz.
+    """
+    n = tamanos.sum()
+    varianza = n * (n + 1) / 12 - suma_empates / (12 * (n - 1))
+    inversos = 1 / tamanos
+    z = (rangos_medios[:, None] - rangos_medios[None, :]) / np.sqrt(
+        varianza * (inversos[:, None] + inversos[None, :]))
+    p = valor_p('norm', z)
+
+    filas, columnas = np.triu_indices(len(tamanos), k=1)
+    p_ajustado = np.zeros_like(p)
+    p_ajustado[filas, columnas] = ajustar_valores_p(p[filas, columnas], ajuste) if ajuste else p[filas, columnas]
+    p_ajustado += p_ajustado.T
+    np.fill_diagonal(p_ajustado, 1.0)
+    return z, p, p_ajustado
+
+
+def _resultado_kruskal(sumas, tamanos, suma_empates, alpha, ajuste):
+    """H, valor p, valor crítico, η² y post-hoc de Dunn desde las sumas de rangos."""
+    k = len(tamanos)
+    n = tamanos.sum()
+    h = _estadistico_h(sumas, tamanos, suma_empates)
+    critico = valor_critico('chi2', alpha, k - 1, 'greater')
+    rangos_medios = sumas / tamanos
+    z, p, p_ajustado = _dunn(rangos_medios, tamanos, suma_empates, ajuste)
+    return {
+        "Estadístico H": h,
+        "Grados de libertad": k - 1,
+        "Valor p": valor_p('chi2', h, k - 1),
+        "Valor crítico": critico,
+        "Tamaño del efecto (η²)": (h - k + 1) / (n - k),
+        "Suma de rangos por grupo": sumas,
+        "Rango medio por grupo": rangos_medios,
+        "Rechaza H₀": h > critico,
+        "Dunn Z": z,
+        "Dunn valor p": p,
+        "Dunn valor p ajustado": p_ajustado,
+        "Dunn significativo": p_ajustado < alpha
+    }
+
+
+def kruskal_wallis(*grupos, alpha=0.05, ajuste='holm'):
+    """
+    Prueba de Kruskal-Wallis con tamaño del efecto y post-hoc de Dunn.
+
+    Parámetros:
+    - *grupos: listas o arrays de valores, uno por grupo
+    - alpha: nivel de significancia (por defecto 0.05)
+    - ajuste: 'holm', 'fdr_bh', 'bonferroni' o None para los valores p de
+      Dunn
+
+    Los datos combinados se ordenan una sola vez (o, si son enteros
+    pequeños, se cuentan con una tabla en O(n + rango)); de ese único
+    ranking salen H, η², los rangos medios y todas las comparaciones de
+    Dunn como matrices (k, k), sin una prueba por par.
+
+    Retorna:
+    - diccionario con H, gl, valor p, valor crítico, η², sumas y rangos
+      medios por grupo, los rangos de cada observación por grupo y las
+      matrices de Dunn (Z, valor p, valor p ajustado y decisión)
+    """
+    tamanos = np.array([len(g) for g in grupos])
+    k = len(grupos)
+    datos = np.concatenate([np.asarray(g) for g in grupos])
+    etiquetas = np.repeat(np.arange(k), tamanos)
+
+    entero = rango_entero(datos)
+    if entero is not None:
+        minimo, cubetas = entero
+        rangos_medios, sumas, _, suma_empates = rangos_desde_conteos(
+            tabla_conteos(etiquetas, datos, k, minimo, cubetas))
+        rangos = rangos_medios[datos.astype(np.int64) - minimo]
+    else:
+        # Un solo argsort da los rangos medios y los tamaños de los empates
+        orden = np.argsort(datos, kind="stable")
+        rangos_ordenados, repeticiones = rangos_medios_ordenados(datos[orden][:, None])
+        rangos = np.empty(len(datos))
+        rangos[orden] = rangos_ordenados[:, 0]
+        sumas = np.bincount(etiquetas, weights=rangos, minlength=k)
+        # Cada elemento de un grupo de t empates aporta t² - 1, y su suma es Σ (t³ - t)
+        suma_empates = np.sum(repeticiones.astype(float) ** 2 - 1)
+
+    resultado = _resultado_kruskal(sumas, tamanos, suma_empates, alpha, ajuste)
+    resultado["Rangos por grupo"] = np.split(rangos, np.cumsum(tamanos)[:-1])
+    return resultado
+
+
+def kruskal_wallis_conteos(tablas, alpha=0.05, ajuste='holm'):
+    """
+    Prueba de Kruskal-Wallis a partir de tablas de conteos por valor, sin
+    ordenar observaciones: O(grupos * valores distintos).
+
+    Parámetros:
+    - tablas: por grupo, un diccionario {valor: conteo} o un par
+      (valores, conteos); p. ej. cuántas respuestas 1..7 tuvo cada grupo
+    - alpha: nivel de significancia
+    - ajuste: corrección de los valores p de Dunn, como en kruskal_wallis
+
+    Retorna:
+    - el diccionario de kruskal_wallis (sin los rangos por observación) más
+      el rango medio de cada valor
+    """
+    valores, tabla = alinear_conteos(tablas)
+    rangos_medios, sumas, tamanos, suma_empates = rangos_desde_conteos(tabla)
+    resultado = _resultado_kruskal(sumas, tamanos, suma_empates, alpha, ajuste)
+    resultado["Rangos por valor"] = dict(zip(valores.tolist(), rangos_medios.tolist()))
+    return resultado
+
+
+def verificar_kruskal(semilla=0, tolerancia=1e-10):
+    """
+    Compara kruskal_wallis (datos con empates no enteros y enteros pequeños)
+    y kruskal_wallis_conteos con scipy.stats.kruskal, los rangos con
+    rankdata y, con dos grupos, Z² de Dunn con H. Lanza AssertionError si
+    algo difiere en más de la tolerancia relativa.
+    """
+    rng = np.random.default_rng(semilla)
+    casos = [
+        [np.round(rng.normal(m, 1, n), 1) for m, n in ((0, 30), (0.4, 25), (0.2, 41), (1, 18))],
+        [rng.integers(1, 8, n) for n in (30, 25, 41, 18)],
+        [np.round(rng.normal(m, 1, n), 1) for m, n in ((0, 30), (0.6, 25))],
+    ]
+    for grupos in casos:
+        referencia = kruskal(*grupos)
+        resultado = kruskal_wallis(*grupos)
+        assert np.isclose(resultado["Estadístico H"], referencia.statistic, rtol=tolerancia, atol=0), (
+            "H no coincide con scipy.")
+        assert np.isclose(resultado["Valor p"], referencia.pvalue, rtol=tolerancia, atol=0), (
+            "El valor p no coincide con scipy.")
+        assert np.allclose(np.concatenate(resultado["Rangos por grupo"]), rankdata(np.concatenate(grupos)),
+                           rtol=tolerancia, atol=0), "Los rangos no coinciden con rankdata."
+        if len(grupos) == 2:
+            assert np.isclose(resultado["Dunn Z"][0, 1] ** 2, referencia.statistic, rtol=tolerancia, atol=0), (
+                "Con dos grupos Z² de Dunn no coincide con H.")
+
+        tablas = [dict(zip(*np.unique(g, return_counts=True))) for g in grupos]
+        resultado = kruskal_wallis_conteos(tablas)
+        assert np.isclose(resultado["Estadístico H"], referencia.statistic, rtol=tolerancia, atol=0), (
+            "H desde conteos no coincide con scipy.")
+
+
+if __name__ == "__main__":
+    # Valores de entrada: puedes modificar estos grupos
+    grupo1 = [4, 5, 3, 3, 6, 1, 2, 2, 7, 5, 6, 4]
+    grupo2 = [1, 3, 2, 1, 1, 3, 4, 5]
+
+    # Lista de todos los grupos
+    grupos = [grupo1, grupo2]
+    nombres_grupos = [f"Grupo {i+1}" for i in range(len(grupos))]
+    alpha = 0.05
+
+    resultado = kruskal_wallis(*grupos, alpha=alpha)
+
+    # Mostrar valores, rangos y suma de rangos de cada grupo
+    for nombre, grupo, rangos in zip(nombres_grupos, grupos, resultado["Rangos por grupo"]):
+        rangos_lista = [float(r) for r in rangos]  # convertir a float simple
+        suma_rangos = sum(rangos_lista)
+        print(f"\n{nombre} (n = {len(grupo)}):")
+        print(f"  Valores: {grupo}")
+        print(f"  Rangos:  {rangos_lista}")
+        print(f"  Suma de rangos: {suma_rangos:.2f}")
+
+    stat = resultado["Estadístico H"]
+    p = resultado["Valor p"]
+    critical_value = resultado["Valor crítico"]
+
+    # Resultados
+    print(f"\nEstadístico H de Kruskal-Wallis: {stat:.4f}")
+    print(f"Valor p: {p:.4f}")
+    print(f"Valor crítico para α = {alpha}: {critical_value:.4f}")
+    print(f"Tamaño del efecto (η²): {resultado['Tamaño del efecto (η²)']:.4f}")
+
+    # Interpretaciones
+    if p < alpha:
+        print("Resultado (valor p): Diferencias significativas entre los grupos.")
+    else:
+        print("Resultado (valor p): No hay diferencias significativas entre los grupos.")
+
+    if stat > critical_value:
+        print("Resultado (valor crítico): H > valor crítico → se rechaza H0.")
+    else:
+        print("Resultado (valor crítico): H <= valor crítico → no se rechaza H0.")
+
+    # Comparaciones por pares (Dunn, valores p ajustados por Holm)
+    print("\nComparaciones de Dunn (valor p ajustado):")
+    for i in range(len(grupos)):
+        for j in range(i + 1, len(grupos)):
+            print(f"  {nombres_grupos[i]} vs {nombres_grupos[j]}: "
+                  f"Z = {resultado['Dunn Z'][i, j]:.4f}, "
+                  f"p = {resultado['Dunn valor p ajustado'][i, j]:.4f}")
+
+    verificar_kruskal()
@@ -0,0 +1,97 @@
+import numpy as np
+
+# Mayor número de valores distintos (máximo - mínimo + 1) para usar conteos
+RANGO_MAXIMO = 1 << 16
+
+
+def rango_entero(datos, rango_maximo=RANGO_MAXIMO):
+    """
+    Detecta datos enteros pequeños (p. ej. escalas Likert 1-7).
+
+    Retorna:
+    - (mínimo, cubetas) si todos los datos son enteros finitos y el rango
+      cabe en rango_maximo cubetas; None en otro caso
+    """
+    datos = np.asarray(datos)
+    if datos.size == 0:
+        return None
+    if not np.issubdtype(datos.dtype, np.integer):
+        if not np.issubdtype(datos.dtype, np.floating) or not np.all(np.isfinite(datos)):
+            return None
+        if not np.all(datos == np.round(datos)):
+            return None
+    minimo, maximo = int(datos.min()), int(datos.max())
+    if maximo - minimo + 1 > rango_maximo:
+        return None
+    return minimo, maximo - minimo + 1
+
+
+def tabla_conteos(etiquetas, datos, num_etiquetas, minimo, cubetas):
+    """
+    Tabla (num_etiquetas, cubetas) de cuántas veces aparece cada valor
+    minimo + j en cada etiqueta (grupo, o grupo y métrica), con un solo
+    np.bincount en O(n + num_etiquetas * cubetas).
+    """
+    indice = np.asarray(etiquetas, dtype=np.int64) * cubetas + (np.asarray(datos) - minimo).astype(np.int64)
+    return np.bincount(indice.ravel(), minlength=num_etiquetas * cubetas).reshape(num_etiquetas, cubetas)
+
+
+def alinear_conteos(tablas):
+    """
+    Une tablas de conteos ya agregadas, una por grupo, sobre los mismos valores.
+
+    Parámetros:
+    - tablas: por grupo, un diccionario {valor: conteo} o un par
+      (valores, conteos)
+
+    Retorna:
+    - (valores ordenados, tabla (grupos, valores) de conteos)
+    """
+    pares = [(list(t.keys()), list(t.values())) if isinstance(t, dict) else t for t in tablas]
+    valores = [np.asarray(v, dtype=float) for v, _ in pares]
+    conteos = [np.asarray(c, dtype=float) for _, c in pares]
+    distintos, posicion = np.unique(np.concatenate(valores), return_inverse=True)
+    etiquetas = np.repeat(np.arange(len(pares)), [len(v) for v in valores])
+    tabla = np.bincount(etiquetas * len(distintos) + posicion, weights=np.concatenate(conteos),
+                        minlength=len(pares) * len(distintos))
+    return distintos, tabla.reshape(len(pares), len(distintos))
+
+
+def rangos_desde_conteos(tabla):
+    """
+    Rangos medios y sumas de rangos a partir de una tabla de conteos
+    (..., grupos, valores), sin ordenar observaciones: O(grupos * valores).
+
+    El valor j ocupa las posiciones C_{j-1} + 1, ..., C_j de la muestra
+    combinada (C es el conteo acumulado), así que su rango medio es
+    C_j - (t_j - 1) / 2 con t_j = conteo total del valor.
+
+    Retorna:
+    - rangos medios por valor (..., valores)
+    - suma de rangos por grupo (..., grupos)
+    - tamaño de cada grupo (..., grupos)
+    - Σ (t³ - t) sobre los valores, para la corrección por empates (...)
+    """
+    tabla = np.asarray(tabla, dtype=float)
+    totales = tabla.sum(axis=-2)
+    rangos_medios = np.cumsum(totales, axis=-1) - (totales - 1) / 2
+    sumas = np.sum(tabla * rangos_medios[..., None, :], axis=-1)
+    return rangos_medios, sumas, tabla.sum(axis=-1), np.sum(totales ** 3 - totales, axis=-1)
+
+
+def rangos_medios_ordenados(ordenados):
+    """
+    Rangos medios (base 1) de una matriz ya ordenada por columnas y, por
+    elemento, el tamaño t de su grupo de empates. Los límites de cada grupo
+    se propagan con máximos acumulados, sin bucles por columna.
+    """
+    n = ordenados.shape[0]
+    indices = np.arange(n)[:, None]
+    nuevo = np.ones(ordenados.shape, dtype=bool)
+    nuevo[1:] = ordenados[1:] != ordenados[:-1]
+    fin = np.ones(ordenados.shape, dtype=bool)
+    fin[:-1] = nuevo[1:]
+
+    inicio = np.maximum.accumulate(np.where(nuevo, indices, 0), axis=0)
+    final = (n - 1) - np.maximum.accumulate(np.where(fin, n - 1 - indices, 0)[::-1], axis=0)[::-1]
+    return (inicio + final) / 2 + 1, final - inicio + 1
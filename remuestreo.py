@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# |r_jj| por debajo de esta fracción del mayor marca una réplica como singular
+_TOLERANCIA_RANGO = 1e-10
+
+
+def _estandarizar(X):
+    """
+    Matriz A (k, k) tal que X @ A tiene las columnas no constantes centradas
+    y escaladas y la constante igual a 1 (sin columna constante solo se
+    escala). Los coeficientes de X @ A se pasan a los de X con β = A β_std,
+    y el diseño queda bien condicionado aunque x valga 1900..1950. Una
+    segunda columna constante (o una columna nula) deja el diseño sin rango
+    completo y lanza ValueError.
+    """
+    k = X.shape[1]
+    medias = X.mean(axis=0)
+    desvios = X.std(axis=0)
+    constantes = np.flatnonzero(np.all(X == X[0], axis=0) & (X[0] != 0))
+    A = np.zeros((k, k))
+    if len(constantes):
+        c = constantes[0]
+        variables = np.setdiff1d(np.arange(k), [c])
+        if np.any(desvios[variables] == 0):
+            raise ValueError("La matriz de diseño no tiene rango completo.")
+        A[c, c] = 1 / X[0, c]
+        A[variables, variables] = 1 / desvios[variables]
+        A[c, variables] = -medias[variables] / (desvios[variables] * X[0, c])
+    else:
+        escalas = np.sqrt(np.mean(X ** 2, axis=0))
+        if np.any(escalas == 0):
+            raise ValueError("La matriz de diseño no tiene rango completo.")
+        A[np.arange(k), np.arange(k)] = 1 / escalas
+    return A
+
+
+def _replicas_bloque(argumentos):
+    """
+    Coeficientes de un bloque de réplicas bootstrap, resueltos juntos.
+
+    - pares: se remuestrean filas (X*, y*) del diseño estandarizado y cada
+      réplica se resuelve con su propia QR, apiladas en una sola llamada.
+      Las réplicas de rango deficiente (menos de k filas distintas o algún
+      |r_jj| despreciable) quedan en NaN sin afectar al resto del bloque.
+    - residuos: X queda fija, así que β* = β̂ + (XᵀX)⁻¹Xᵀe* y el bloque
+      entero es un producto de matrices e* (B, n) @ proyeccion (n, k).
+    """
+    X, y, tipo, replicas, semilla, coeficientes, residuos, proyeccion, A, filas = argumentos
+    rng = np.random.default_rng(semilla)
+    n, k = X.shape
+    indices = rng.integers(0, n, size=(replicas, n))
+
+    if tipo == "residuos":
+        return coeficientes + residuos[indices] @ proyeccion
+
+    q, r = np.linalg.qr(X[indices])
+    qty = np.einsum("bnk,bn->bk", q, y[indices])
+
+    diagonal = np.abs(np.diagonal(r, axis1=-2, axis2=-1))
+    distintas = 1 + np.count_nonzero(np.diff(np.sort(filas[indices], axis=1), axis=1), axis=1)
+    singulares = (distintas < k) | np.any(diagonal <= _TOLERANCIA_RANGO * diagonal.max(axis=-1, keepdims=True),
+                                          axis=-1)
+    r[singulares] = np.eye(k)
+
+    estandarizados = np.linalg.solve(r, qty[..., None])[..., 0]
+    resultado = estandarizados @ A.T
+    resultado[singulares] = np.nan
+    return resultado
+
+
+def intervalos_bootstrap(X, y, tipo="pares", replicas=10_000, nivel=0.95, tam_bloque=500,
+                         semilla=None, procesos=1):
+    """
+    Intervalos de confianza bootstrap (percentiles) de los coeficientes de
+    mínimos cuadrados, con todas las réplicas de un bloque resueltas como
+    una sola operación de álgebra lineal apilada.
+
+    Parámetros:
+    - X: matriz de diseño (n, k), con la columna de unos si hay intercepto
+    - y: respuesta (n,)
+    - tipo: 'pares' (remuestrea filas) o 'residuos' (remuestrea los residuos
+      centrados y escalados por sqrt(n / (n - k)) sobre los valores ajustados)
+    - replicas: número de réplicas bootstrap
+    - nivel: nivel de confianza de los intervalos
+    - tam_bloque: réplicas por bloque; la memoria es O(tam_bloque · n · k)
+    - semilla: semilla para resultados reproducibles
+    - procesos: número de procesos (1 no usa pool; None usa todos los núcleos)
+
+    Cada bloque recibe su propia semilla derivada con SeedSequence.spawn, así
+    que con la misma semilla las réplicas son idénticas con cualquier número
+    de procesos. Todo se resuelve por QR sobre el diseño estandarizado (ver
+    _estandarizar), nunca con XᵀX. En el bootstrap por pares las réplicas de
+    rango deficiente se descartan: quedan en NaN en la matriz de réplicas,
+    no entran en el error estándar ni en los percentiles y se informan.
+
+    Retorna:
+    - diccionario con los coeficientes estimados, el error estándar
+      bootstrap, los límites del intervalo, la matriz (replicas, k) de
+      coeficientes remuestreados y cuántas réplicas se descartaron
+    """
+    if tipo not in ("pares", "residuos"):
+        raise ValueError("El tipo debe ser 'pares' o 'residuos'.")
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, k = X.shape
+
+    A = _estandarizar(X)
+    estandarizado = X @ A
+    q, r = np.linalg.qr(estandarizado)
+    diagonal = np.abs(np.diag(r))
+    if np.any(diagonal <= _TOLERANCIA_RANGO * diagonal.max()):
+        raise ValueError("La matriz de diseño no tiene rango completo.")
+
+    # β = A R⁻¹ Qᵀ y, y (XᵀX)⁻¹Xᵀ = A R⁻¹ Qᵀ, así que la proyección es Q R⁻ᵀ Aᵀ
+    r_inv = np.linalg.solve(r, np.eye(k))
+    proyeccion = q @ r_inv.T @ A.T
+    coeficientes = y @ proyeccion
+    residuos = y - X @ coeficientes
+    residuos = (residuos - residuos.mean()) * np.sqrt(n / (n - k))
+    filas = np.unique(X, axis=0, return_inverse=True)[1].ravel()
+
+    tamanos = [min(tam_bloque, replicas - inicio) for inicio in range(0, replicas, tam_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    tareas = [(estandarizado, y, tipo, tamano, s, coeficientes, residuos, proyeccion, A, filas)
+              for tamano, s in zip(tamanos, semillas)]
+    if procesos == 1 or len(tareas) <= 1:
+        bloques = list(map(_replicas_bloque, tareas))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            bloques = list(pool.map(_replicas_bloque, tareas))
+    remuestreados = np.concatenate(bloques)
+    validas = remuestreados[np.all(np.isfinite(remuestreados), axis=1)]
+
+    cola = (1 - nivel) / 2
+    inferior, superior = np.quantile(validas, [cola, 1 - cola], axis=0)
+    return {
+        "Coeficientes": coeficientes,
+        "Error estándar bootstrap": validas.std(axis=0, ddof=1),
+        "Límite inferior": inferior,
+        "Límite superior": superior,
+        "Nivel de confianza": nivel,
+        "Réplicas": remuestreados,
+        "Réplicas descartadas": replicas - len(validas)
+    }
+
+
+def verificar_bootstrap(semilla=0, tolerancia=1e-6):
+    """
+    Comprueba intervalos_bootstrap: coeficientes iguales a los de
+    np.linalg.lstsq en un diseño mal escalado, réplicas idénticas con 1 y 2
+    procesos para la misma semilla, intervalos que contienen la estimación
+    puntual y ValueError ante un diseño sin rango completo. Lanza
+    AssertionError si algo no coincide.
+    """
+    rng = np.random.default_rng(semilla)
+    x = np.linspace(1900, 1950, 30)
+    X = np.column_stack([np.ones_like(x), x, x ** 2])
+    y = 0.02 * (x - 1900) ** 2 + rng.normal(0, 5, len(x))
+    referencia = np.linalg.lstsq(X / X.max(axis=0), y, rcond=None)[0] / X.max(axis=0)
+
+    for tipo in ("pares", "residuos"):
+        uno = intervalos_bootstrap(X, y, tipo, replicas=1200, tam_bloque=500, semilla=semilla)
+        dos = intervalos_bootstrap(X, y, tipo, replicas=1200, tam_bloque=500, semilla=semilla, procesos=2)
+        assert np.allclose(uno["Coeficientes"], referencia, rtol=tolerancia, atol=0), (
+            "Los coeficientes no coinciden con lstsq.")
+        assert np.array_equal(uno["Réplicas"], dos["Réplicas"], equal_nan=True), (
+            "Las réplicas cambian con el número de procesos.")
+        assert np.all((uno["Límite inferior"] <= uno["Coeficientes"])
+                      & (uno["Coeficientes"] <= uno["Límite superior"])), (
+            "El intervalo no contiene la estimación puntual.")
+
+    for deficiente in (np.column_stack([X, 2 * np.ones_like(x)]), np.column_stack([x, np.zeros_like(x)])):
+        try:
+            intervalos_bootstrap(deficiente, y, replicas=10)
+        except ValueError:
+            continue
+        raise AssertionError("Un diseño sin rango completo no lanzó ValueError.")
+
+
+if __name__ == "__main__":
+    verificar_bootstrap()
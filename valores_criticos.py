@@ -0,0 +1,177 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy import stats
+from scipy.interpolate import CubicSpline
+
+# Distribuciones de referencia usadas por las pruebas de todas las unidades
+_DISTRIBUCIONES = {"norm": stats.norm, "t": stats.t, "chi2": stats.chi2}
+
+# Puntos de la tabla de t en u = 1/gl, con u en [0, 1] (gl >= 1)
+_PUNTOS_TABLA_T = 1025
+
+
+def _probabilidad(alpha, alternativa):
+    """Probabilidad acumulada cuyo cuantil es el valor crítico de la cola pedida."""
+    if alternativa == 'two-sided':
+        return 1 - alpha / 2
+    if alternativa == 'less':
+        return alpha
+    if alternativa == 'greater':
+        return 1 - alpha
+    raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
+
+
+def _argumentos(df):
+    return () if df is None else (df,)
+
+
+@lru_cache(maxsize=4096)
+def _valor_critico_en_cache(distribucion, alpha, df, alternativa):
+    q = _probabilidad(alpha, alternativa)
+    return float(_DISTRIBUCIONES[distribucion].ppf(q, *_argumentos(df)))
+
+
+@lru_cache(maxsize=64)
+def _tabla_t(alpha, alternativa):
+    """
+    Spline cúbico del cuantil de t en función de u = 1/gl. En u = 0 vale el
+    cuantil normal y la curva es suave, así que la interpolación da un error
+    relativo menor a 1e-10 para gl >= 1 (incluidos los fraccionarios de
+    Welch) y alpha >= 0.001; verificar_tabla_t comprueba esa cota.
+    """
+    q = _probabilidad(alpha, alternativa)
+    u = np.linspace(0, 1, _PUNTOS_TABLA_T)
+    with np.errstate(divide="ignore"):
+        cuantiles = np.where(u > 0, stats.t.ppf(q, 1 / np.where(u > 0, u, 1)), stats.norm.ppf(q))
+    return CubicSpline(u, cuantiles)
+
+
+def verificar_tabla_t(alphas=(0.001, 0.01, 0.05, 0.1, 0.2), tolerancia=1e-10):
+    """
+    Compara la tabla interpolada de t con scipy.stats.t.ppf sobre una grilla
+    de gl fraccionarios en [1, 10⁷] para cada alpha y cola, y lanza
+    AssertionError si algún error relativo supera la tolerancia.
+
+    Retorna:
+    - el mayor error relativo encontrado
+    """
+    gl = np.concatenate([np.linspace(1, 10, 20001), np.linspace(10, 1000, 20001), np.logspace(3, 7, 2001)])
+    gl = gl[gl != np.round(gl)]
+    peor = 0.0
+    for alpha in alphas:
+        for alternativa in ('two-sided', 'less', 'greater'):
+            exacto = stats.t.ppf(_probabilidad(alpha, alternativa), gl)
+            error = np.max(np.abs(_tabla_t(alpha, alternativa)(1 / gl) - exacto) / np.abs(exacto))
+            assert error < tolerancia, (
+                f"Error relativo {error:.2e} en la tabla de t (alpha={alpha}, {alternativa}).")
+            peor = max(peor, float(error))
+    return peor
+
+
+def valor_critico(distribucion, alpha, df=None, alternativa='two-sided'):
+    """
+    Valor crítico de una distribución de referencia, con caché compartida.
+
+    Parámetros:
+    - distribucion: 'norm', 't' o 'chi2'
+    - alpha: nivel de significancia
+    - df: grados de libertad (None para 'norm'); escalar o array
+    - alternativa: 'two-sided' (cuantil 1 - alpha/2), 'less' (alpha) o
+      'greater' (1 - alpha)
+
+    Los escalares se memorizan en una caché LRU acotada con clave
+    (distribución, alpha, gl, cola). Para t con gl fraccionarios (Welch) y
+    para arrays de gl de t se interpola en una tabla precalculada por
+    (alpha, cola); los arrays de otras distribuciones se resuelven una vez
+    por valor distinto de gl.
+
+    Retorna:
+    - float si df es escalar o None; array con la forma de df en otro caso
+    """
+    if distribucion not in _DISTRIBUCIONES:
+        raise ValueError("La distribución debe ser 'norm', 't' o 'chi2'.")
+    alpha = float(alpha)
+
+    if df is None or np.ndim(df) == 0:
+        if df is not None:
+            df = float(df)
+            if distribucion == 't' and df >= 1 and not df.is_integer():
+                return float(_tabla_t(alpha, alternativa)(1 / df))
+        return _valor_critico_en_cache(distribucion, alpha, df, alternativa)
+
+    df = np.asarray(df, dtype=float)
+    if distribucion == 't':
+        resultado = np.empty(df.shape)
+        en_tabla = df >= 1
+        resultado[en_tabla] = _tabla_t(alpha, alternativa)(1 / df[en_tabla])
+        resultado[~en_tabla] = stats.t.ppf(_probabilidad(alpha, alternativa), df[~en_tabla])
+        return resultado
+
+    distintos, posicion = np.unique(df, return_inverse=True)
+    valores = np.array([_valor_critico_en_cache(distribucion, alpha, float(v), alternativa)
+                        for v in distintos])
+    return valores[posicion].reshape(df.shape)
+
+
+def valor_p(distribucion, estadistico, df=None, alternativa='two-sided'):
+    """
+    Valor p vectorizado de un estadístico con la distribución de referencia.
+
+    'two-sided' usa 2 * sf(|estadístico|) (para 'chi2' se usa sf, que ya es
+    la cola de la prueba), 'less' usa cdf y 'greater' sf. No se memoriza
+    porque la clave sería un estadístico continuo.
+    """
+    dist = _DISTRIBUCIONES[distribucion]
+    argumentos = _argumentos(df)
+    if alternativa == 'two-sided':
+        if distribucion == 'chi2':
+            return dist.sf(estadistico, *argumentos)
+        return np.minimum(1.0, 2 * dist.sf(np.abs(estadistico), *argumentos))
+    if alternativa == 'less':
+        return dist.cdf(estadistico, *argumentos)
+    if alternativa == 'greater':
+        return dist.sf(estadistico, *argumentos)
+    raise ValueError("La alternativa debe ser 'two-sided', 'less' o 'greater'.")
+
+
+def ajustar_valores_p(p_valores, metodo='fdr_bh'):
+    """
+    Ajuste por comparaciones múltiples, vectorizado con un solo ordenamiento.
+
+    Parámetros:
+    - p_valores: array de valores p (los NaN se ignoran y quedan NaN)
+    - metodo: 'fdr_bh' (Benjamini-Hochberg), 'holm' o 'bonferroni'
+
+    Retorna:
+    - array de valores p ajustados con la forma de p_valores
+    """
+    p_valores = np.asarray(p_valores, dtype=float)
+    ajustados = np.full(p_valores.shape, np.nan)
+    validos = ~np.isnan(p_valores)
+    p = p_valores[validos]
+    m = len(p)
+    if m == 0:
+        return ajustados
+
+    orden = np.argsort(p)
+    rango = np.arange(1, m + 1)
+    if metodo == 'fdr_bh':
+        # mínimo acumulado desde el final de p_(i) * m / i
+        ordenados = np.minimum.accumulate((p[orden] * m / rango)[::-1])[::-1]
+    elif metodo == 'holm':
+        # máximo acumulado de p_(i) * (m - i + 1)
+        ordenados = np.maximum.accumulate(p[orden] * (m - rango + 1))
+    elif metodo == 'bonferroni':
+        ordenados = p[orden] * m
+    else:
+        raise ValueError("El método debe ser 'fdr_bh', 'holm' o 'bonferroni'.")
+
+    resultado = np.empty(m)
+    resultado[orden] = np.minimum(ordenados, 1.0)
+    ajustados[validos] = resultado
+    return ajustados
+
+
+if __name__ == "__main__":
+    print(f"Mayor error relativo de la tabla de t: {verificar_tabla_t():.2e}")